@@ -12,6 +12,7 @@ python manage.py collectstatic --noinput
 
 echo "=== RUNNING MIGRATIONS ==="
 python manage.py migrate
+python manage.py createcachetable
 
 echo "=== SEEDING DEMO USER DATA ==="
 python manage.py seed_demo_data demo_user || echo "Demo data already exists, skipping"
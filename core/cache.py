@@ -0,0 +1,284 @@
+"""
+Two-tier cache backend: a small in-process LRU (L1) in front of a shared cache (L2).
+
+L2 is another CACHES alias - the database cache table in production, so every gunicorn
+worker (and instance) sees the same entries without an external service. L1 absorbs
+repeat reads of hot keys; its copies live at most L1_TIMEOUT seconds.
+
+Keeping workers in agreement:
+  * clear(), and writes/deletes of BROADCAST_PREFIXES keys (e.g. FX tables and version
+    keys), publish a new generation in L2; every process checks it at most every
+    SYNC_INTERVAL seconds and drops its L1 when it changed. Other deletes and incr()s
+    only drop this process's L1 copy of that key.
+  * Keys ending in an L2_ONLY_SUFFIXES suffix (single-flight locks) bypass L1 entirely.
+  * Everything else is expected to be keyed by a version (LedgerState, FX date), so an
+    L1 copy can only be old by L1_TIMEOUT, never wrong for its key.
+
+Writes to L2 get up to JITTER (fraction) extra TTL so entries filled together don't
+expire together, and get_or_set() lets one caller per key compute a missing value while
+the others (threads or workers) wait for it.
+
+    CACHES = {
+        "default": {
+            "BACKEND": "core.cache.TwoTierCache",
+            "LOCATION": "pft-l1",
+            "OPTIONS": {"L2": "shared", "L1_MAX_ENTRIES": 1000},
+        },
+        "shared": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "pft_cache"},
+    }
+"""
+import pickle
+import random
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from services import metrics
+
+GENERATION_KEY = "twotier:generation"
+
+_MISSING = object()
+
+
+class _LocalTier:
+    """
+    One process's L1 store, shared by every thread's backend instance for a LOCATION.
+    Values are kept pickled, like LocMemCache, so callers can't mutate a cached object.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.lock = threading.Lock()
+        self.generation = None
+        self.next_sync = 0.0
+        self.fill_locks = [threading.Lock() for _ in range(64)]
+        self.stats = Counter()  # (tier, result) -> reads; exported through services.metrics
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.stats["l1", "miss"] += 1
+                return _MISSING
+            self.entries.move_to_end(key)
+            self.stats["l1", "hit"] += 1
+            pickled = entry[1]
+        return pickle.loads(pickled)
+
+    def set(self, key, value, ttl):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, pickled)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+
+def _stats_collector():
+    counters = Counter()
+    with _local_tiers_lock:
+        tiers = list(_local_tiers.values())
+    for tier in tiers:
+        with tier.lock:
+            for (name, result), count in tier.stats.items():
+                counters[metrics.counter_key("cache_requests_total", cache=name, result=result)] += count
+    return counters
+
+
+metrics.register_collector(_stats_collector)
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._l2_alias = options.get("L2", "shared")
+        self.l1_timeout = float(options.get("L1_TIMEOUT", 5))
+        self.sync_interval = float(options.get("SYNC_INTERVAL", 1))
+        self.jitter = float(options.get("JITTER", 0.1))
+        self.fill_timeout = float(options.get("FILL_TIMEOUT", 30))
+        self.fill_wait = float(options.get("FILL_WAIT", 5))
+        self.broadcast_prefixes = tuple(options.get("BROADCAST_PREFIXES", ("fx:",)))
+        self.l2_only_suffixes = tuple(options.get("L2_ONLY_SUFFIXES", (":lock",)))
+        with _local_tiers_lock:
+            tier = _local_tiers.get(location)
+            if tier is None:
+                tier = _local_tiers[location] = _LocalTier(int(options.get("L1_MAX_ENTRIES", 1000)))
+        self._l1 = tier
+
+    @property
+    def l2(self):
+        # caches[] is per thread, like this instance; resolved lazily so the L2 alias may
+        # be defined after this one.
+        return caches[self._l2_alias]
+
+    # -----------------------------
+    # Tier plumbing
+    # -----------------------------
+    def _l1_key(self, key, version):
+        return self.l2.make_key(key, version=version)  # L2 validates the same key
+
+    def _local(self, key):
+        return not key.endswith(self.l2_only_suffixes)
+
+    def _l2_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None or timeout <= 0 or not self.jitter:
+            return timeout
+        return int(timeout + random.uniform(0, timeout * self.jitter))
+
+    def _l1_ttl(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return self.l1_timeout if timeout is None else min(self.l1_timeout, timeout)
+
+    def _sync(self):
+        """
+        Drop L1 when another process has broadcast an invalidation since we last looked.
+        """
+        tier = self._l1
+        now = time.monotonic()
+        if now < tier.next_sync:
+            return
+        tier.next_sync = now + self.sync_interval
+        generation = self.l2.get(GENERATION_KEY)
+        if generation != tier.generation:
+            if tier.generation is not None:
+                tier.clear()
+            tier.generation = generation
+
+    def broadcast(self):
+        """
+        Make every process drop its L1 within SYNC_INTERVAL seconds.
+        """
+        generation = uuid.uuid4().hex
+        self.l2.set(GENERATION_KEY, generation, None)
+        self._l1.clear()
+        self._l1.generation = generation
+
+    def _after_write(self, key, version, value, timeout):
+        if not self._local(key):
+            return
+        if key.startswith(self.broadcast_prefixes):
+            self.broadcast()
+        self._l1.set(self._l1_key(key, version), value, self._l1_ttl(timeout))
+
+    # -----------------------------
+    # Cache API
+    # -----------------------------
+    def get(self, key, default=None, version=None):
+        if not self._local(key):
+            return self.l2.get(key, default, version=version)
+
+        self._sync()
+        l1_key = self._l1_key(key, version)
+        value = self._l1.get(l1_key)
+        if value is not _MISSING:
+            return value
+
+        value = self.l2.get(key, _MISSING, version=version)
+        with self._l1.lock:
+            self._l1.stats["l2", "miss" if value is _MISSING else "hit"] += 1
+        if value is _MISSING:
+            return default
+        self._l1.set(l1_key, value, self.l1_timeout)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, self._l2_timeout(timeout), version=version)
+        self._after_write(key, version, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, self._l2_timeout(timeout), version=version)
+        if added:
+            self._after_write(key, version, value, timeout)
+        return added
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Stampede-safe: threads of this process queue on a per-key lock, and across
+        processes only the holder of `<key>:lock` in L2 computes `default`; the others
+        poll L2 for its result (for up to FILL_WAIT seconds, then compute it themselves).
+        """
+        value = self.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+
+        fill_lock = self._l1.fill_locks[zlib.crc32(self._l1_key(key, version).encode()) % len(self._l1.fill_locks)]
+        with fill_lock:
+            value = self.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                return value
+
+            lock_key = f"{key}:lock"
+            token = uuid.uuid4().hex
+            if not self.l2.add(lock_key, token, self.fill_timeout, version=version):
+                deadline = time.monotonic() + self.fill_wait
+                while time.monotonic() < deadline:
+                    time.sleep(0.02)
+                    value = self.get(key, _MISSING, version=version)
+                    if value is not _MISSING:
+                        return value
+                token = None  # the holder never delivered: compute it ourselves
+
+            try:
+                value = default() if callable(default) else default
+                if value is not None:
+                    self.set(key, value, timeout, version=version)
+                return value
+            finally:
+                if token is not None and self.l2.get(lock_key, version=version) == token:
+                    self.l2.delete(lock_key, version=version)
+
+    def _forget(self, key, version):
+        if not self._local(key):
+            return
+        if key.startswith(self.broadcast_prefixes):
+            self.broadcast()
+        else:
+            self._l1.delete(self._l1_key(key, version))
+
+    def delete(self, key, version=None):
+        deleted = self.l2.delete(key, version=version)
+        self._forget(key, version)
+        return deleted
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, self._l2_timeout(timeout), version=version)
+
+    def has_key(self, key, version=None):
+        return self.l2.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version=version)
+        self._forget(key, version)
+        return value
+
+    def clear(self):
+        self.l2.clear()
+        self.broadcast()
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
@@ -0,0 +1,164 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from services import metrics, perf
+
+
+logger = logging.getLogger(__name__)
+
+# Server-Timing metric order; "app" is whatever the spans above don't account for
+SERVER_TIMING_SPANS = ("db", "fx", "template")
+SLOW_SQL_MAX_CHARS = 500
+
+
+class _QueryRecorder:
+    """
+    connection.execute_wrapper that times every statement into the request's metrics.
+    """
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.metrics.add_query(sql, time.perf_counter() - started)
+
+
+def record_queries(spans):
+    """
+    Time every statement run on this thread's connections into `spans` until the returned
+    ExitStack is closed. Connections are per thread, so code that queries from other
+    threads (see core.views' async dashboard) records its own.
+    """
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(_QueryRecorder(spans)))
+    return stack
+
+
+class PerformanceMiddleware:
+    """
+    Per-request timings: DB query count/time, FX lookups, template rendering and the total.
+
+    Emits them as a Server-Timing header (visible in the browser's network panel) and logs
+    requests slower than PERF_SLOW_REQUEST_MS with their slowest SQL statements. Only a
+    PERF_SAMPLE_RATE fraction of requests is instrumented, so it can stay on in production.
+    Every request's latency also goes to the /metrics histograms (services.metrics).
+    Streaming responses are timed until the response object is returned.
+
+    Runs natively under ASGI too, so async views aren't pushed onto a thread by it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        sample_rate = getattr(settings, "PERF_SAMPLE_RATE", 1.0)
+        return sample_rate > 0 and (sample_rate >= 1 or random.random() < sample_rate)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        started = time.perf_counter()
+        if not self._sampled():
+            response = self.get_response(request)
+            self._record(request, response, time.perf_counter() - started)
+            return response
+
+        spans = perf.RequestMetrics(keep_queries=getattr(settings, "PERF_SLOW_QUERY_COUNT", 5))
+        token = perf.activate(spans)
+        try:
+            with record_queries(spans):
+                response = self.get_response(request)
+        finally:
+            perf.deactivate(token)
+        return self._finish(request, response, spans, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        if not self._sampled():
+            response = await self.get_response(request)
+            self._record(request, response, time.perf_counter() - started)
+            return response
+
+        spans = perf.RequestMetrics(keep_queries=getattr(settings, "PERF_SLOW_QUERY_COUNT", 5))
+        token = perf.activate(spans)
+        # Installed on the request's thread-sensitive thread, where the ORM calls of
+        # sync_to_async() / the async ORM run
+        recorder = await sync_to_async(record_queries)(spans)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recorder.close)()
+            perf.deactivate(token)
+        return self._finish(request, response, spans, time.perf_counter() - started)
+
+    def _finish(self, request, response, spans, total):
+        self._record(request, response, total, spans)
+
+        if getattr(settings, "PERF_SERVER_TIMING", True):
+            response["Server-Timing"] = self._server_timing(spans, total)
+
+        slow_ms = getattr(settings, "PERF_SLOW_REQUEST_MS", 500)
+        if slow_ms is not None and total * 1000 >= slow_ms:
+            self._log_slow(request, response, spans, total)
+        return response
+
+    def _record(self, request, response, total, spans=None):
+        """
+        Feed the /metrics histograms (every request; DB numbers only when sampled).
+        """
+        match = getattr(request, "resolver_match", None)
+        view = (match.url_name if match else None) or "unmatched"
+        metrics.observe(
+            "http_request_duration_seconds", total,
+            view=view, method=request.method, status=f"{response.status_code // 100}xx",
+        )
+        if spans is not None:
+            metrics.observe("http_request_db_queries", spans.counts.get("db", 0), view=view)
+            metrics.observe("http_request_db_seconds", spans.durations.get("db", 0.0), view=view)
+
+    def _server_timing(self, spans, total):
+        parts = []
+        accounted = 0.0
+        for name in SERVER_TIMING_SPANS:
+            if name not in spans.durations:
+                continue
+            seconds = spans.durations[name]
+            accounted += seconds
+            desc = f';desc="{spans.counts[name]} queries"' if name == "db" else ""
+            parts.append(f"{name}{desc};dur={seconds * 1000:.1f}")
+        parts.append(f"app;dur={max(total - accounted, 0) * 1000:.1f}")
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+    def _log_slow(self, request, response, spans, total):
+        lines = [
+            f"  {seconds * 1000:.1f}ms  {sql[:SLOW_SQL_MAX_CHARS]}"
+            for seconds, sql in spans.slowest_queries()
+        ]
+        logger.warning(
+            "Slow request %s %s -> %s in %.0fms (%s)%s",
+            request.method,
+            request.path,
+            response.status_code,
+            total * 1000,
+            self._server_timing(spans, total),
+            ("\n" + "\n".join(lines)) if lines else "",
+        )
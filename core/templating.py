@@ -0,0 +1,32 @@
+from django.template.backends.django import DjangoTemplates
+
+from services import perf
+
+
+class TimedTemplate:
+    """
+    Wraps a backend template so render() time is recorded as the "template" span.
+    Only top-level renders pass through here; {% include %}/{% extends %} are part of them.
+    """
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with perf.timed("template"):
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The standard Django template backend, with render timing for PerformanceMiddleware.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
@@ -0,0 +1,463 @@
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.cache import TwoTierCache
+from core.views import DASHBOARD_SECTIONS
+from services.currency import RatesResult, invalidate_rate_timelines
+from tracker.ledger_cache import get_ledger, ledger_cache
+from tracker.models import Budget, Category, FxRate, Transaction
+
+
+# L2 in memory instead of the database cache table, for tests that pin query counts to the
+# app's own queries or can't touch the database (DatabaseL2Tests covers the real one).
+LOCAL_L2 = override_settings(CACHES={
+    **settings.CACHES,
+    "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "pft-shared"},
+})
+
+FAKE_RATES = RatesResult(base="EUR", date="2025-01-02", rates={"USD": Decimal("1.10"), "GBP": Decimal("0.85")})
+
+
+@LOCAL_L2
+@mock.patch("core.views.get_latest_rates", return_value=FAKE_RATES)
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch("tracker.conditional.get_latest_rates", return_value=FAKE_RATES)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="u1", password="StrongPass12345!")
+        self.client.force_login(self.user)
+        self.today = timezone.localdate()
+        self.month_start = self.today.replace(day=1)
+        Budget.objects.create(user=self.user, month=self.month_start, amount=Decimal("900.00"))
+
+    def _add_categories(self, count):
+        existing = Category.objects.filter(user=self.user).count()
+        for i in range(existing, existing + count):
+            cat = Category.objects.create(user=self.user, name=f"Cat {i}", kind=Category.Kind.EXPENSE)
+            Budget.objects.create(user=self.user, category=cat, month=self.month_start, amount=Decimal("100.00"))
+            for offset in (0, 20):
+                Transaction.objects.create(
+                    user=self.user,
+                    type=Transaction.Type.EXPENSE,
+                    category=cat,
+                    amount=Decimal("10.00"),
+                    date=self.today - timedelta(days=offset),
+                )
+
+    def _data(self, section, **params):
+        resp = self.client.get(reverse("dashboard_data", args=[section]), params)
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()
+
+    def test_dashboard_query_count_is_constant(self, _rates):
+        self._add_categories(2)
+        # The page is a shell: session + user + data version
+        with self.assertNumQueries(3):
+            resp = self.client.get(reverse("dashboard"))
+        self.assertEqual(resp.status_code, 200)
+        # + rollup summary + budgets
+        with self.assertNumQueries(5):
+            self._data("summary")
+
+        self._add_categories(8)
+        with self.assertNumQueries(5):
+            self._data("summary")
+        self.assertEqual(len(self._data("breakdown")["rows"]), 10)
+
+    def test_trend_range_buckets_and_downsamples_long_histories(self, _rates):
+        # One expense a month for ten years, the largest one five years ago
+        amounts = []
+        day = self.today.replace(day=1)
+        for i in range(120):
+            amount = Decimal("500.00") if i == 60 else Decimal(10 + i % 7)
+            amounts.append((day, amount))
+            day = (day - timedelta(days=1)).replace(day=1)
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, type=Transaction.Type.EXPENSE, amount=amount, date=date)
+            for date, amount in amounts
+        ])
+
+        trend = self._data("trend", range="1y")
+        self.assertEqual(trend["granularity"], "week")
+        self.assertIn(len(trend["series"]), (53, 54))
+        year_start = self.today - timedelta(days=364)
+        self.assertEqual(
+            sum(trend["series"]),
+            float(sum(amount for date, amount in amounts if date >= year_start)),
+        )
+        self.assertEqual(len(trend["bar_series"]), 14)
+
+        # Buckets are summed in SQL after converting each day at its rate
+        trend = self._data("trend", range="1y", currency="USD")
+        self.assertAlmostEqual(
+            sum(trend["series"]),
+            float(sum(amount * Decimal("1.10") for date, amount in amounts if date >= year_start)),
+        )
+        self.client.get(reverse("dashboard"), {"currency": "EUR"})
+
+        trend = self._data("trend", range="all")
+        self.assertEqual(trend["granularity"], "month")
+        self.assertEqual(len(trend["series"]), 60)  # 120 months downsampled
+        self.assertIn(500.0, trend["series"])
+        self.assertEqual(trend["labels"][-1], self.month_start.isoformat())
+
+        trend = self._data("trend", range="bogus")
+        self.assertEqual(trend["range"], "30d")
+        self.assertEqual(len(trend["series"]), 30)
+        resp = self.client.get(reverse("dashboard"), {"range": "1y"})
+        self.assertContains(resp, reverse("dashboard_data", args=["trend"]) + "?range=1y")
+
+    def test_ledger_cache_serves_the_same_trend_as_sql(self, _rates):
+        for i in range(400):
+            Transaction.objects.create(
+                user=self.user, type=Transaction.Type.EXPENSE, amount=Decimal("3.33") + i % 5,
+                date=self.today - timedelta(days=i * 3),
+            )
+        ranges = [("90d", "EUR"), ("1y", "EUR"), ("1y", "USD"), ("all", "USD")]
+
+        def trends():
+            cache.clear()
+            return [self._data("trend", range=trend_range, currency=currency) for trend_range, currency in ranges]
+
+        expected = trends()
+        with override_settings(LEDGER_CACHE_MAX_BYTES=1 << 20):
+            ledger_cache().clear()
+            self.assertEqual(trends(), expected)
+            self.assertEqual(ledger_cache().stats["miss"], 1)  # one build, then in-memory hits
+
+    def test_repeat_views_are_served_from_cache_until_the_next_write(self, _rates):
+        self._add_categories(2)
+        self._data("summary")
+
+        # session + user + data version
+        with self.assertNumQueries(3):
+            summary = self._data("summary")
+        self.assertEqual(summary["display_expense"], "20.00")
+
+        tx = Transaction.objects.create(
+            user=self.user, type=Transaction.Type.EXPENSE, amount=Decimal("5.00"), date=self.today
+        )
+        self.assertEqual(self._data("summary")["display_expense"], "25.00")
+        Transaction.objects.filter(pk=tx.pk).delete()
+        self.assertEqual(self._data("summary")["display_expense"], "20.00")
+
+        # Budget bulk deletes and the budgets page form count as writes too
+        Budget.objects.filter(user=self.user, category=None).delete()
+        self.assertEqual(self._data("insights")["level"], "secondary")
+        self.client.post(reverse("budget_overview"), {"month": self.month_start, "amount": "10.00", "category": ""})
+        self.assertEqual(self._data("insights")["level"], "danger")
+
+        # Conditional refreshes are answered before any of that, and vary by currency
+        self.assertFalse(self.client.get(reverse("dashboard")).has_header("ETag"))  # shows "Budget saved."
+        etag = self.client.get(reverse("dashboard"))["ETag"]
+        self.assertEqual(self.client.get(reverse("dashboard"), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        resp = self.client.get(reverse("dashboard"), {"currency": "USD"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.client.session["display_currency"], "USD")
+        self.client.get(reverse("dashboard"), {"currency": "EUR"})
+
+        # The next day is a different key, even without a write
+        with mock.patch("core.views.timezone.localdate", return_value=self.today + timedelta(days=1)):
+            with self.assertNumQueries(5):
+                self._data("summary")
+
+    def test_dashboard_totals(self, _rates):
+        self._add_categories(3)
+        Transaction.objects.create(
+            user=self.user, type=Transaction.Type.INCOME, amount=Decimal("500.00"), date=self.today
+        )
+        summary = self._data("summary")
+
+        expense_this_month = "30.00"
+        if (self.today - timedelta(days=20)) >= self.month_start:
+            expense_this_month = "60.00"
+
+        self.assertEqual(summary["income"], "500.00")
+        self.assertEqual(summary["expense"], expense_this_month)
+        self.assertEqual(summary["total_budget"], "900.00")
+        trend = self._data("trend")
+        self.assertEqual(sum(trend["series"]), 60.0)
+        self.assertEqual(len(trend["labels"]), 30)
+
+    def test_dashboard_converts_each_day_at_its_own_rate(self, _rates):
+        invalidate_rate_timelines()
+        self.addCleanup(invalidate_rate_timelines)
+        yesterday = self.today - timedelta(days=1)
+        FxRate.objects.create(quote="USD", date=yesterday - timedelta(days=3), rate=Decimal("2.00"))
+        FxRate.objects.create(quote="USD", date=self.today, rate=Decimal("3.00"))
+        for day in (yesterday, self.today):
+            Transaction.objects.create(
+                user=self.user, type=Transaction.Type.EXPENSE, amount=Decimal("10.00"), date=day
+            )
+
+        self.client.get(reverse("dashboard"), {"currency": "USD"})
+
+        # yesterday resolves to the nearest prior publication (2.00), today to 3.00
+        self.assertEqual(self._data("trend")["series"][-2:], [20.0, 30.0])
+        if yesterday >= self.month_start:
+            self.assertEqual(self._data("summary")["display_expense"], "50.00")
+
+    def test_any_registry_currency_is_served_from_the_one_rate_table(self, rates):
+        rates.return_value = RatesResult(base="EUR", date="2025-01-02", rates={**FAKE_RATES.rates, "JPY": Decimal("160")})
+
+        resp = self.client.get(reverse("dashboard"), {"currency": "jpy"})
+        self.assertEqual((resp.context["display_currency"], resp.context["display_symbol"]), ("JPY", "¥"))
+        self.assertContains(resp, '<option value="ZAR" >ZAR (R)</option>', html=True)
+        rates.assert_not_called()  # the shell page doesn't wait on FX
+        self.assertEqual(self._data("rates")["rates"][0], {"code": "JPY", "rate": "160"})
+        rates.assert_called_with(base="EUR", symbols=None)
+
+        # Codes outside the registry are ignored; the session keeps the last valid choice
+        resp = self.client.get(reverse("dashboard"), {"currency": "XYZ"})
+        self.assertEqual(resp.context["display_currency"], "JPY")
+
+
+    def test_widgets_load_after_the_page_from_their_own_endpoints(self, rates):
+        self._add_categories(2)
+        resp = self.client.get(reverse("dashboard"))
+        self.assertNotContains(resp, "trend-series")
+        for section in DASHBOARD_SECTIONS:
+            self.assertContains(resp, reverse("dashboard_data", args=[section]))
+
+        # The summary cached the month data: session + user + data version
+        self._data("summary")
+        with self.assertNumQueries(3):
+            resp = self.client.get(reverse("dashboard_data", args=["breakdown"]))
+        self.assertEqual(resp["Content-Type"], "application/json")
+        self.assertIn("private", resp["Cache-Control"])
+        self.assertEqual(sorted(row["name"] for row in resp.json()["rows"]), ["Cat 0", "Cat 1"])
+        etag = resp["ETag"]
+
+        # + the 30-day trend query (its last 14 days are the bars)
+        with self.assertNumQueries(4):
+            self.client.get(reverse("dashboard_data", args=["trend"]))
+        self._data("insights")
+        rates.assert_not_called()  # only the rates card looks up FX for an EUR display
+
+        resp = self.client.get(reverse("dashboard_data", args=["breakdown"]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(self.client.get(reverse("dashboard_data", args=["nope"])).status_code, 404)
+
+
+@LOCAL_L2
+@mock.patch("core.views.aget_latest_rates", new_callable=mock.AsyncMock, return_value=FAKE_RATES)
+@mock.patch("tracker.conditional.aget_latest_rates", new_callable=mock.AsyncMock, return_value=FAKE_RATES)
+class AsyncDashboardTests(TransactionTestCase):
+    # TransactionTestCase: the async view queries from threads with their own connections
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="u1", password="StrongPass12345!")
+        self.today = timezone.localdate()
+        Budget.objects.create(user=self.user, month=self.today.replace(day=1), amount=Decimal("900.00"))
+        for amount in ("10.00", "20.00"):
+            Transaction.objects.create(
+                user=self.user, type=Transaction.Type.EXPENSE, amount=Decimal(amount), date=self.today
+            )
+
+    def test_async_dashboard_matches_the_sync_page_and_warms_the_trend(self, _variant_rates, _rates):
+        self.async_client.force_login(self.user)
+        get = async_to_sync(self.async_client.get)
+
+        resp = get(reverse("dashboard_async"), {"currency": "USD"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context["summary"]["display_expense"], "33.00")
+        self.assertEqual(resp.context["summary"]["total_budget"], "900.00")
+        self.assertEqual(resp.context["rates"]["date"], FAKE_RATES.date)
+        self.assertIn('db;desc="', resp["Server-Timing"])
+        etag = get(reverse("dashboard_async"), {"currency": "USD"})["ETag"]  # now with the CSRF cookie
+        resp = get(reverse("dashboard_async"), {"currency": "USD"}, headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 304)
+
+        # The sync endpoints read the parts it cached: session + user + data version
+        with mock.patch("tracker.conditional.get_latest_rates", return_value=FAKE_RATES), \
+                mock.patch("core.views.get_latest_rates", return_value=FAKE_RATES):
+            self.client.force_login(self.user)
+            self.client.get(reverse("dashboard_data", args=["insights"]), {"currency": "USD"})
+            with self.assertNumQueries(3):
+                trend = self.client.get(reverse("dashboard_data", args=["trend"])).json()
+        self.assertEqual(trend["series"][-1], 33.0)
+
+
+@LOCAL_L2
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="u1", password="StrongPass12345!")
+        self.client.force_login(self.user)
+
+    @mock.patch("services.currency._requests_transport")
+    def test_server_timing_header_breaks_down_the_request(self, transport):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        transport.return_value = {"base": "EUR", "date": "2025-01-02", "rates": {"USD": 1.1, "GBP": 0.85}}
+
+        resp = self.client.get(reverse("dashboard"))
+        timing = resp["Server-Timing"]
+        self.assertIn('db;desc="3 queries";dur=', timing)
+        self.assertIn("template;dur=", timing)
+        self.assertIn("total;dur=", timing)
+        self.assertNotIn("fx;dur=", timing)
+
+        timing = self.client.get(reverse("dashboard_data", args=["rates"]))["Server-Timing"]
+        self.assertIn("fx;dur=", timing)
+
+    @override_settings(PERF_SLOW_REQUEST_MS=0, PERF_SLOW_QUERY_COUNT=2)
+    @mock.patch("core.views.get_latest_rates", return_value=FAKE_RATES)
+    def test_slow_requests_are_logged_with_their_slowest_sql(self, _rates):
+        with self.assertLogs("core.middleware", "WARNING") as logs:
+            self.client.get(reverse("transaction_list"))
+        message = logs.output[0]
+        self.assertIn("Slow request GET /tracker/transactions/", message)
+        self.assertEqual(message.count("SELECT"), 2)
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_instrumented(self):
+        resp = self.client.get(reverse("home"))
+        self.assertFalse(resp.has_header("Server-Timing"))
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="u1", password="StrongPass12345!")
+        self.client.force_login(self.user)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    @mock.patch("tracker.conditional.get_latest_rates", return_value=FAKE_RATES)
+    @mock.patch("core.views.get_latest_rates", return_value=FAKE_RATES)
+    def test_metrics_report_request_latency_and_fx_counters(self, _rates, _variant_rates):
+        self.client.get(reverse("dashboard"))
+
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+        resp = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = resp.content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",status="2xx",view="dashboard",le="+Inf"}', body)
+        self.assertIn('http_request_db_queries_count{view="dashboard"}', body)
+        self.assertIn("# TYPE fx_cache_requests_total counter", body)
+
+    @override_settings(METRICS_TOKEN="s3cret", LEDGER_CACHE_MAX_BYTES=1 << 20)
+    def test_metrics_report_ledger_cache_requests(self):
+        ledger_cache().clear()
+        get_ledger(self.user.pk, 0)
+        get_ledger(self.user.pk, 0)
+
+        body = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer s3cret").content.decode()
+        self.assertIn("# TYPE ledger_cache_requests_total counter", body)
+        self.assertIn('ledger_cache_requests_total{result="hit"}', body)
+        self.assertIn('ledger_cache_requests_total{result="miss"}', body)
+
+    @override_settings(METRICS_TOKEN="", DEBUG=False)
+    def test_metrics_are_hidden_without_a_token_in_production(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+
+
+@LOCAL_L2
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches["shared"].clear()
+        self.addCleanup(caches["shared"].clear)
+
+    def _worker(self, name, **options):
+        # Separate L1 stores over the same L2, like two gunicorn workers
+        return TwoTierCache(f"test-{name}-{self.id()}", {"OPTIONS": {"L2": "shared", "SYNC_INTERVAL": 0, **options}})
+
+    def test_workers_share_l2_and_agree_after_invalidation(self):
+        a, b = self._worker("a"), self._worker("b")
+        a.set("fx:table:EUR", "v1", None)
+        self.assertEqual(b.get("fx:table:EUR"), "v1")  # L2 hit, now in b's L1
+
+        caches["shared"].set("fx:table:EUR", "sneaky", None)
+        self.assertEqual(b.get("fx:table:EUR"), "v1")  # served from L1
+
+        a.set("fx:table:EUR", "v2", None)  # broadcast prefix: every L1 is dropped
+        self.assertEqual(b.get("fx:table:EUR"), "v2")
+
+        b.get("dashboard:1")
+        a.set("dashboard:1", "data", 60)
+        a.delete("dashboard:1")
+        self.assertIsNone(b.get("dashboard:1"))
+
+        # Other deletes only drop the deleting process's own copy: b keeps its L1
+        a.set("other", "kept", 60)
+        self.assertEqual(b.get("other"), "kept")
+        caches["shared"].set("other", "sneaky", 60)
+        a.delete("dashboard:1")
+        self.assertEqual(b.get("other"), "kept")
+        a.set("counter", 1, 60)
+        a.incr("counter")
+        self.assertEqual(a.get("counter"), 2)
+        self.assertEqual(b.get("other"), "kept")
+
+    def test_l1_is_bounded(self):
+        a = self._worker("lru", L1_MAX_ENTRIES=2)
+        for key in ("k1", "k2", "k3"):
+            a.set(key, key, 60)
+        self.assertEqual(list(a._l1.entries), [a._l1_key(key, None) for key in ("k2", "k3")])
+
+    def test_get_or_set_computes_a_missing_value_once(self):
+        a, b = self._worker("a"), self._worker("b")
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda w=w: results.append(w.get_or_set("slow", compute, 60)))
+            for w in (a, b) * 4
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["value"] * 8)
+        self.assertEqual(len(calls), 1)
+
+
+@mock.patch("tracker.conditional.get_latest_rates", return_value=FAKE_RATES)
+@mock.patch("core.views.get_latest_rates", return_value=FAKE_RATES)
+class DatabaseL2Tests(TestCase):
+    """
+    The production L2, the database cache table: what it adds to a request's queries.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="u1", password="StrongPass12345!")
+        self.client.force_login(self.user)
+        Budget.objects.create(user=self.user, month=timezone.localdate().replace(day=1), amount=Decimal("900.00"))
+
+    def test_l2_reads_are_counted_once_per_sync_interval(self, _rates, _variant_rates):
+        url = reverse("dashboard_data", args=["summary"])
+        tier = caches["default"]._l1
+        self.client.get(url)
+
+        # Cold L1 past its SYNC_INTERVAL: app queries (session + user + data version)
+        # + the generation poll + the history version + the summary's two parts
+        tier.clear()
+        tier.next_sync = 0
+        with self.assertNumQueries(7):
+            self.assertEqual(self.client.get(url).json()["total_budget"], "900.00")
+
+        # Warm L1 within the interval: the app's own queries only
+        with self.assertNumQueries(3):
+            self.client.get(url)
@@ -4,4 +4,7 @@ from . import views
 urlpatterns = [
     path("", views.home, name="home"),
     path("dashboard/", views.dashboard, name="dashboard"),
+    path("dashboard/async/", views.dashboard_async, name="dashboard_async"),
+    path("dashboard/data/<slug:section>/", views.dashboard_data, name="dashboard_data"),
+    path("metrics", views.metrics, name="metrics"),
 ]
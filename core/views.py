@@ -1,125 +1,479 @@
+import asyncio
 import calendar
-from datetime import timedelta
+from collections import namedtuple
+from datetime import date, timedelta
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import DateField, F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
 from django.utils import timezone
 
-from tracker.models import Transaction, Budget
-from services.currency import get_latest_rates, convert
+from core.middleware import record_queries
+from tracker.conditional import adisplay_variant, display_variant, ledger_conditional, ledger_state
+from tracker.ledger_cache import get_ledger
+from tracker.models import DailyTotal, Transaction, Budget, display_amount_expression
+from services import metrics as metrics_registry, perf
+from services.currencies import CURRENCY_CHOICES, currency_or_base, get_currency
+from services.money import Money
+from services.series import lttb
+from services.currency import (
+    aget_latest_rates, get_latest_rates, rate_history_version, rate_lookup,
+    convert, convert_series, from_cents, to_cents,
+)
+
+
+def _rates_by_day(days, rate_on):
+    """
+    [rate_on(day) for day in days], looking each distinct day up once.
+    """
+    if not rate_on:
+        return [None] * len(days)
+    rates = {}
+    for day in days:
+        if day not in rates:
+            rates[day] = rate_on(day)
+    return [rates[day] for day in days]
 
 
-def _build_trend_series(user, display_rate=None, days=30):
-    """
-    Returns (days, labels, series) for daily expense totals.
-    Values are stored in EUR; if display_rate is provided, values are converted for display.
+def _or_unconverted(converted, cents):
+    return [c if v is None else v for v, c in zip(converted, cents)]
+
+
+def _summarise_rollup(user, start_date, month_start, today, rate_on=None):
     """
-    today = timezone.localdate()
-    start_date = today - timedelta(days=days - 1)
+    One grouped query over the DailyTotal rollup from start_date to today.
 
-    daily_qs = (
-        Transaction.objects
+    Returns a dict with EUR totals (income, expense), the same totals converted at each
+    day's own rate via rate_on(day) (display_income, display_expense), spend_by_category
+    as [(category_id, name, total_eur, total_display)] sorted by total, descending
+    (all month_start..today), and expenses_by_day {date: EUR total} for the whole window.
+    """
+    rows = (
+        DailyTotal.objects
         .filter(
             user=user,
-            type=Transaction.Type.EXPENSE,
-            date__gte=start_date,
+            date__gte=min(start_date, month_start),
             date__lte=today
         )
-        .values("date")
-        .annotate(total=Sum("amount"))
-        .order_by("date")
+        .values("date", "category_id", "category__name")
+        .annotate(
+            income=Sum("total", filter=Q(type=Transaction.Type.INCOME)),
+            expense=Sum("total", filter=Q(type=Transaction.Type.EXPENSE)),
+        )
+        .order_by()
     )
 
-    totals_by_day = {row["date"]: row["total"] for row in daily_qs}
+    income = expense = 0
+    month_rows = []
+    expenses_by_day = {}
+
+    for row in rows:
+        day = row["date"]
+        day_income = row["income"] or 0
+        day_expense = row["expense"] or 0
+
+        if day >= start_date:
+            expenses_by_day[day] = expenses_by_day.get(day, 0) + day_expense
+
+        if day < month_start:
+            continue
+
+        income += day_income
+        expense += day_expense
+        month_rows.append((day, row["category_id"], row["category__name"], to_cents(day_income), to_cents(day_expense)))
+
+    # Convert every row in one batch, each at its own day's rate (None -> keep EUR)
+    income_cents = [r[3] for r in month_rows]
+    expense_cents = [r[4] for r in month_rows]
+    rates = _rates_by_day([r[0] for r in month_rows], rate_on)
+    income_display = _or_unconverted(convert_series(income_cents, rates), income_cents)
+    expense_display = _or_unconverted(convert_series(expense_cents, rates), expense_cents)
+
+    by_category = {}
+    for (_, category_id, name, _, day_expense), day_expense_display in zip(month_rows, expense_display):
+        if day_expense:
+            key = (category_id, name)
+            total_eur, total_display = by_category.get(key, (0, 0))
+            by_category[key] = (total_eur + day_expense, total_display + day_expense_display)
+
+    spend_by_category = sorted(
+        (
+            (category_id, name, Money(total_eur), from_cents(total_display))
+            for (category_id, name), (total_eur, total_display) in by_category.items()
+        ),
+        key=lambda r: r[2],
+        reverse=True,
+    )
+    return {
+        "income": income,
+        "expense": expense,
+        "display_income": from_cents(sum(income_display)),
+        "display_expense": from_cents(sum(expense_display)),
+        "spend_by_category": spend_by_category,
+        "expenses_by_day": expenses_by_day,
+    }
 
-    labels = []
-    series = []
 
-    for i in range(days):
-        d = start_date + timedelta(days=i)
-        total_eur = totals_by_day.get(d, 0) or 0
+def _build_trend_series(user, display_rate=None, days=30, totals_by_day=None, rate_on=None, ledger=None):
+    """
+    Returns (days, labels, series) for daily expense totals; labels are ISO dates
+    (formatted in the browser).
+    Values are stored in EUR; if display_rate is provided, values are converted for display.
+    rate_on(day) -> rate takes precedence and converts each day at its own historical rate.
+    Reads the DailyTotal rollup, so the cost is proportional to days, not transactions.
+    Pass totals_by_day ({date: total}) when the caller already has them to skip the query,
+    or the user's cached ledger (tracker.ledger_cache) to sum it in memory instead.
+    """
+    today = timezone.localdate()
+    start_date = today - timedelta(days=days - 1)
 
-        labels.append(d.strftime("%d %b"))
-        if display_rate:
-            series.append(float(convert(total_eur, display_rate)))
-        else:
-            series.append(float(total_eur))
+    if totals_by_day is None and ledger is not None:
+        totals_by_day = {
+            day: from_cents(cents)
+            for day, cents in ledger.by_day(start_date, today, Transaction.Type.EXPENSE).items()
+        }
+    if totals_by_day is None:
+        daily_qs = (
+            DailyTotal.objects
+            .filter(
+                user=user,
+                type=Transaction.Type.EXPENSE,
+                date__gte=start_date,
+                date__lte=today
+            )
+            .values("date")
+            .annotate(total=Sum("total"))
+            .order_by("date")
+        )
+
+        totals_by_day = {row["date"]: row["total"] for row in daily_qs}
+
+    day_list = [start_date + timedelta(days=i) for i in range(days)]
+    labels = [d.isoformat() for d in day_list]
+    cents = [to_cents(totals_by_day.get(d, 0) or 0) for d in day_list]
+
+    rates = _rates_by_day(day_list, rate_on) if rate_on else [display_rate or None] * days
+    series = [c / 100 for c in _or_unconverted(convert_series(cents, rates), cents)]
 
     return days, labels, series
 
 
+# -----------------------------
+# Trend range (?range=)
+# -----------------------------
+# range -> (days, or None for the whole history; bucket granularity)
+TREND_RANGES = {
+    "7d": (7, "day"),
+    "30d": (30, "day"),
+    "90d": (90, "day"),
+    "1y": (365, "week"),
+    "all": (None, "month"),
+}
+TREND_RANGE_LABELS = {
+    "7d": "last 7 days",
+    "30d": "last 30 days",
+    "90d": "last 90 days",
+    "1y": "last 12 months",
+    "all": "all time",
+}
+DEFAULT_TREND_RANGE = "30d"
+TREND_MAX_POINTS = 60  # longer series are downsampled (LTTB) to keep the chart payload bounded
+BAR_DAYS = 14  # daily budget vs expenses bars
+
+
+def _bucket_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _bucket_days(start, granularity):
+    if granularity == "week":
+        return 7
+    return calendar.monthrange(start.year, start.month)[1]
+
+
+def _build_bucketed_trend(user, start, today, granularity, display_currency, fallback_rate=None):
+    """
+    Returns (labels, series, bucket_days) of weekly or monthly expense totals from start
+    (None = the user's whole history) to today. Buckets are summed in SQL over the rollup,
+    each day converted at its own rate first (as the daily series is); empty buckets are 0.
+    """
+    trunc = TruncWeek if granularity == "week" else TruncMonth
+    qs = DailyTotal.objects.filter(user=user, type=Transaction.Type.EXPENSE, date__lte=today)
+    if start is not None:
+        qs = qs.filter(date__gte=start)
+    amount = display_amount_expression("total", display_currency, fallback_rate) or F("total")
+    rows = (
+        qs.annotate(bucket=trunc("date", output_field=DateField()))
+        .values("bucket")
+        .annotate(total=Sum(amount))
+        .order_by("bucket")
+    )
+    totals = {row["bucket"]: row["total"] or 0 for row in rows}
+    return _fill_buckets(totals, start, today, granularity)
+
+
+def _build_ledger_bucketed_trend(ledger, start, today, granularity, rate_on=None):
+    """
+    _build_bucketed_trend() from the user's cached ledger: daily expense totals summed in
+    memory, each day converted at its own rate, then added up per bucket.
+    """
+    by_day = ledger.by_day(start or date.min, today, Transaction.Type.EXPENSE)
+    day_list = sorted(by_day)
+    cents = [by_day[day] for day in day_list]
+    converted = _or_unconverted(convert_series(cents, _rates_by_day(day_list, rate_on)), cents)
+
+    totals = {}
+    for day, value in zip(day_list, converted):
+        bucket = _bucket_start(day, granularity)
+        totals[bucket] = totals.get(bucket, 0) + value
+    return _fill_buckets({bucket: from_cents(value) for bucket, value in totals.items()}, start, today, granularity)
+
+
+def _fill_buckets(totals, start, today, granularity):
+    """
+    (labels, series, bucket_days) for {bucket start: total}, with empty buckets as 0.
+    """
+    if not totals:
+        return [], [], []
+
+    labels, series, days = [], [], []
+    bucket = _bucket_start(start, granularity) if start is not None else min(totals)
+    last = _bucket_start(today, granularity)
+    while bucket <= last:
+        labels.append(bucket.isoformat())
+        series.append(float(totals.get(bucket, 0)))
+        days.append(_bucket_days(bucket, granularity))
+        bucket += timedelta(days=days[-1])
+    return labels, series, days
+
+
 def home(request):
     return render(request, "core/home.html")
 
 
-@login_required
-def dashboard(request):
-    today = timezone.localdate()
-    month_start = today.replace(day=1)
+def metrics(request):
+    """
+    Prometheus scrape endpoint, merged across worker processes (see services.metrics).
+    Requires "Authorization: Bearer <METRICS_TOKEN>" when a token is set; without one it
+    is only served with DEBUG on.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        if not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return HttpResponse("Unauthorized", status=401, content_type="text/plain")
+    elif not settings.DEBUG:
+        raise Http404
 
-    tx = Transaction.objects.filter(
-        user=request.user,
-        date__gte=month_start,
-        date__lte=today
-    )
+    return HttpResponse(metrics_registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
-    income = tx.filter(type=Transaction.Type.INCOME).aggregate(total=Sum("amount"))["total"] or 0
-    expense = tx.filter(type=Transaction.Type.EXPENSE).aggregate(total=Sum("amount"))["total"] or 0
 
-    budgets = Budget.objects.filter(user=request.user, month=month_start).select_related("category")
-    total_budget = budgets.filter(category__isnull=True).aggregate(total=Sum("amount"))["total"] or 0
+# Always listed on the exchange rates card, after the display currency
+FEATURED_RATES = ("USD", "GBP")
 
-    # -----------------------------
-    # Currency selection (display only)
-    # -----------------------------
-    allowed = ("EUR", "USD", "GBP")
 
-    selected = request.GET.get("currency")
-    if selected in allowed:
-        request.session["display_currency"] = selected
+def _dashboard_currency(request):
+    """
+    ?currency= (remembered in the session) or the session's display currency; anything
+    outside the currency registry falls back to EUR.
+    """
+    selected = get_currency(request.GET.get("currency"))
+    if selected is not None:
+        request.session["display_currency"] = selected.code
+
+    return currency_or_base(request.session.get("display_currency")).code
 
-    display_currency = request.session.get("display_currency", "EUR")
-    if display_currency not in allowed:
-        display_currency = "EUR"
 
-    symbol_map = {"EUR": "€", "USD": "$", "GBP": "£"}
+def _trend_range(request):
+    trend_range = request.GET.get("range")
+    return trend_range if trend_range in TREND_RANGES else DEFAULT_TREND_RANGE
+
+
+def _dashboard_variant(request):
+    # The page itself shows no amounts or rates, only the display currency's name
+    return (_dashboard_currency(request),)
 
-    # -----------------------------
-    # FX rates (base EUR)
-    # -----------------------------
-    fx = None
-    fx_error = None
-    fx_date = None
 
+def _section_variant(request):
+    section = request.resolver_match.kwargs.get("section")
+    return display_variant(_dashboard_currency(request), always_fx=section == "rates")
+
+
+def _dashboard_cache_key(user, version, display_currency, today):
+    """
+    Everything the computed dashboard depends on: the user's data version, the display
+    currency, the loaded rate history and the day, since every window is relative to
+    timezone.localdate(). Parts are cached under "<key>:<part>"; parts converted at the
+    live rate add its table date (see _fx_part).
+    """
+    return ":".join((
+        "dashboard",
+        str(user.pk),
+        str(version),
+        display_currency,
+        rate_history_version(),
+        today.isoformat(),
+    ))
+
+
+DashboardScope = namedtuple("DashboardScope", "user version today display_currency display_symbol cache_key")
+DashboardFx = namedtuple("DashboardFx", "fx fx_date fx_error rate")
+NO_FX = DashboardFx(None, None, None, None)
+
+
+def _dashboard_scope(request):
+    """
+    What the dashboard page and its data endpoints resolve first: the day, the display
+    currency and the cache key for the user's current data version. No FX: only the
+    parts that convert (or show the rates) look the table up, see _dashboard_fx.
+    """
+    display_currency = _dashboard_currency(request)
+    today = timezone.localdate()
+    version = ledger_state(request).version
+    return DashboardScope(
+        user=request.user,
+        version=version,
+        today=today,
+        display_currency=display_currency,
+        display_symbol=currency_or_base(display_currency).symbol,
+        cache_key=_dashboard_cache_key(request.user, version, display_currency, today),
+    )
+
+
+def _fx(scope, fx, fx_error):
+    rate = fx.rates.get(scope.display_currency) if fx and scope.display_currency != "EUR" else None
+    return DashboardFx(fx=fx, fx_date=fx.date if fx else None, fx_error=fx_error, rate=rate)
+
+
+def _dashboard_fx(scope, always=False):
+    """
+    The FX table (base EUR), when the display currency needs converting into or `always`
+    (the rates card); EUR parts skip the lookup.
+    """
+    if scope.display_currency == "EUR" and not always:
+        return NO_FX
     try:
-        fx = get_latest_rates(base="EUR", symbols=("USD", "GBP"))
-        fx_date = fx.date
+        return _fx(scope, get_latest_rates(base="EUR", symbols=None), None)  # the whole cached table
     except Exception:
-        fx_error = "Rates unavailable right now."
+        return _fx(scope, None, "Rates unavailable right now.")
+
 
-    rate = None
-    if display_currency != "EUR" and fx:
-        rate = fx.rates.get(display_currency)
+def _fx_part(part, scope, fx):
+    """
+    Cache part name for data converted into the display currency: it changes with the
+    live table the fallback rate comes from.
+    """
+    if scope.display_currency == "EUR":
+        return part
+    return f"{part}:{fx.fx_date or '-'}"
 
-    # Converted totals (for display)
-    display_income = convert(income, rate) if rate else income
-    display_expense = convert(expense, rate) if rate else expense
-    display_net = convert(income - expense, rate) if rate else (income - expense)
 
-    # -----------------------------
-    # Line trend chart data (last 30 days)
-    # -----------------------------
-    trend_days, trend_labels, trend_series = _build_trend_series(
-        request.user,
-        display_rate=rate,
-        days=30
+def _cached(scope, part, compute):
+    """
+    Cached until the user's next write (or the day/rates change). get_or_set: concurrent
+    misses for the same part (several tabs, or several data requests) compute it once.
+    """
+    computed = []
+
+    def fill():
+        computed.append(True)
+        return compute()
+
+    value = cache.get_or_set(f"{scope.cache_key}:{part}", fill, settings.DASHBOARD_CACHE_TIMEOUT)
+    metrics_registry.inc(
+        "cache_requests_total", cache="dashboard", part=part.split(":")[0], result="miss" if computed else "hit",
     )
+    return value
+
+
+def _month_rollup(scope, fx):
+    """
+    Month-to-date totals and spending by category, from one rollup query.
+    """
+    month_start = scope.today.replace(day=1)
+    # Historical rates (FxRate) convert each day at its own rate, without any network
+    # call; days after the last loaded publication fall back to the latest rate.
+    rate_on = rate_lookup(scope.display_currency, fallback=fx.rate)
+    return _summarise_rollup(scope.user, month_start, month_start, scope.today, rate_on=rate_on)
+
+
+def _month_budgets(scope):
+    # Overall + per-category budgets in one query
+    budgets = list(Budget.objects.filter(user=scope.user, month=scope.today.replace(day=1)).select_related("category"))
+    return {
+        "total_budget": sum(b.amount for b in budgets if b.category_id is None),
+        "category_budgets": [
+            (b.category_id, b.category.name, b.amount) for b in budgets if b.category_id is not None
+        ],
+    }
+
+
+def _month_data(scope, fx):
+    """
+    The rollup shared by the cards, the breakdown and the insights.
+    """
+    return _cached(scope, _fx_part("month", scope, fx), lambda: _month_rollup(scope, fx))
+
+
+def _budget_data(scope):
+    return _cached(scope, "budgets", lambda: _month_budgets(scope))
+
+
+def _trend_points(scope, fx, trend_range):
+    """
+    (labels, series, bucket_days) of the range's line: daily points or weekly/monthly
+    buckets, summed from the user's cached ledger when the ledger cache is on, else in SQL.
+    """
+    trend_days, trend_granularity = TREND_RANGES[trend_range]
+    rate_on = rate_lookup(scope.display_currency, fallback=fx.rate)
+    ledger = get_ledger(scope.user.pk, scope.version)
+    if trend_granularity == "day":
+        _, labels, series = _build_trend_series(scope.user, days=trend_days, rate_on=rate_on, ledger=ledger)
+        return labels, series, [1] * len(labels)
+
+    trend_start = scope.today - timedelta(days=trend_days - 1) if trend_days else None
+    if ledger is not None:
+        return _build_ledger_bucketed_trend(ledger, trend_start, scope.today, trend_granularity, rate_on)
+    return _build_bucketed_trend(
+        scope.user, trend_start, scope.today, trend_granularity, scope.display_currency, fx.rate,
+    )
+
+
+def _dashboard_trend(scope, fx, budgets, trend_range, points=None):
+    """
+    Line trend chart data (?range=), with the budget limit line, and the daily bars
+    (last BAR_DAYS days, whatever the range). Pass points (see _trend_points) when the
+    caller already has them.
+    """
+    trend_days, trend_granularity = TREND_RANGES[trend_range]
+    if points is None:
+        points = _trend_points(scope, fx, trend_range)
+    trend_labels, trend_series, trend_bucket_days = points
+
+    # Daily ranges of at least BAR_DAYS already end with the bars; the others need their own days
+    if trend_granularity == "day" and trend_days >= BAR_DAYS:
+        bar_labels, bar_series = trend_labels[-BAR_DAYS:], trend_series[-BAR_DAYS:]
+    else:
+        _, bar_labels, bar_series = _build_trend_series(
+            scope.user,
+            days=BAR_DAYS,
+            rate_on=rate_lookup(scope.display_currency, fallback=fx.rate),
+            ledger=get_ledger(scope.user.pk, scope.version),
+        )
 
     # -----------------------------
     # Budget limit line (monthly overall budget -> daily limit)
     # -----------------------------
-    days_in_month = calendar.monthrange(month_start.year, month_start.month)[1]
+    total_budget = budgets["total_budget"]
+    days_in_month = calendar.monthrange(scope.today.year, scope.today.month)[1]
 
     daily_budget_limit_eur = None
     if total_budget and total_budget > 0 and days_in_month:
@@ -127,149 +481,323 @@ def dashboard(request):
 
     daily_budget_limit_display = None
     if daily_budget_limit_eur is not None:
-        daily_budget_limit_display = float(convert(daily_budget_limit_eur, rate)) if rate else daily_budget_limit_eur
+        daily_budget_limit_display = (
+            float(convert(daily_budget_limit_eur, fx.rate)) if fx.rate else daily_budget_limit_eur
+        )
 
     trend_budget_line = None
+    bar_budget = None
     if daily_budget_limit_display is not None:
-        trend_budget_line = [float(daily_budget_limit_display)] * len(trend_labels)
+        trend_budget_line = [float(daily_budget_limit_display) * days for days in trend_bucket_days]
+        bar_budget = [float(daily_budget_limit_display)] * len(bar_labels)
+
+    if len(trend_series) > TREND_MAX_POINTS:
+        keep = lttb(trend_series, TREND_MAX_POINTS)
+        trend_labels = [trend_labels[i] for i in keep]
+        trend_series = [trend_series[i] for i in keep]
+        if trend_budget_line:
+            trend_budget_line = [trend_budget_line[i] for i in keep]
+
+    return {
+        "range": trend_range,
+        "range_label": TREND_RANGE_LABELS[trend_range],
+        "granularity": trend_granularity,
+        "labels": trend_labels,
+        "series": trend_series,
+        "budget_line": trend_budget_line,
+        "bar_labels": bar_labels,
+        "bar_series": bar_series,
+        "bar_budget": bar_budget,
+        "daily_budget_limit": daily_budget_limit_display,
+    }
 
-    # -----------------------------
-    # Doughnut chart: spending by category (month-to-date)
-    # + breakdown table: amount + percent
-    # -----------------------------
-    spend_rows = (
-        Transaction.objects.filter(
-            user=request.user,
-            type=Transaction.Type.EXPENSE,
-            date__gte=month_start,
-            date__lte=today
-        )
-        .values("category__name")
-        .annotate(total=Sum("amount"))
-        .order_by("-total")
-    )
 
-    total_spend_eur = sum((r["total"] or 0) for r in spend_rows) or 0
+def _dashboard_summary(month, budgets):
+    """
+    The month-to-date cards: EUR totals, the same converted at each day's rate and the
+    overall budget, as "1234.50" strings (for the template and the JSON alike).
+    """
+    income = Money.of(month["income"])
+    expense = Money.of(month["expense"])
+    display_income = Money.of(month["display_income"])
+    display_expense = Money.of(month["display_expense"])
+    return {
+        "income": str(income),
+        "expense": str(expense),
+        "net": str(income - expense),
+        "display_income": str(display_income),
+        "display_expense": str(display_expense),
+        "display_net": str(display_income - display_expense),
+        "total_budget": str(Money.of(budgets["total_budget"])) if budgets["total_budget"] else None,
+    }
+
+
+def _dashboard_breakdown(month):
+    """
+    Doughnut chart: spending by category (month-to-date) + breakdown table: amount + percent.
+    """
+    spend_rows = month["spend_by_category"]
+    total_spend_eur = sum(total for _, _, total, _ in spend_rows) or 0
 
-    spend_pie_labels = []
-    spend_pie_series = []
-    spend_breakdown = []
+    labels = []
+    series = []
+    rows = []
 
-    for r in spend_rows:
-        name = r["category__name"] or "Uncategorised"
-        total_eur = r["total"] or 0
+    for _, category_name, total_eur, total_display in spend_rows:
+        name = category_name or "Uncategorised"
 
-        amount_display = float(convert(total_eur, rate)) if rate else float(total_eur)
+        amount_display = float(total_display)
 
-        spend_pie_labels.append(name)
-        spend_pie_series.append(amount_display)
+        labels.append(name)
+        series.append(amount_display)
 
         pct = 0
         if total_spend_eur:
             pct = round((float(total_eur) / float(total_spend_eur)) * 100)
 
-        spend_breakdown.append({
+        rows.append({
             "name": name,
             "amount": f"{amount_display:,.2f}",
             "percent": pct,
         })
 
-    # -----------------------------
-    # Budget insights (EUR-based for correctness)
-    # -----------------------------
+    return {"labels": labels, "series": series, "rows": rows}
+
+
+def _dashboard_insights(month, budgets):
+    """
+    Budget insights (EUR-based for correctness).
+    """
+    total_budget = Money.of(budgets["total_budget"])
+    expense = Money.of(month["expense"])
+
     insights = []
     insight_level = "secondary"
 
-    if total_budget and total_budget > 0:
+    if total_budget > 0:
         remaining = total_budget - expense
-        pct_used = float((expense / total_budget) * 100) if total_budget else 0.0
+        pct_used = float((expense / total_budget) * 100)
 
         if remaining < 0:
             insight_level = "danger"
-            insights.append(f"You are over your overall budget by €{abs(remaining):.2f} this month.")
+            insights.append(f"You are over your overall budget by {abs(remaining).format()} this month.")
         elif pct_used >= 90:
             insight_level = "warning"
-            insights.append(f"You have used {pct_used:.0f}% of your overall budget. Remaining: €{remaining:.2f}.")
+            insights.append(f"You have used {pct_used:.0f}% of your overall budget. Remaining: {remaining.format()}.")
         else:
             insight_level = "success"
-            insights.append(f"You have used {pct_used:.0f}% of your overall budget. Remaining: €{remaining:.2f}.")
+            insights.append(f"You have used {pct_used:.0f}% of your overall budget. Remaining: {remaining.format()}.")
     else:
         insights.append("No overall budget set for this month yet. Add one in Budgets to track progress.")
 
-    category_budgets = budgets.exclude(category__isnull=True)
-    if category_budgets.exists():
-        spend_rows2 = (
-            Transaction.objects.filter(
-                user=request.user,
-                type=Transaction.Type.EXPENSE,
-                date__gte=month_start,
-                date__lte=today,
-                category__isnull=False
-            )
-            .values("category_id", "category__name")
-            .annotate(total=Sum("amount"))
-        )
-        spend_map = {r["category_id"]: (r["category__name"], r["total"] or 0) for r in spend_rows2}
+    if budgets["category_budgets"]:
+        # Same result set as the doughnut
+        spend_map = {
+            category_id: (name, Money.of(total))
+            for category_id, name, total, _ in month["spend_by_category"]
+            if category_id is not None
+        }
 
         best = None  # (pct_used, name, spent, budget_amount)
-        for b in category_budgets:
-            spent_name, spent = spend_map.get(b.category_id, (b.category.name, 0))
-            if b.amount and b.amount > 0:
-                pct = float((spent / b.amount) * 100)
-                candidate = (pct, spent_name, spent, b.amount)
+        for category_id, category_name, amount in budgets["category_budgets"]:
+            spent_name, spent = spend_map.get(category_id, (category_name, Money()))
+            amount = Money.of(amount)
+            if amount > 0:
+                pct = float((spent / amount) * 100)
+                candidate = (pct, spent_name, spent, amount)
                 if (best is None) or (candidate[0] > best[0]):
                     best = candidate
 
         if best:
             pct, name, spent, budget_amt = best
+            usage = f"{spent.format()} / {budget_amt.format()} ({pct:.0f}%)"
             if pct >= 100:
-                insights.append(f"⚠ {name} is over budget: €{spent:.2f} / €{budget_amt:.2f} ({pct:.0f}%).")
+                insights.append(f"⚠ {name} is over budget: {usage}.")
             elif pct >= 80:
-                insights.append(f"{name} is close to budget: €{spent:.2f} / €{budget_amt:.2f} ({pct:.0f}%).")
+                insights.append(f"{name} is close to budget: {usage}.")
             else:
-                insights.append(f"Top category usage: {name} €{spent:.2f} / €{budget_amt:.2f} ({pct:.0f}%).")
+                insights.append(f"Top category usage: {name} {usage}.")
 
-    context = {
-        "today": today,
-        "month_start": month_start,
+    return {"level": insight_level, "lines": insights}
 
-        # Raw EUR totals
-        "income": income,
-        "expense": expense,
-        "net": income - expense,
 
-        # Budgets
-        "total_budget": total_budget,
+def _dashboard_rates(scope, fx):
+    """
+    Exchange rates card: the display currency's rate first, then FEATURED_RATES.
+    """
+    return {
+        "base": fx.fx.base if fx.fx else None,
+        "date": fx.fx_date,
+        "stale": bool(fx.fx and fx.fx.stale),
+        "error": fx.fx_error,
+        "rates": [
+            {"code": code, "rate": str(fx.fx.rates[code]) if code in fx.fx.rates else None}
+            for code in dict.fromkeys((scope.display_currency, *FEATURED_RATES))
+            if code != "EUR"
+        ] if fx.fx else [],
+    }
+
+
+def _dashboard_context(scope, trend_range, summary=None, rates=None):
+    """
+    The page's context. Without summary/rates the cards and the rates card load from
+    dashboard_data like the charts do.
+    """
+    return {
+        "today": scope.today,
+        "month_start": scope.today.replace(day=1),
+
+        # Month-to-date cards and exchange rates, when rendered with the page
+        "summary": summary,
+        "rates": rates,
+
+        # Trend range (the chart data itself comes from dashboard_data)
+        "trend_range": trend_range,
+        "trend_range_label": TREND_RANGE_LABELS[trend_range],
+        "trend_ranges": TREND_RANGE_LABELS,
 
         # Currency display
-        "display_currency": display_currency,
-        "display_symbol": symbol_map.get(display_currency, "€"),
-        "display_income": display_income,
-        "display_expense": display_expense,
-        "display_net": display_net,
-
-        # FX
-        "fx": fx,
-        "fx_date": fx_date,
-        "fx_error": fx_error,
-
-        # Trend charts
-        "trend_days": trend_days,
-        "trend_labels": trend_labels,
-        "trend_series": trend_series,
-
-        # Budget limit (daily) for charts
-        "daily_budget_limit": daily_budget_limit_display,
-        "trend_budget_line": trend_budget_line,
+        "display_currency": scope.display_currency,
+        "display_symbol": scope.display_symbol,
+        "currency_choices": CURRENCY_CHOICES,
+    }
+
+
+@login_required
+@ledger_conditional(_dashboard_variant)
+def dashboard(request):
+    """
+    A shell: the cards, charts, breakdown, insights and rates are all fetched from
+    dashboard_data after first paint, so the page waits on neither an aggregate nor the
+    FX table.
+    """
+    scope = _dashboard_scope(request)
+    return render(request, "core/dashboard.html", _dashboard_context(scope, _trend_range(request)))
+
+
+# -----------------------------
+# Async dashboard (ASGI workers)
+# -----------------------------
+async def _in_thread(fn, *args):
+    """
+    fn(*args) on a worker thread of its own instead of the request's thread-sensitive one,
+    so independent queries overlap. The pool's threads keep their connections between
+    calls and, like request threads, drop them once broken or older than CONN_MAX_AGE.
+    """
+    spans = perf.current()
+
+    def run():
+        close_old_connections()
+        try:
+            if spans is None:
+                return fn(*args)
+            with record_queries(spans):
+                return fn(*args)
+        finally:
+            close_old_connections()
+
+    return await sync_to_async(run, thread_sensitive=False)()
+
+
+
+async def _adashboard_variant(request):
+    return await adisplay_variant(await sync_to_async(_dashboard_currency)(request), always_fx=True)
 
-        # Doughnut + metrics
-        "spend_pie_labels": spend_pie_labels,
-        "spend_pie_series": spend_pie_series,
-        "spend_breakdown": spend_breakdown,
 
-        # Insights
-        "budget_insights": insights,
-        "insight_level": insight_level,
+async def _adashboard_fx(scope):
+    try:
+        return _fx(scope, await aget_latest_rates(base="EUR", symbols=None), None)
+    except Exception:
+        return _fx(scope, None, "Rates unavailable right now.")
+
+
+@login_required
+@ledger_conditional(_adashboard_variant)
+async def dashboard_async(request):
+    """
+    dashboard() for ASGI workers, where waiting doesn't hold a worker: the page is
+    rendered with its cards and rates. The FX table is awaited, and on a cache miss the
+    month rollup, the budgets and the trend queries run at the same time. Every part is
+    cached for the data requests the page makes next.
+    """
+    scope = await sync_to_async(_dashboard_scope)(request)
+    fx = await _adashboard_fx(scope)
+    trend_range = _trend_range(request)
+    keys = {
+        part: f"{scope.cache_key}:{name}"
+        for part, name in (
+            ("month", _fx_part("month", scope, fx)),
+            ("budgets", "budgets"),
+            ("trend", _fx_part(f"trend:{trend_range}", scope, fx)),
+        )
     }
+    timeout = settings.DASHBOARD_CACHE_TIMEOUT
+
+    cached = await cache.aget_many(keys.values())
+    parts = {part: cached.get(key) for part, key in keys.items()}
+    for part, value in parts.items():
+        metrics_registry.inc(
+            "cache_requests_total", cache="dashboard", part=part, result="miss" if value is None else "hit",
+        )
+
+    queries = {}
+    if parts["month"] is None:
+        queries["month"] = _in_thread(_month_rollup, scope, fx)
+    if parts["budgets"] is None:
+        queries["budgets"] = _in_thread(_month_budgets, scope)
+    if parts["trend"] is None:
+        queries["points"] = _in_thread(_trend_points, scope, fx, trend_range)
+    computed = dict(zip(queries, await asyncio.gather(*queries.values())))
+    points = computed.pop("points", None)
+    parts.update(computed)
+    if points is not None:
+        parts["trend"] = computed["trend"] = await _in_thread(
+            _dashboard_trend, scope, fx, parts["budgets"], trend_range, points,
+        )
+    if computed:
+        await cache.aset_many({keys[part]: value for part, value in computed.items()}, timeout)
+
+    context = _dashboard_context(
+        scope, trend_range,
+        summary=_dashboard_summary(parts["month"], parts["budgets"]),
+        rates=_dashboard_rates(scope, fx),
+    )
+    return await sync_to_async(render)(request, "core/dashboard.html", context)
+
+
+DASHBOARD_SECTIONS = ("summary", "trend", "breakdown", "insights", "rates")
+
+
+@login_required
+@ledger_conditional(_section_variant)
+def dashboard_data(request, section):
+    """
+    JSON for one dashboard widget (DASHBOARD_SECTIONS). Each is validated (ETag) and
+    cached on its own and computes only the parts it shows: a slow aggregate only delays
+    its own widget, and EUR sections other than the rates never look up FX.
+    """
+    if section not in DASHBOARD_SECTIONS:
+        raise Http404
+
+    scope = _dashboard_scope(request)
+    fx = _dashboard_fx(scope, always=section == "rates")
+    if section == "summary":
+        data = _dashboard_summary(_month_data(scope, fx), _budget_data(scope))
+    elif section == "trend":
+        trend_range = _trend_range(request)
+        data = _cached(
+            scope, _fx_part(f"trend:{trend_range}", scope, fx),
+            lambda: _dashboard_trend(scope, fx, _budget_data(scope), trend_range),
+        )
+    elif section == "breakdown":
+        data = _dashboard_breakdown(_month_data(scope, fx))
+    elif section == "insights":
+        data = _dashboard_insights(_month_data(scope, fx), _budget_data(scope))
+    else:
+        data = _dashboard_rates(scope, fx)
 
-    return render(request, "core/dashboard.html", context)
+    return JsonResponse({
+        "display_currency": scope.display_currency,
+        "display_symbol": scope.display_symbol,
+        **data,
+    })
@@ -36,6 +36,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "core.middleware.PerformanceMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -48,7 +49,8 @@ ROOT_URLCONF = "finance_tracker.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # Django's backend + render timing for PerformanceMiddleware
+        "BACKEND": "core.templating.TimedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -63,6 +65,20 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "finance_tracker.wsgi.application"
+# Alternative deployment: gunicorn -k uvicorn.workers.UvicornWorker (see README)
+ASGI_APPLICATION = "finance_tracker.asgi.application"
+
+# =========================
+# PERFORMANCE INSTRUMENTATION (core.middleware.PerformanceMiddleware)
+# =========================
+PERF_SAMPLE_RATE = float(os.environ.get("PERF_SAMPLE_RATE", "1.0"))  # fraction of requests timed
+PERF_SLOW_REQUEST_MS = int(os.environ.get("PERF_SLOW_REQUEST_MS", "500"))  # log slower requests
+PERF_SLOW_QUERY_COUNT = int(os.environ.get("PERF_SLOW_QUERY_COUNT", "5"))  # slowest SQL per slow log
+PERF_SERVER_TIMING = os.environ.get("PERF_SERVER_TIMING", "1") == "1"
+
+# /metrics: per-worker snapshots are merged from this directory (unset = this process only)
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")  # required as a Bearer token when set
 
 # =========================
 # DATABASE (Postgres on Render / SQLite locally)
@@ -125,13 +141,39 @@ if not DEBUG:
     SECURE_SSL_REDIRECT = True
     SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 
+# Two tiers (core.cache): a per-process LRU in front of the database cache table, which
+# every worker shares (created by `manage.py createcachetable` in build.sh).
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "pft-cache",
-    }
+        "BACKEND": "core.cache.TwoTierCache",
+        "LOCATION": "pft-l1",
+        "OPTIONS": {
+            "L2": "shared",
+            "L1_MAX_ENTRIES": int(os.environ.get("CACHE_L1_MAX_ENTRIES", 1000)),
+            "L1_TIMEOUT": float(os.environ.get("CACHE_L1_TIMEOUT", 5)),
+        },
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "pft_cache",
+        "OPTIONS": {"MAX_ENTRIES": 50000},
+    },
 }
 
+# Computed dashboard data + template fragments; keys carry the user's data version, so
+# writes invalidate immediately and this only bounds how long unused entries linger.
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get("DASHBOARD_CACHE_TIMEOUT", 60 * 60))
+
+# Per-process columnar copies of users' ledgers for range analytics (tracker.ledger_cache),
+# evicted least recently used past this many bytes. 0 turns the cache off.
+LEDGER_CACHE_MAX_BYTES = int(os.environ.get("LEDGER_CACHE_MAX_BYTES", 0))
+
+# =========================
+# FX (services.currency)
+# =========================
+# Point at a local stub server for offline testing / load tests.
+FX_LATEST_URL = os.environ.get("FX_LATEST_URL", "https://api.frankfurter.app/latest")
+
 # -------------------------
 # Testing: fix to avoid staticfiles manifest storage errors
 # -------------------------
@@ -0,0 +1,100 @@
+"""
+Currency registry: every currency in the ECB reference table (the rates behind
+services.currency) plus EUR itself, with its display symbol, minor-unit decimals and
+display format.
+
+The registry is built once, at import, into a read-only mapping; views validate the
+display currency against it and forms/selects list its choices, so supporting a newly
+published currency is one line in _REGISTRY.
+"""
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple, Union
+
+from services.currency import ECB_BASE
+
+Number = Union[int, float, Decimal]
+
+
+@dataclass(frozen=True)
+class Currency:
+    code: str
+    name: str
+    symbol: str
+    decimals: int = 2
+    pattern: str = "{symbol}{amount}"  # "{amount} {symbol}" where the symbol trails
+
+    @property
+    def label(self) -> str:
+        return f"{self.code} ({self.symbol})"
+
+    def format(self, amount: Number) -> str:
+        """
+        `amount` rounded half-up to the currency's decimals, with thousands separators
+        and the symbol placed as the currency writes it: "$1,234.50", "1,234.50 kr".
+        """
+        value = amount if isinstance(amount, Decimal) else Decimal(str(amount))
+        value = value.quantize(Decimal(1).scaleb(-self.decimals), rounding=ROUND_HALF_UP)
+        sign = "-" if value < 0 else ""
+        return sign + self.pattern.format(symbol=self.symbol, amount=f"{abs(value):,.{self.decimals}f}")
+
+
+_TRAILING = "{amount} {symbol}"
+_SPACED = "{symbol} {amount}"
+
+# (code, name, symbol, decimals, pattern); decimals are ISO 4217 minor units
+_REGISTRY = (
+    ("EUR", "Euro", "€", 2, None),
+    ("USD", "US dollar", "$", 2, None),
+    ("JPY", "Japanese yen", "¥", 0, None),
+    ("CZK", "Czech koruna", "Kč", 2, _TRAILING),
+    ("DKK", "Danish krone", "kr.", 2, _TRAILING),
+    ("GBP", "Pound sterling", "£", 2, None),
+    ("HUF", "Hungarian forint", "Ft", 2, _TRAILING),
+    ("PLN", "Polish zloty", "zł", 2, _TRAILING),
+    ("RON", "Romanian leu", "lei", 2, _TRAILING),
+    ("SEK", "Swedish krona", "kr", 2, _TRAILING),
+    ("CHF", "Swiss franc", "CHF", 2, _SPACED),
+    ("ISK", "Icelandic krona", "kr", 0, _TRAILING),
+    ("NOK", "Norwegian krone", "kr", 2, _TRAILING),
+    ("TRY", "Turkish lira", "₺", 2, None),
+    ("AUD", "Australian dollar", "A$", 2, None),
+    ("BRL", "Brazilian real", "R$", 2, None),
+    ("CAD", "Canadian dollar", "C$", 2, None),
+    ("CNY", "Chinese yuan renminbi", "CN¥", 2, None),
+    ("HKD", "Hong Kong dollar", "HK$", 2, None),
+    ("IDR", "Indonesian rupiah", "Rp", 2, None),
+    ("ILS", "Israeli shekel", "₪", 2, None),
+    ("INR", "Indian rupee", "₹", 2, None),
+    ("KRW", "South Korean won", "₩", 0, None),
+    ("MXN", "Mexican peso", "MX$", 2, None),
+    ("MYR", "Malaysian ringgit", "RM", 2, None),
+    ("NZD", "New Zealand dollar", "NZ$", 2, None),
+    ("PHP", "Philippine peso", "₱", 2, None),
+    ("SGD", "Singapore dollar", "S$", 2, None),
+    ("THB", "Thai baht", "฿", 2, None),
+    ("ZAR", "South African rand", "R", 2, _SPACED),
+)
+
+CURRENCIES: Mapping[str, Currency] = MappingProxyType({
+    code: Currency(code, name, symbol, decimals, pattern or Currency.pattern)
+    for code, name, symbol, decimals, pattern in _REGISTRY
+})
+
+# (code, label) pairs for selects, EUR first
+CURRENCY_CHOICES: Tuple[Tuple[str, str], ...] = tuple((c.code, c.label) for c in CURRENCIES.values())
+
+
+def get_currency(code: Optional[str]) -> Optional[Currency]:
+    """
+    The registry entry for an ISO code (any case), or None if it isn't supported.
+    """
+    return CURRENCIES.get((code or "").strip().upper())
+
+
+def currency_or_base(code: Optional[str]) -> Currency:
+    """
+    The registry entry for `code`, falling back to the base currency (EUR) for unknown codes.
+    """
+    return get_currency(code) or CURRENCIES[ECB_BASE]
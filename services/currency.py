@@ -1,57 +1,576 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import dataclass, replace
+from datetime import date, datetime, time as dt_time, timedelta
+from functools import lru_cache
+from math import gcd
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, Iterable, Union
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Union
+from zoneinfo import ZoneInfo
 
 import requests
+from django.conf import settings
 from django.core.cache import cache
+from django.db import connections
 
+from services import metrics, perf
+
+try:  # optional: vectorised batch conversion
+    import numpy as np
+except ImportError:  # pure-Python fallback below
+    np = None
+
+try:  # optional: non-blocking upstream calls for async views
+    import httpx
+except ImportError:  # requests on a worker thread instead
+    httpx = None
+
+
+logger = logging.getLogger(__name__)
 
 FRANKFURTER_LATEST = "https://api.frankfurter.app/latest"
 
+# The ECB publishes one reference table per business day (~16:00 CET). We fetch the
+# full EUR table once per publication and derive every base/symbol combination from it.
+ECB_BASE = "EUR"
+ECB_TIMEZONE = ZoneInfo("Europe/Berlin")
+ECB_PUBLISH_TIME = dt_time(16, 0)
+TABLE_CACHE_KEY = f"fx:table:{ECB_BASE}"
+
+MIN_FRESH_FOR = 60 * 60  # never refetch more than hourly, even if the provider lags the ECB
+REQUEST_TIMEOUT = 8
+LOCK_TIMEOUT = 30  # single-flight lock; outlives a timed-out request
+COLD_WAIT = REQUEST_TIMEOUT + 1  # how long a cold caller waits for another caller's fetch
+POLL_INTERVAL = 0.05
+CROSS_RATE_PLACES = Decimal("0.000001")
+
 
 @dataclass(frozen=True)
 class RatesResult:
     base: str
     date: str
     rates: Dict[str, Decimal]
+    # True when served from the last good copy because the entry is old or the provider is down
+    stale: bool = False
 
 
-def get_latest_rates(
-    base: str = "EUR",
-    symbols: Iterable[str] = ("USD", "GBP"),
-) -> RatesResult:
+@dataclass(frozen=True)
+class _CachedRates:
+    fetched_at: float
+    fresh_until: float
+    result: RatesResult
+
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _reset_stats() -> None:
+    # A forked worker starts with its own counters (and a lock no other thread can hold).
+    global _stats, _stats_lock
+    _stats = Counter()
+    _stats_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_stats)
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def fx_stats() -> Dict[str, int]:
     """
-    Fetch latest FX rates from Frankfurter and cache for 6 hours.
-    Frankfurter uses ECB reference rates 
+    Per-process counters: hit (fresh table), stale (served while refreshing),
+    miss (cold fetch), fetch (upstream calls) and error (failed upstream calls).
     """
-    symbols = tuple(symbols)
-    cache_key = f"fx:latest:{base}:{','.join(symbols)}"
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _stats_collector():
+    stats = fx_stats()
+    counters = {
+        metrics.counter_key("fx_cache_requests_total", result=result): stats.get(result, 0)
+        for result in ("hit", "stale", "miss")
+    }
+    errors = stats.get("error", 0)
+    counters[metrics.counter_key("fx_upstream_requests_total", outcome="ok")] = stats.get("fetch", 0) - errors
+    counters[metrics.counter_key("fx_upstream_requests_total", outcome="error")] = errors
+    return counters
 
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
 
-    params = {"from": base, "to": ",".join(symbols)}
-    response = requests.get(FRANKFURTER_LATEST, params=params, timeout=8)
+metrics.register_collector(_stats_collector)
+
+
+# transport(url, params, timeout) -> decoded JSON body; raises on HTTP/network errors
+Transport = Callable[[str, dict, float], dict]
+
+
+def _requests_transport(url: str, params: dict, timeout: float) -> dict:
+    response = requests.get(url, params=params, timeout=timeout)
     response.raise_for_status()
-    data = response.json()
+    return response.json()
+
+
+def _fetch_table(transport: Transport) -> RatesResult:
+    url = getattr(settings, "FX_LATEST_URL", FRANKFURTER_LATEST)
+    _count("fetch")
+    started = time.perf_counter()
+    try:
+        # No "to" parameter: the full table for the base, whatever symbols were asked for.
+        data = transport(url, {"from": ECB_BASE}, REQUEST_TIMEOUT)
+    except Exception:
+        _count("error")
+        raise
+    finally:
+        metrics.observe("fx_fetch_duration_seconds", time.perf_counter() - started)
+    return _table_from(data)
 
+
+def _table_from(data: dict) -> RatesResult:
     rates = {k: Decimal(str(v)) for k, v in data.get("rates", {}).items()}
 
-    result = RatesResult(
-        base=data.get("base", base),
+    return RatesResult(
+        base=data.get("base", ECB_BASE),
         date=data.get("date", ""),
         rates=rates,
     )
 
-    cache.set(cache_key, result, 60 * 60 * 6)  # cache for 6 hours
+
+def _fresh_until(table_date: str, fetched_at: float) -> float:
+    """
+    The next ECB publication after table_date (next weekday, 16:00 Frankfurt time),
+    but at least MIN_FRESH_FOR after the fetch.
+    """
+    try:
+        day = date.fromisoformat(table_date)
+    except ValueError:
+        return fetched_at + MIN_FRESH_FOR
+
+    day += timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    next_publication = datetime.combine(day, ECB_PUBLISH_TIME, tzinfo=ECB_TIMEZONE).timestamp()
+    return max(next_publication, fetched_at + MIN_FRESH_FOR)
+
+
+def _refresh(transport: Transport) -> RatesResult:
+    result = _fetch_table(transport)
+    now = time.time()
+    entry = _CachedRates(fetched_at=now, fresh_until=_fresh_until(result.date, now), result=result)
+    # No expiry: this is also the "last good" copy served during provider outages.
+    cache.set(TABLE_CACHE_KEY, entry, None)
     return result
 
 
+def _acquire(lock_key: str) -> Optional[str]:
+    token = uuid.uuid4().hex
+    return token if cache.add(lock_key, token, LOCK_TIMEOUT) else None
+
+
+def _release(lock_key: str, token: str) -> None:
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _refresh_in_background(transport: Transport) -> Optional[threading.Thread]:
+    """
+    Start a refresh unless another caller already holds the lock.
+    Returns the started thread (or None), mostly so tests can join it.
+    """
+    lock_key = f"{TABLE_CACHE_KEY}:lock"
+    token = _acquire(lock_key)
+    if token is None:
+        return None
+
+    def run():
+        try:
+            _refresh(transport)
+        except Exception:
+            logger.warning("Background FX refresh failed; serving last good rates", exc_info=True)
+        finally:
+            try:
+                _release(lock_key, token)
+            finally:
+                connections.close_all()  # this thread's own, opened by a database-backed cache
+
+    thread = threading.Thread(target=run, name="fx-refresh", daemon=True)
+    thread.start()
+    return thread
+
+
+@perf.timed("fx")
+def get_rate_table(transport: Optional[Transport] = None) -> RatesResult:
+    """
+    The full EUR reference table, fetched at most once per ECB publication.
+
+    Stale-while-revalidate: once a newer table is due the cached one is returned
+    immediately (stale=True) while one background refresh runs. Only one caller fetches
+    at a time (single-flight lock in the cache). The last good table never expires, so
+    provider outages degrade to old rates; an exception is raised only when nothing has
+    ever been fetched.
+    """
+    transport = transport or _requests_transport
+
+    cached = cache.get(TABLE_CACHE_KEY)
+    if cached:
+        if time.time() < cached.fresh_until:
+            _count("hit")
+            return cached.result
+        _count("stale")
+        _refresh_in_background(transport)
+        return replace(cached.result, stale=True)
+
+    # Cold cache: one caller fetches, the others wait briefly for its result.
+    _count("miss")
+    lock_key = f"{TABLE_CACHE_KEY}:lock"
+    token = _acquire(lock_key)
+    if token is not None:
+        try:
+            return _refresh(transport)
+        finally:
+            _release(lock_key, token)
+
+    deadline = time.monotonic() + COLD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        cached = cache.get(TABLE_CACHE_KEY)
+        if cached:
+            return cached.result
+
+    # The lock holder never delivered (crashed or hung): fetch ourselves.
+    return _refresh(transport)
+
+
+def _cross(table: RatesResult, base: str, symbol: str) -> Optional[Decimal]:
+    """
+    Rate base -> symbol derived from the EUR table, or None if either side is unknown.
+    """
+    if symbol == base:
+        return Decimal("1")
+    quote = Decimal("1") if symbol == table.base else table.rates.get(symbol)
+    if base == table.base:
+        return quote
+    base_rate = table.rates.get(base)
+    if quote is None or not base_rate:
+        return None
+    return (quote / base_rate).quantize(CROSS_RATE_PLACES, rounding=ROUND_HALF_UP)
+
+
+def get_latest_rates(
+    base: str = "EUR",
+    symbols: Optional[Iterable[str]] = ("USD", "GBP"),
+    transport: Optional[Transport] = None,
+) -> RatesResult:
+    """
+    Latest FX rates from Frankfurter (ECB reference rates) for base -> symbols.
+
+    Every call is served from the one cached full table (see get_rate_table), so any
+    symbol subset or cross rate (e.g. USD -> GBP) costs no extra upstream call or cache
+    entry. symbols=None returns every published currency. Unknown symbols are omitted.
+    """
+    return _select_rates(get_rate_table(transport), base, symbols)
+
+
+def _select_rates(table: RatesResult, base: str, symbols: Optional[Iterable[str]]) -> RatesResult:
+    if symbols is None:
+        symbols = [table.base, *table.rates]
+
+    rates = {}
+    for symbol in symbols:
+        if symbol == base:
+            continue
+        rate = _cross(table, base, symbol)
+        if rate is not None:
+            rates[symbol] = rate
+
+    return RatesResult(base=base, date=table.date, rates=rates, stale=table.stale)
+
+
+def get_rate(from_currency: str, to_currency: str, transport: Optional[Transport] = None) -> Optional[Decimal]:
+    """
+    Latest rate from_currency -> to_currency, or None if either currency isn't published.
+    """
+    return _cross(get_rate_table(transport), from_currency, to_currency)
+
+
+# -----------------------------
+# Async variants (ASGI views)
+# -----------------------------
+# async transport(url, params, timeout) -> decoded JSON body; raises on HTTP/network errors
+AsyncTransport = Callable[[str, dict, float], Awaitable[dict]]
+
+_background_refreshes = set()  # strong references, so pending tasks aren't garbage collected
+
+
+async def _async_transport(url: str, params: dict, timeout: float) -> dict:
+    if httpx is None:
+        return await asyncio.to_thread(_requests_transport, url, params, timeout)
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        response = await client.get(url, params=params)
+        response.raise_for_status()
+        return response.json()
+
+
+async def _afetch_table(transport: AsyncTransport) -> RatesResult:
+    url = getattr(settings, "FX_LATEST_URL", FRANKFURTER_LATEST)
+    _count("fetch")
+    started = time.perf_counter()
+    try:
+        data = await transport(url, {"from": ECB_BASE}, REQUEST_TIMEOUT)
+    except Exception:
+        _count("error")
+        raise
+    finally:
+        metrics.observe("fx_fetch_duration_seconds", time.perf_counter() - started)
+    return _table_from(data)
+
+
+async def _arefresh(transport: AsyncTransport) -> RatesResult:
+    result = await _afetch_table(transport)
+    now = time.time()
+    entry = _CachedRates(fetched_at=now, fresh_until=_fresh_until(result.date, now), result=result)
+    await cache.aset(TABLE_CACHE_KEY, entry, None)
+    return result
+
+
+async def _aacquire(lock_key: str) -> Optional[str]:
+    token = uuid.uuid4().hex
+    return token if await cache.aadd(lock_key, token, LOCK_TIMEOUT) else None
+
+
+async def _arelease(lock_key: str, token: str) -> None:
+    if await cache.aget(lock_key) == token:
+        await cache.adelete(lock_key)
+
+
+def _arefresh_in_background(transport: AsyncTransport) -> asyncio.Task:
+    """
+    Schedule a refresh on the running event loop (skipped if another caller holds the lock).
+    """
+    async def run():
+        lock_key = f"{TABLE_CACHE_KEY}:lock"
+        token = await _aacquire(lock_key)
+        if token is None:
+            return
+        try:
+            await _arefresh(transport)
+        except Exception:
+            logger.warning("Background FX refresh failed; serving last good rates", exc_info=True)
+        finally:
+            await _arelease(lock_key, token)
+
+    task = asyncio.get_running_loop().create_task(run())
+    _background_refreshes.add(task)
+    task.add_done_callback(_background_refreshes.discard)
+    return task
+
+
+async def aget_rate_table(transport: Optional[AsyncTransport] = None) -> RatesResult:
+    """
+    get_rate_table() for async views: the same cache entry, lock and stale-while-revalidate
+    rules, but the upstream call is awaited (httpx when installed) instead of holding a
+    worker, and a stale table is refreshed by a task on the event loop.
+    """
+    transport = transport or _async_transport
+
+    with perf.timed("fx"):
+        cached = await cache.aget(TABLE_CACHE_KEY)
+        if cached:
+            if time.time() < cached.fresh_until:
+                _count("hit")
+                return cached.result
+            _count("stale")
+            _arefresh_in_background(transport)
+            return replace(cached.result, stale=True)
+
+        _count("miss")
+        lock_key = f"{TABLE_CACHE_KEY}:lock"
+        token = await _aacquire(lock_key)
+        if token is not None:
+            try:
+                return await _arefresh(transport)
+            finally:
+                await _arelease(lock_key, token)
+
+        deadline = time.monotonic() + COLD_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            cached = await cache.aget(TABLE_CACHE_KEY)
+            if cached:
+                return cached.result
+
+        return await _arefresh(transport)
+
+
+async def aget_latest_rates(
+    base: str = "EUR",
+    symbols: Optional[Iterable[str]] = ("USD", "GBP"),
+    transport: Optional[AsyncTransport] = None,
+) -> RatesResult:
+    """
+    get_latest_rates() for async views (see aget_rate_table).
+    """
+    return _select_rates(await aget_rate_table(transport), base, symbols)
+
+
+# -----------------------------
+# Historical rates (FxRate table)
+# -----------------------------
+HISTORY_VERSION_KEY = "fx:history:version"
+TIMELINE_TTL = 60 * 10  # rebuild per-process timelines at least this often
+
+
+class RateTimeline:
+    """
+    Date-sorted rates for one base -> quote pair, held in memory as parallel arrays.
+    rate_on(day) binary-searches for the nearest publication on or before `day`
+    (weekends/holidays resolve to the previous business day).
+    """
+
+    __slots__ = ("base", "quote", "days", "rates")
+
+    def __init__(self, base: str, quote: str, days=(), rates=()):
+        self.base = base
+        self.quote = quote
+        self.days = list(days)  # date ordinals, ascending
+        self.rates = list(rates)
+
+    def __bool__(self) -> bool:
+        return bool(self.days)
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def last_date(self) -> Optional[date]:
+        return date.fromordinal(self.days[-1]) if self.days else None
+
+    def rate_on(self, day: date, fallback: Optional[Decimal] = None) -> Optional[Decimal]:
+        """
+        Rate for `day`; `fallback` (typically the latest live rate) is used for days
+        after the last loaded publication or before the first one.
+        """
+        if self.base == self.quote:
+            return Decimal("1")
+        ordinal = day.toordinal()
+        if not self.days or (fallback is not None and ordinal > self.days[-1]):
+            return fallback
+        i = bisect_right(self.days, ordinal) - 1
+        return self.rates[i] if i >= 0 else fallback
+
+
+_timelines: Dict[tuple, tuple] = {}  # (base, quote) -> (version, expires, timeline)
+_timelines_lock = threading.Lock()
+
+
+def _load_timeline(base: str, quote: str) -> RateTimeline:
+    from tracker.models import FxRate
+
+    if base == quote:
+        return RateTimeline(base, quote)
+
+    if base == ECB_BASE:
+        rows = FxRate.objects.filter(base=base, quote=quote).order_by("date").values_list("date", "rate")
+        days = []
+        rates = []
+        for day, rate in rows.iterator():
+            days.append(day.toordinal())
+            rates.append(rate)
+        return RateTimeline(base, quote, days, rates)
+
+    # Cross pair: combine the two EUR legs on the days both were published.
+    base_leg = _load_timeline(ECB_BASE, base)
+    quote_leg = _load_timeline(ECB_BASE, quote) if quote != ECB_BASE else None
+    days = []
+    rates = []
+    for ordinal, base_rate in zip(base_leg.days, base_leg.rates):
+        quote_rate = Decimal("1") if quote_leg is None else quote_leg.rate_on(date.fromordinal(ordinal))
+        if quote_rate is None or not base_rate:
+            continue
+        days.append(ordinal)
+        rates.append((quote_rate / base_rate).quantize(CROSS_RATE_PLACES, rounding=ROUND_HALF_UP))
+    return RateTimeline(base, quote, days, rates)
+
+
+def get_rate_timeline(quote: str, base: str = ECB_BASE) -> RateTimeline:
+    """
+    In-memory timeline for base -> quote, built per process from FxRate and rebuilt when
+    load_fx_rates bumps the history version in the cache (or after TIMELINE_TTL, for
+    processes that don't share that cache). No network access.
+    An empty timeline means no historical rates have been loaded for the pair.
+    """
+    version = rate_history_version()
+    key = (base, quote)
+    now = time.monotonic()
+    with _timelines_lock:
+        entry = _timelines.get(key)
+        if entry and entry[0] == version and now < entry[1]:
+            return entry[2]
+
+    timeline = _load_timeline(base, quote)
+    with _timelines_lock:
+        _timelines[key] = (version, now + TIMELINE_TTL, timeline)
+    return timeline
+
+
+def rate_lookup(
+    quote: str,
+    fallback: Optional[Decimal] = None,
+    base: str = ECB_BASE,
+) -> Optional[Callable[[date], Optional[Decimal]]]:
+    """
+    day -> rate for converting `base` amounts into `quote`: the historical rate for that
+    day where FxRate has it, else `fallback` (typically the latest live rate).
+    Returns None when there is nothing to convert with (or quote == base).
+    """
+    if quote == base:
+        return None
+    timeline = get_rate_timeline(quote, base)
+    if timeline:
+        return lambda day: timeline.rate_on(day, fallback=fallback)
+    if fallback:
+        return lambda day: fallback
+    return None
+
+
+def rate_history_version() -> str:
+    """
+    Token that changes whenever historical rates are reloaded; part of cache keys for
+    anything converted with rate_lookup().
+    """
+    version = cache.get(HISTORY_VERSION_KEY)
+    if version is None:
+        # Stored rather than defaulted, so the default cache's L1 can hold it
+        cache.add(HISTORY_VERSION_KEY, "0", None)
+        version = "0"
+    return version
+
+
+def invalidate_rate_timelines() -> None:
+    """
+    Make every process rebuild its timelines on next use (call after loading FxRate rows).
+    """
+    cache.set(HISTORY_VERSION_KEY, uuid.uuid4().hex, None)
+    with _timelines_lock:
+        _timelines.clear()
+
+
 Number = Union[int, float, Decimal]
 
+CENT = Decimal("0.01")
+
 
 def convert(amount: Number, rate: Number) -> Decimal:
     """
@@ -61,4 +580,101 @@ def convert(amount: Number, rate: Number) -> Decimal:
     amount_d = amount if isinstance(amount, Decimal) else Decimal(str(amount))
     rate_d = rate if isinstance(rate, Decimal) else Decimal(str(rate))
 
-    return (amount_d * rate_d).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    return (amount_d * rate_d).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+# -----------------------------
+# Batch conversion over integer cents
+# -----------------------------
+INT64_MAX = 2 ** 63 - 1
+NUMPY_MIN_SIZE = 64  # below this the array round-trip costs more than it saves
+
+
+def to_cents(amount: Number) -> int:
+    """
+    Amount as integer cents (rounded half-up to 2dp first).
+    """
+    cents = getattr(amount, "cents", None)  # services.money.Money: already cents
+    if cents is not None:
+        return cents
+    amount_d = amount if isinstance(amount, Decimal) else Decimal(str(amount))
+    return int(amount_d.quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def from_cents(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
+
+
+@lru_cache(maxsize=256)  # rates repeat: one per day or per currency
+def _ratio(rate: Number) -> tuple:
+    rate_d = rate if isinstance(rate, Decimal) else Decimal(str(rate))
+    return rate_d.as_integer_ratio()
+
+
+def _scale(cents: Sequence[int], nums, den: int, use_numpy: bool = True) -> List[int]:
+    """
+    round(c * n / den) for each cent value, half away from zero - the integer
+    equivalent of Decimal ROUND_HALF_UP. nums is one int or one int per value.
+    """
+    if use_numpy and np is not None and len(cents) >= NUMPY_MIN_SIZE:
+        try:
+            c = np.asarray(cents, dtype=np.int64)
+            n = np.asarray(nums, dtype=np.int64)
+        except OverflowError:
+            c = None
+        if c is not None:
+            abs_c = np.abs(c)
+            # Exact only while 2*|c|*n + den fits in int64; otherwise use Python ints
+            if 2 * int(abs_c.max()) * int(np.abs(n).max()) + den <= INT64_MAX:
+                q = (abs_c * n * 2 + den) // (2 * den)
+                return np.where(c < 0, -q, q).tolist()
+
+    den2 = 2 * den
+    if isinstance(nums, int):
+        num2 = 2 * nums
+        return [
+            (c * num2 + den) // den2 if c >= 0 else -((-c * num2 + den) // den2)
+            for c in cents
+        ]
+    return [
+        (c * 2 * n + den) // den2 if c >= 0 else -((-c * 2 * n + den) // den2)
+        for c, n in zip(cents, nums)
+    ]
+
+
+def convert_cents(cents: Sequence[int], rate: Number) -> List[int]:
+    """
+    Convert integer cents at one rate; same rounding as convert(), without a Decimal per value.
+    """
+    num, den = _ratio(rate)
+    return _scale(cents, num, den)
+
+
+def convert_many(amounts: Iterable[Number], rate: Number) -> List[Decimal]:
+    """
+    convert() for many amounts at one rate, returning 2dp Decimals.
+    """
+    return [from_cents(c) for c in convert_cents([to_cents(a) for a in amounts], rate)]
+
+
+def convert_series(cents: Sequence[int], rates: Sequence[Optional[Number]]) -> List[Optional[int]]:
+    """
+    Convert cents[i] at rates[i] (e.g. one historical rate per day). A None rate gives None.
+    """
+    ratios = {}
+    for rate in rates:
+        if rate is not None and rate not in ratios:
+            ratios[rate] = _ratio(rate)
+    if not ratios:
+        return [None] * len(cents)
+
+    # Put every distinct rate over one common denominator so the batch is a single pass
+    den = 1
+    for _, d in ratios.values():
+        den = den * d // gcd(den, d)
+    nums = [0 if rate is None else ratios[rate][0] * (den // ratios[rate][1]) for rate in rates]
+
+    converted = _scale(cents, nums, den)
+    if None in rates:
+        return [None if rate is None else value for rate, value in zip(rates, converted)]
+    return converted
@@ -0,0 +1,254 @@
+"""
+Minimal Prometheus-style metrics registry that works across gunicorn workers.
+
+Each process keeps its counters and histograms in memory and, when METRICS_DIR is set,
+writes a snapshot to METRICS_DIR/metrics-<pid>.json at most every FLUSH_INTERVAL seconds.
+The /metrics view merges every snapshot (plus the live state of the serving process), so
+any worker can answer for all of them. Without METRICS_DIR only the serving process is
+reported. Collectors let other modules publish counters they already keep (fx_stats).
+"""
+from __future__ import annotations
+
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+FLUSH_INTERVAL = 1.0
+
+# name -> (type, help, buckets)
+DEFINITIONS = {
+    "http_request_duration_seconds": (
+        "histogram", "Request latency by URL name, method and status class.", LATENCY_BUCKETS,
+    ),
+    "http_request_db_queries": (
+        "histogram", "SQL statements per request (sampled requests only).", QUERY_COUNT_BUCKETS,
+    ),
+    "http_request_db_seconds": (
+        "histogram", "Time spent in SQL per request (sampled requests only).", LATENCY_BUCKETS,
+    ),
+    "fx_fetch_duration_seconds": (
+        "histogram", "Upstream FX table fetch latency.", LATENCY_BUCKETS,
+    ),
+    "fx_cache_requests_total": (
+        "counter", "FX rate table lookups by cache result (hit, stale, miss).", None,
+    ),
+    "fx_upstream_requests_total": (
+        "counter", "Upstream FX fetches by outcome (ok, error).", None,
+    ),
+    "cache_requests_total": (
+        "counter", "Application cache lookups by cache name and result (hit, miss).", None,
+    ),
+    "ledger_cache_requests_total": (
+        "counter", "In-memory ledger cache lookups and evictions (hit, miss, evicted).", None,
+    ),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+Key = Tuple[str, Labels]
+
+_lock = threading.Lock()
+_counters: Dict[Key, float] = {}
+_histograms: Dict[Key, list] = {}  # [bucket counts..., +Inf count, sum]
+_collectors: List[Callable[[], Dict[Key, float]]] = []
+_pid = os.getpid()
+_last_flush = 0.0
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _reset_after_fork() -> None:
+    # A forked worker must not report (or overwrite) its parent's numbers as its own.
+    global _pid, _last_flush
+    if os.getpid() != _pid:
+        _counters.clear()
+        _histograms.clear()
+        _pid = os.getpid()
+        _last_flush = 0.0
+
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    with _lock:
+        _reset_after_fork()
+        key = (name, _labels(labels))
+        _counters[key] = _counters.get(key, 0) + amount
+    _maybe_flush()
+
+
+def observe(name: str, value: float, **labels) -> None:
+    buckets = DEFINITIONS[name][2]
+    with _lock:
+        _reset_after_fork()
+        key = (name, _labels(labels))
+        series = _histograms.get(key)
+        if series is None:
+            series = _histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        else:
+            series[len(buckets)] += 1
+        series[-1] += value
+    _maybe_flush()
+
+
+def register_collector(collector: Callable[[], Dict[Key, float]]) -> None:
+    """
+    collector() -> {(counter_name, labels): value} with this process's cumulative totals.
+    """
+    _collectors.append(collector)
+
+
+def counter_key(name: str, **labels) -> Key:
+    return name, _labels(labels)
+
+
+# -----------------------------
+# Per-process snapshots
+# -----------------------------
+def _metrics_dir() -> Optional[str]:
+    return getattr(settings, "METRICS_DIR", None) or None
+
+
+def snapshot() -> dict:
+    with _lock:
+        _reset_after_fork()
+        counters = dict(_counters)
+        histograms = {key: list(series) for key, series in _histograms.items()}
+    for collector in _collectors:
+        for key, value in collector().items():
+            counters[key] = counters.get(key, 0) + value
+    return {
+        "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+        "histograms": [[name, list(labels), series] for (name, labels), series in histograms.items()],
+    }
+
+
+def flush() -> None:
+    """
+    Write this process's snapshot to METRICS_DIR (atomically, so readers never see half a file).
+    """
+    global _last_flush
+    directory = _metrics_dir()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    data = json.dumps(snapshot())
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as fh:
+            fh.write(data)
+        os.replace(tmp, os.path.join(directory, f"metrics-{os.getpid()}.json"))
+    except OSError:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    _last_flush = time.monotonic()
+
+
+def _maybe_flush() -> None:
+    if _metrics_dir() and time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        try:
+            flush()
+        except OSError:
+            pass  # metrics must never fail a request
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    try:
+        flush()
+    except OSError:
+        pass
+
+
+def _load_snapshots() -> Iterable[dict]:
+    own = f"metrics-{os.getpid()}.json"
+    directory = _metrics_dir()
+    if directory:
+        for path in glob.glob(os.path.join(directory, "metrics-*.json")):
+            if os.path.basename(path) == own:
+                continue  # the live state below is newer
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    yield json.load(fh)
+            except (OSError, ValueError):
+                continue  # a worker is mid-write or the file was removed
+    yield snapshot()
+
+
+def collect() -> Tuple[Dict[Key, float], Dict[Key, list]]:
+    """
+    Merge every process's snapshot: counters and histogram buckets are summed.
+    """
+    counters: Dict[Key, float] = {}
+    histograms: Dict[Key, list] = {}
+    for data in _load_snapshots():
+        for name, labels, value in data.get("counters", []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, series in data.get("histograms", []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            merged = histograms.get(key)
+            if merged is None or len(merged) != len(series):
+                histograms[key] = list(series)
+            else:
+                histograms[key] = [a + b for a, b in zip(merged, series)]
+    return counters, histograms
+
+
+# -----------------------------
+# Exposition
+# -----------------------------
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+
+def _number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render() -> str:
+    """
+    Prometheus text exposition format (version 0.0.4) of the merged metrics.
+    """
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text, buckets) in DEFINITIONS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {_number(value)}")
+            continue
+        for (metric, labels), series in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, series):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', _number(bound))])} {cumulative}")
+            cumulative += series[len(buckets)]
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_number(series[-1])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,193 @@
+"""
+Money: an amount as integer cents (hundredths of the unit) plus its ISO currency code.
+
+Stored amounts (tracker.fields.MoneyField) are Money, so they are summed and compared as
+integers, in the database and in Python. Anything that has to round - multiplying by a
+rate, dividing, reading a Decimal with more than two places - rounds half-up (away from
+zero) in exact integer arithmetic, like services.currency.convert().
+
+Plain numbers mixed into Money arithmetic and comparisons are amounts in units, never
+cents: Money.of("12.50") + 1 == Money.of("13.50") == Decimal("13.50").
+"""
+from decimal import ROUND_HALF_UP, Decimal, localcontext
+from typing import Iterable, Optional, Union
+
+from services.currencies import currency_or_base
+from services.currency import ECB_BASE, _ratio, _scale, convert_cents, from_cents, to_cents
+
+Number = Union[int, float, Decimal]
+
+
+class Money:
+    """
+    Immutable by convention: operations return new instances.
+    """
+
+    __slots__ = ("cents", "currency")
+
+    def __init__(self, cents: int = 0, currency: str = ECB_BASE):
+        self.cents = cents
+        self.currency = currency
+
+    @classmethod
+    def of(cls, amount: Union["Money", Number, str], currency: str = ECB_BASE) -> "Money":
+        """
+        `amount` in units of `currency`, rounded half-up to cents. Money passes through.
+        """
+        if isinstance(amount, Money):
+            return amount
+        return cls(to_cents(amount), currency)
+
+    @classmethod
+    def sum(cls, values: Iterable["Money"], currency: str = ECB_BASE) -> "Money":
+        """
+        Total of many amounts in `currency`, added as plain integers.
+        """
+        cents = 0
+        for value in values:
+            if value.currency != currency:
+                raise ValueError(f"Can't combine {currency} and {value.currency} amounts.")
+            cents += value.cents
+        return cls(cents, currency)
+
+    @property
+    def amount(self) -> Decimal:
+        return from_cents(self.cents)
+
+    def format(self) -> str:
+        """
+        Per the currency registry: "€1,234.50", "1,234.50 kr".
+        """
+        return currency_or_base(self.currency).format(self.amount)
+
+    def convert(self, rate: Number, currency: Optional[str] = None) -> "Money":
+        """
+        This amount at `rate`, in `currency` (default: unchanged); same rounding as convert().
+        """
+        return Money(convert_cents([self.cents], rate)[0], currency or self.currency)
+
+    # -----------------------------
+    # Arithmetic
+    # -----------------------------
+    def _cents_of(self, other) -> Optional[int]:
+        if isinstance(other, Money):
+            if other.currency != self.currency:
+                raise ValueError(f"Can't combine {self.currency} and {other.currency} amounts.")
+            return other.cents
+        if isinstance(other, (int, float, Decimal)) and not isinstance(other, bool):
+            return to_cents(other)
+        return None
+
+    def __add__(self, other):
+        if type(other) is Money and other.currency == self.currency:
+            return Money(self.cents + other.cents, self.currency)
+        cents = self._cents_of(other)
+        return NotImplemented if cents is None else Money(self.cents + cents, self.currency)
+
+    __radd__ = __add__  # sum() starts from 0
+
+    def __sub__(self, other):
+        if type(other) is Money and other.currency == self.currency:
+            return Money(self.cents - other.cents, self.currency)
+        cents = self._cents_of(other)
+        return NotImplemented if cents is None else Money(self.cents - cents, self.currency)
+
+    def __rsub__(self, other):
+        cents = self._cents_of(other)
+        return NotImplemented if cents is None else Money(cents - self.cents, self.currency)
+
+    def __mul__(self, other):
+        if isinstance(other, int) and not isinstance(other, bool):
+            return Money(self.cents * other, self.currency)
+        if isinstance(other, (float, Decimal)):
+            return self.convert(other)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        """
+        Money / Money is their ratio (a Decimal); Money / number is Money.
+        """
+        if isinstance(other, Money):
+            return Decimal(self.cents) / Decimal(self._cents_of(other))
+        if isinstance(other, (int, float, Decimal)) and not isinstance(other, bool):
+            num, den = _ratio(other)
+            if num < 0:  # _scale() wants a positive denominator
+                num, den = -num, -den
+            return Money(_scale([self.cents], den, num, use_numpy=False)[0], self.currency)
+        return NotImplemented
+
+    def __neg__(self):
+        return Money(-self.cents, self.currency)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return self if self.cents >= 0 else Money(-self.cents, self.currency)
+
+    # -----------------------------
+    # Comparison
+    # -----------------------------
+    def _pair(self, other):
+        """
+        (left, right) comparable values, or None if `other` isn't a number.
+        """
+        if isinstance(other, Money):
+            return self.cents, self._cents_of(other)
+        if isinstance(other, int) and not isinstance(other, bool):
+            return self.cents, other * 100
+        if isinstance(other, (float, Decimal)):
+            return self.amount, other
+        return None
+
+    def __eq__(self, other):
+        if isinstance(other, Money) and other.currency != self.currency:
+            return False
+        pair = self._pair(other)
+        return NotImplemented if pair is None else pair[0] == pair[1]
+
+    def __hash__(self):
+        return hash(self.amount)  # equal Decimals hash alike
+
+    def __lt__(self, other):
+        pair = self._pair(other)
+        return NotImplemented if pair is None else pair[0] < pair[1]
+
+    def __le__(self, other):
+        pair = self._pair(other)
+        return NotImplemented if pair is None else pair[0] <= pair[1]
+
+    def __gt__(self, other):
+        pair = self._pair(other)
+        return NotImplemented if pair is None else pair[0] > pair[1]
+
+    def __ge__(self, other):
+        pair = self._pair(other)
+        return NotImplemented if pair is None else pair[0] >= pair[1]
+
+    # -----------------------------
+    # Conversions
+    # -----------------------------
+    def __bool__(self):
+        return self.cents != 0
+
+    def __float__(self):
+        return self.cents / 100
+
+    def __str__(self):
+        return str(self.amount)
+
+    def __format__(self, spec):
+        if not spec:
+            return str(self)
+        with localcontext() as context:  # f"{m:.0f}" rounds half-up too
+            context.rounding = ROUND_HALF_UP
+            return format(self.amount, spec)
+
+    def __repr__(self):
+        return f"Money('{self}', '{self.currency}')"
+
+    def __reduce__(self):
+        return Money, (self.cents, self.currency)
@@ -0,0 +1,76 @@
+"""
+Per-request timing collector.
+
+core.middleware.PerformanceMiddleware activates a RequestMetrics for the current request;
+code anywhere below it (services.currency, the template backend) records spans with
+timed(). Outside an instrumented request timed() costs one ContextVar lookup.
+"""
+from __future__ import annotations
+
+import heapq
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, List, Optional, Tuple
+
+_current: ContextVar[Optional["RequestMetrics"]] = ContextVar("perf_metrics", default=None)
+
+
+class RequestMetrics:
+    """
+    Accumulated span durations (seconds) and counts for one request, plus the
+    slowest SQL statements seen.
+    """
+
+    __slots__ = ("durations", "counts", "slow_queries", "keep_queries")
+
+    def __init__(self, keep_queries: int = 5):
+        self.durations: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.slow_queries: List[Tuple[float, str]] = []  # min-heap of (seconds, sql)
+        self.keep_queries = keep_queries
+
+    def add(self, name: str, seconds: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def add_query(self, sql: str, seconds: float) -> None:
+        self.add("db", seconds)
+        if self.keep_queries <= 0:
+            return
+        entry = (seconds, sql)
+        if len(self.slow_queries) < self.keep_queries:
+            heapq.heappush(self.slow_queries, entry)
+        elif seconds > self.slow_queries[0][0]:
+            heapq.heapreplace(self.slow_queries, entry)
+
+    def slowest_queries(self) -> List[Tuple[float, str]]:
+        return sorted(self.slow_queries, key=lambda entry: entry[0], reverse=True)
+
+
+def activate(metrics: RequestMetrics) -> Token:
+    return _current.set(metrics)
+
+
+def deactivate(token: Token) -> None:
+    _current.reset(token)
+
+
+def current() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+@contextmanager
+def timed(name: str):
+    """
+    Add the duration of the block (or decorated call) to the current request's `name` span.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - started)
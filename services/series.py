@@ -0,0 +1,41 @@
+"""
+Chart series helpers.
+"""
+from typing import List, Sequence
+
+
+def lttb(values: Sequence[float], threshold: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets downsampling: indices of at most `threshold` points of
+    `values` (x = position) that keep the visual shape - peaks and dips survive, unlike
+    plain averaging or striding. First and last points are always kept.
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    kept = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third corner of the triangle
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        span = next_end - next_start
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(values[next_start:next_end]) / span
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = a, values[a]
+        best = start
+        best_area = -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (values[j] - ay) - (ax - j) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
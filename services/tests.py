@@ -0,0 +1,292 @@
+import asyncio
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+import unittest
+from dataclasses import replace
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core.tests import LOCAL_L2
+from services import currency, metrics
+from services.currencies import CURRENCIES, get_currency
+from services.money import Money
+from services.series import lttb
+from services.currency import RatesResult, fx_stats, get_latest_rates, get_rate
+
+
+class FakeTransport:
+    def __init__(self, rates=None, fail=False, delay=0):
+        self.rates = rates or {"USD": 1.1, "GBP": 0.85}
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, url, params, timeout):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise OSError("provider down")
+        self.params = params
+        return {"base": params["from"], "date": "2025-01-02", "rates": self.rates}
+
+
+@LOCAL_L2
+class LatestRatesTests(SimpleTestCase):
+    cache_key = currency.TABLE_CACHE_KEY
+
+    def setUp(self):
+        cache.clear()
+
+    def _age_cache_entry(self):
+        cached = cache.get(self.cache_key)
+        stale = currency._CachedRates(fetched_at=cached.fetched_at, fresh_until=time.time() - 1, result=cached.result)
+        cache.set(self.cache_key, stale, None)
+
+    def _wait_for_refresh(self, transport, calls):
+        deadline = time.monotonic() + 2
+        while transport.calls < calls or cache.get(f"{self.cache_key}:lock"):
+            self.assertLess(time.monotonic(), deadline, "background refresh did not finish")
+            time.sleep(0.01)
+
+    def test_fresh_entry_is_served_from_cache(self):
+        transport = FakeTransport()
+        first = get_latest_rates(transport=transport)
+        second = get_latest_rates(transport=transport)
+        self.assertEqual(transport.calls, 1)
+        self.assertEqual(second, first)
+        self.assertEqual(first.rates["USD"], Decimal("1.1"))
+        self.assertFalse(first.stale)
+
+    def test_stale_entry_is_served_while_refreshing(self):
+        get_latest_rates(transport=FakeTransport())
+        self._age_cache_entry()
+
+        transport = FakeTransport(rates={"USD": 1.2, "GBP": 0.9}, delay=0.1)
+        result = get_latest_rates(transport=transport)
+        self.assertTrue(result.stale)
+        self.assertEqual(result.rates["USD"], Decimal("1.1"))
+
+        self._wait_for_refresh(transport, 1)
+        self.assertEqual(get_latest_rates(transport=transport).rates["USD"], Decimal("1.2"))
+        self.assertEqual(transport.calls, 1)
+
+    def test_outage_degrades_to_last_good_rates(self):
+        get_latest_rates(transport=FakeTransport())
+        self._age_cache_entry()
+
+        down = FakeTransport(fail=True)
+        with self.assertLogs("services.currency", "WARNING"):
+            result = get_latest_rates(transport=down)
+            self._wait_for_refresh(down, 1)
+            # Still stale, so this read starts (and logs) another failed refresh
+            self.assertEqual(get_latest_rates(transport=down).rates["GBP"], Decimal("0.85"))
+            self._wait_for_refresh(down, 2)
+        self.assertTrue(result.stale)
+
+        cache.clear()
+        with self.assertRaises(OSError):
+            get_latest_rates(transport=down)
+
+    def test_cold_cache_is_fetched_once_by_concurrent_callers(self):
+        transport = FakeTransport(delay=0.2)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_latest_rates(transport=transport)))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(transport.calls, 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(isinstance(r, RatesResult) for r in results))
+
+    def test_one_table_fetch_serves_every_symbol_combination(self):
+        transport = FakeTransport(rates={"USD": 1.1, "GBP": 0.88, "JPY": 160})
+        before = fx_stats()
+
+        both = get_latest_rates(symbols=("USD", "GBP"), transport=transport)
+        usd = get_latest_rates(symbols=("USD",), transport=transport)
+        everything = get_latest_rates(symbols=None, transport=transport)
+        usd_to_gbp = get_rate("USD", "GBP", transport=transport)
+        gbp_based = get_latest_rates(base="GBP", symbols=("EUR", "USD"), transport=transport)
+
+        self.assertEqual(transport.calls, 1)
+        self.assertNotIn("to", transport.params)
+        self.assertEqual(set(both.rates), {"USD", "GBP"})
+        self.assertEqual(usd.rates, {"USD": Decimal("1.1")})
+        self.assertEqual(set(everything.rates), {"USD", "GBP", "JPY"})
+        self.assertEqual(usd_to_gbp, Decimal("0.8"))
+        self.assertEqual(gbp_based.rates["EUR"], Decimal("1.136364"))
+        self.assertEqual(gbp_based.rates["USD"], Decimal("1.25"))
+
+        after = fx_stats()
+        self.assertEqual(after.get("miss", 0) - before.get("miss", 0), 1)
+        self.assertEqual(after.get("hit", 0) - before.get("hit", 0), 4)
+
+    def test_table_stays_fresh_until_next_publication(self):
+        # Friday's table is good until Monday 16:00 Frankfurt time
+        friday_noon = currency.datetime(2025, 1, 3, 12, tzinfo=currency.ECB_TIMEZONE).timestamp()
+        fresh_until = currency._fresh_until("2025-01-03", friday_noon)
+        expected = currency.datetime(2025, 1, 6, 16, tzinfo=currency.ECB_TIMEZONE).timestamp()
+        self.assertEqual(fresh_until, expected)
+
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork()")
+    def test_forked_workers_start_with_their_own_counters(self):
+        get_latest_rates(transport=FakeTransport())
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # child: report what it inherited, then leave without cleanup
+            os.write(write, json.dumps(fx_stats()).encode())
+            os._exit(0)
+        os.close(write)
+        with os.fdopen(read) as fh:
+            inherited = json.load(fh)
+        os.waitpid(pid, 0)
+        self.assertEqual(inherited, {})
+        self.assertGreater(sum(fx_stats().values()), 0)
+
+
+@LOCAL_L2
+class AsyncLatestRatesTests(SimpleTestCase):
+    cache_key = currency.TABLE_CACHE_KEY
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_async_callers_share_the_cache_lock_and_refresh(self):
+        calls = []
+
+        async def transport(url, params, timeout):
+            calls.append(params)
+            await asyncio.sleep(0.1)
+            return {"base": params["from"], "date": "2025-01-02", "rates": {"USD": 1.2 + len(calls) / 10}}
+
+        results = await asyncio.gather(*(currency.aget_latest_rates(transport=transport) for _ in range(5)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({r.rates["USD"] for r in results}, {Decimal("1.3")})
+
+        # Stale: served at once while a task on the loop refreshes it
+        cached = await cache.aget(self.cache_key)
+        await cache.aset(self.cache_key, replace(cached, fresh_until=time.time() - 1), None)
+        result = await currency.aget_latest_rates(transport=transport)
+        self.assertTrue(result.stale)
+        await asyncio.gather(*currency._background_refreshes)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((await currency.aget_latest_rates(transport=transport)).rates["USD"], Decimal("1.4"))
+
+
+class BatchConvertTests(SimpleTestCase):
+    def test_batch_matches_convert_rounding(self):
+        rate = Decimal("0.845123")
+        # Halves, negatives and enough values to take the NumPy path when it is installed
+        cents = [1, -1, 5, -5, 50, -50, 0] + list(range(-100_000, 100_000, 997))
+        expected = [currency.to_cents(currency.convert(currency.from_cents(c), rate)) for c in cents]
+
+        self.assertEqual(currency.convert_cents(cents, rate), expected)
+        self.assertEqual(currency._scale(cents, *rate.as_integer_ratio(), use_numpy=False), expected)
+        self.assertEqual(
+            currency.convert_many([Decimal("12.50"), Decimal("-0.05")], Decimal("0.5")),
+            [Decimal("6.25"), Decimal("-0.03")],
+        )
+
+    def test_series_converts_each_value_at_its_own_rate(self):
+        cents = [1000, 1000, 1000, 1234]
+        rates = [Decimal("1.1"), None, Decimal("0.8512"), Decimal("1.0921")]
+
+        self.assertEqual(currency.convert_series(cents, rates), [1100, None, 851, 1348])
+        self.assertEqual(currency.convert_series(cents, [None] * 4), [None] * 4)
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    def test_snapshots_from_other_workers_are_merged(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            # Another worker's snapshot: one 30ms dashboard request and three cache hits
+            other = {
+                "counters": [["cache_requests_total", [["cache", "dashboard"], ["result", "hit"]], 3]],
+                "histograms": [[
+                    "http_request_duration_seconds",
+                    [["method", "GET"], ["status", "2xx"], ["view", "merge_test"]],
+                    [0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0.03],
+                ]],
+            }
+            with open(os.path.join(directory, "metrics-99999.json"), "w") as fh:
+                json.dump(other, fh)
+
+            metrics.inc("cache_requests_total", cache="dashboard", result="hit")
+            metrics.observe("http_request_duration_seconds", 0.2, view="merge_test", method="GET", status="2xx")
+            counters, histograms = metrics.collect()
+            text = metrics.render()
+
+        hits = counters[metrics.counter_key("cache_requests_total", cache="dashboard", result="hit")]
+        self.assertGreaterEqual(hits, 4)
+        series = histograms[metrics.counter_key(
+            "http_request_duration_seconds", view="merge_test", method="GET", status="2xx",
+        )]
+        self.assertEqual(series[3], 1)  # 30ms (other worker) in the 0.05 bucket
+        self.assertEqual(series[5], 1)  # 200ms (this process) in the 0.25 bucket
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",status="2xx",view="merge_test"} 2', text,
+        )
+
+
+class CurrencyRegistryTests(SimpleTestCase):
+    def test_registry_is_read_only_and_formats_per_currency(self):
+        self.assertEqual(len(CURRENCIES), 30)
+        with self.assertRaises(TypeError):
+            CURRENCIES["XYZ"] = CURRENCIES["EUR"]
+        self.assertIs(get_currency(" usd "), CURRENCIES["USD"])
+        self.assertIsNone(get_currency("XYZ"))
+
+        self.assertEqual(CURRENCIES["EUR"].format(Decimal("1234.505")), "€1,234.51")
+        self.assertEqual(CURRENCIES["JPY"].format(Decimal("1234.5")), "¥1,235")
+        self.assertEqual(CURRENCIES["SEK"].format(-12), "-12.00 kr")
+
+
+class MoneyTests(SimpleTestCase):
+    def test_integer_cents_with_exact_half_up_rounding(self):
+        price = Money.of("12.345")
+        self.assertEqual((price.cents, price.currency), (1235, "EUR"))
+        self.assertEqual(price, Decimal("12.35"))
+        self.assertEqual(hash(price), hash(Decimal("12.35")))
+        self.assertEqual(Money(-5).convert(Decimal("0.5")).cents, -3)  # away from zero
+        self.assertEqual(Money(1000).convert("1.0921", "USD"), Money(1092, "USD"))
+        self.assertEqual((Money(1000) / 3).cents, 333)
+        self.assertEqual(Money(250) / Money(1000), Decimal("0.25"))
+
+        self.assertEqual(sum([Money(100), Money(250)]), Money(350))
+        self.assertEqual(Money.sum([Money(100), Money(250)]), Money(350))
+        self.assertEqual(Money(1000) - 2, Money(800))  # plain numbers are units
+        self.assertTrue(Money(-1) < 0 < Money(1) <= Decimal("0.01"))
+        self.assertNotEqual(Money(100), Money(100, "USD"))
+        with self.assertRaises(ValueError):
+            Money(100) + Money(100, "USD")
+
+        self.assertEqual(str(Money(-123456)), "-1234.56")
+        self.assertEqual(f"{Money(5):.1f}", "0.1")
+        self.assertEqual(Money(123456789).format(), "€1,234,567.89")
+        self.assertEqual(Money(123456, "JPY").format(), "¥1,235")
+        self.assertEqual(pickle.loads(pickle.dumps(Money(42, "GBP"))), Money(42, "GBP"))
+
+
+class LttbTests(SimpleTestCase):
+    def test_downsampling_keeps_endpoints_and_spikes(self):
+        values = [float(i % 5) for i in range(1000)]
+        values[437] = 250.0
+        kept = lttb(values, 50)
+
+        self.assertEqual(len(kept), 50)
+        self.assertEqual((kept[0], kept[-1]), (0, 999))
+        self.assertEqual(kept, sorted(set(kept)))
+        self.assertIn(437, kept)
+        self.assertEqual(lttb(values[:10], 50), list(range(10)))
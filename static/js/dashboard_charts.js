@@ -1,22 +1,44 @@
 (function () {
-  function parseJsonScript(id) {
-    const el = document.getElementById(id);
-    if (!el) return null;
-    try {
-      return JSON.parse(el.textContent);
-    } catch {
-      return null;
+  // Cards, chart data and rates are fetched from the dashboard_data endpoints once the page
+  // has rendered, so the HTML never waits on an aggregate or the FX table. Each widget loads
+  // on its own; widgets rendered with the page (no data-src) are left alone.
+  function fetchJson(url) {
+    return fetch(url, { headers: { Accept: "application/json" }, credentials: "same-origin" })
+      .then((response) => {
+        if (!response.ok) throw new Error(`${url} returned ${response.status}`);
+        return response.json();
+      });
+  }
+
+  function showStatus(root, text) {
+    const status = root.querySelector("[data-status]");
+    if (status) {
+      status.textContent = text;
+      status.hidden = !text;
     }
   }
 
+  // Labels arrive as ISO dates; format them for the trend's granularity.
+  const LABEL_FORMATS = {
+    day: { day: "2-digit", month: "short" },
+    week: { day: "2-digit", month: "short" },
+    month: { month: "short", year: "numeric" },
+  };
+
+  function formatLabels(isoDates, granularity) {
+    if (!isoDates) return isoDates;
+    const format = new Intl.DateTimeFormat(undefined, LABEL_FORMATS[granularity] || LABEL_FORMATS.day);
+    return isoDates.map((iso) => format.format(new Date(`${iso}T00:00:00`)));
+  }
+
   function sumArray(arr) {
     if (!arr || !arr.length) return 0;
     return arr.reduce((a, b) => a + (Number(b) || 0), 0);
   }
 
-  if (typeof Chart === "undefined") {
+  const hasChart = typeof Chart !== "undefined";
+  if (!hasChart) {
     console.error("Chart.js not loaded. Check the Chart.js CDN in dashboard.html.");
-    return;
   }
 
   const PALETTE = [
@@ -31,118 +53,122 @@
   ];
 
   // ---- Trend charts ----
-  const trendLabels = parseJsonScript("trend-labels");
-  const trendSeries = parseJsonScript("trend-series");
-  const trendBudgetLine = parseJsonScript("trend-budget-line");
-
-  // Trend line with red budget limit line (high contrast for dark theme)
-  const trendCanvas = document.getElementById("expenseTrendChart");
-  if (trendCanvas && trendLabels && trendSeries) {
-    const datasets = [
-      {
-        label: "Daily expenses",
-        data: trendSeries,
-        tension: 0.25,
-        fill: false,
-        borderColor: "#3BA3FF",
-        borderWidth: 3,
-        pointRadius: 2,
-        pointHoverRadius: 5,
-        pointBackgroundColor: "#3BA3FF",
-        pointBorderColor: "#0b0f16",
-        pointBorderWidth: 2
-      }
-    ];
-
-    if (trendBudgetLine && Array.isArray(trendBudgetLine)) {
-      datasets.push({
-        label: "Daily budget limit",
-        data: trendBudgetLine,
-        borderColor: "#FF4D4D",
-        borderWidth: 3,
-        pointRadius: 0,
-        tension: 0,
-        fill: false,
-        borderDash: [6, 6]
-      });
+  const PERIOD_NAMES = { day: "Daily", week: "Weekly", month: "Monthly" };
+
+  function renderTrend(trendCanvas, data) {
+    const granularity = data.granularity || "day";
+    const trendLabels = formatLabels(data.labels, granularity);
+    const trendSeries = data.series;
+    const trendBudgetLine = data.budget_line;
+    const periodName = PERIOD_NAMES[granularity] || "Daily";
+
+    const limit = document.querySelector("[data-daily-limit]");
+    if (limit && data.daily_budget_limit) {
+      limit.textContent = ` · Daily limit: ${data.display_symbol}${Number(data.daily_budget_limit).toFixed(2)}`;
     }
 
-    new Chart(trendCanvas, {
-      type: "line",
-      data: {
-        labels: trendLabels,
-        datasets: datasets
-      },
-      options: {
-        responsive: true,
-        maintainAspectRatio: false,
-        interaction: { mode: "index", intersect: false },
-        plugins: {
-          legend: {
-            display: true,
-            labels: { color: "rgba(255,255,255,0.85)" }
-          }
+    // Trend line with red budget limit line (high contrast for dark theme)
+    if (hasChart && trendLabels && trendSeries) {
+      const datasets = [
+        {
+          label: `${periodName} expenses`,
+          data: trendSeries,
+          tension: 0.25,
+          fill: false,
+          borderColor: "#3BA3FF",
+          borderWidth: 3,
+          pointRadius: 2,
+          pointHoverRadius: 5,
+          pointBackgroundColor: "#3BA3FF",
+          pointBorderColor: "#0b0f16",
+          pointBorderWidth: 2
+        }
+      ];
+
+      if (trendBudgetLine && Array.isArray(trendBudgetLine)) {
+        datasets.push({
+          label: `${periodName} budget limit`,
+          data: trendBudgetLine,
+          borderColor: "#FF4D4D",
+          borderWidth: 3,
+          pointRadius: 0,
+          tension: 0,
+          fill: false,
+          borderDash: [6, 6]
+        });
+      }
+
+      new Chart(trendCanvas, {
+        type: "line",
+        data: {
+          labels: trendLabels,
+          datasets: datasets
         },
-        scales: {
-          x: {
-            grid: { color: "rgba(255,255,255,0.06)" },
-            ticks: { color: "rgba(255,255,255,0.65)" }
+        options: {
+          responsive: true,
+          maintainAspectRatio: false,
+          interaction: { mode: "index", intersect: false },
+          plugins: {
+            legend: {
+              display: true,
+              labels: { color: "rgba(255,255,255,0.85)" }
+            }
           },
-          y: {
-            beginAtZero: true,
-            grid: { color: "rgba(255,255,255,0.06)" },
-            ticks: { color: "rgba(255,255,255,0.65)" }
+          scales: {
+            x: {
+              grid: { color: "rgba(255,255,255,0.06)" },
+              ticks: { color: "rgba(255,255,255,0.65)" }
+            },
+            y: {
+              beginAtZero: true,
+              grid: { color: "rgba(255,255,255,0.06)" },
+              ticks: { color: "rgba(255,255,255,0.65)" }
+            }
           }
         }
-      }
-    });
-  }
-
-  // Daily budget vs expenses bars (last 14 days)
-  const dailyBarsCanvas = document.getElementById("dailyBudgetVsExpenseBars");
-  if (dailyBarsCanvas && trendLabels && trendSeries) {
-    const take = 14;
-    const labelsSlice = trendLabels.slice(-take);
-    const expenseSlice = trendSeries.slice(-take);
-
-    let budgetSlice = null;
-    if (trendBudgetLine && Array.isArray(trendBudgetLine)) {
-      budgetSlice = trendBudgetLine.slice(-take);
+      });
     }
 
-    const datasets = [];
-    if (budgetSlice) datasets.push({ label: "Budget", data: budgetSlice });
-    datasets.push({ label: "Expenses", data: expenseSlice });
+    // Daily budget vs expenses bars (last 14 days, whatever the trend range)
+    const dailyBarsCanvas = document.getElementById("dailyBudgetVsExpenseBars");
+    const barLabels = formatLabels(data.bar_labels, "day");
+    const barSeries = data.bar_series;
+    if (hasChart && dailyBarsCanvas && barLabels && barSeries) {
+      const labelsSlice = barLabels;
+      const expenseSlice = barSeries;
+      const budget = data.bar_budget;
+      const budgetSlice = Array.isArray(budget) ? budget : null;
 
-    new Chart(dailyBarsCanvas, {
-      type: "bar",
-      data: { labels: labelsSlice, datasets: datasets },
-      options: {
-        responsive: true,
-        maintainAspectRatio: false,
-        plugins: {
-          legend: { display: true, labels: { color: "rgba(255,255,255,0.85)" } }
-        },
-        scales: {
-          x: {
-            grid: { display: false },
-            ticks: { color: "rgba(255,255,255,0.65)" }
+      const datasets = [];
+      if (budgetSlice) datasets.push({ label: "Budget", data: budgetSlice });
+      datasets.push({ label: "Expenses", data: expenseSlice });
+
+      new Chart(dailyBarsCanvas, {
+        type: "bar",
+        data: { labels: labelsSlice, datasets: datasets },
+        options: {
+          responsive: true,
+          maintainAspectRatio: false,
+          plugins: {
+            legend: { display: true, labels: { color: "rgba(255,255,255,0.85)" } }
           },
-          y: {
-            beginAtZero: true,
-            grid: { color: "rgba(255,255,255,0.06)" },
-            ticks: { color: "rgba(255,255,255,0.65)" }
+          scales: {
+            x: {
+              grid: { display: false },
+              ticks: { color: "rgba(255,255,255,0.65)" }
+            },
+            y: {
+              beginAtZero: true,
+              grid: { color: "rgba(255,255,255,0.06)" },
+              ticks: { color: "rgba(255,255,255,0.65)" }
+            }
           }
         }
-      }
-    });
+      });
+    }
   }
 
   // ---- Doughnut chart with % labels drawn manually ----
-  const pieLabels = parseJsonScript("spend-pie-labels");
-  const pieSeries = parseJsonScript("spend-pie-series");
-  const pieCanvas = document.getElementById("spendPieChart");
-
   const percentLabelsPlugin = {
     id: "percentLabels",
     afterDatasetsDraw(chart) {
@@ -173,7 +199,53 @@
     }
   };
 
-  if (pieCanvas && pieLabels && pieSeries) {
+  function breakdownRow(row, index, symbol) {
+    const tr = document.createElement("tr");
+    tr.setAttribute("data-slice-index", index);
+
+    const name = document.createElement("td");
+    const swatch = document.createElement("span");
+    swatch.className = "me-2 d-inline-block rounded-2";
+    swatch.style.cssText = "width:12px;height:12px;vertical-align:middle;";
+    swatch.setAttribute("data-swatch", "");
+    name.append(swatch, row.name);
+
+    const amount = document.createElement("td");
+    amount.className = "text-end";
+    amount.textContent = `${symbol}${row.amount}`;
+
+    const percent = document.createElement("td");
+    percent.className = "text-end";
+    const badge = document.createElement("span");
+    badge.className = "badge text-bg-light border";
+    badge.setAttribute("data-percent-badge", "");
+    badge.textContent = `${row.percent}%`;
+    percent.append(badge);
+
+    tr.append(name, amount, percent);
+    return tr;
+  }
+
+  function renderBreakdown(root, data) {
+    const pieLabels = data.labels;
+    const pieSeries = data.series;
+    const pieCanvas = document.getElementById("spendPieChart");
+
+    if (!pieLabels || !pieLabels.length) {
+      showStatus(root, "No expenses yet this month.");
+      return;
+    }
+    showStatus(root, "");
+    const content = root.querySelector("[data-if-spending]");
+    if (content) content.hidden = false;
+
+    const table = document.getElementById("spendBreakdownTable");
+    if (table) {
+      const tbody = table.querySelector("tbody");
+      tbody.replaceChildren(...data.rows.map((row, i) => breakdownRow(row, i, data.display_symbol)));
+    }
+
+    if (!hasChart || !pieCanvas) return;
     const total = sumArray(pieSeries);
     const colors = pieLabels.map((_, i) => PALETTE[i % PALETTE.length]);
 
@@ -209,7 +281,6 @@
       plugins: [percentLabelsPlugin]
     });
 
-    const table = document.getElementById("spendBreakdownTable");
     if (table) {
       const rows = table.querySelectorAll("tbody tr[data-slice-index]");
       rows.forEach((row) => {
@@ -239,4 +310,84 @@
       });
     }
   }
+
+  // ---- Budget insights ----
+  function renderInsights(root, data) {
+    const level = root.querySelector("[data-insight-level]");
+    if (level) level.className = `badge text-bg-${data.level}`;
+
+    const list = root.querySelector("ul");
+    if (list) {
+      list.replaceChildren(...data.lines.map((line) => {
+        const li = document.createElement("li");
+        li.className = "text-muted mb-1";
+        li.textContent = line;
+        return li;
+      }));
+    }
+  }
+
+  // ---- Month-to-date cards ----
+  function renderSummary(root, data) {
+    root.querySelectorAll("[data-field]").forEach((field) => {
+      field.textContent = data[field.dataset.field] || "";
+    });
+    const budget = root.querySelector("[data-if-budget]");
+    if (budget) budget.hidden = !data.total_budget;
+  }
+
+  // ---- Exchange rates ----
+  function renderRates(root, data) {
+    const badge = document.getElementById("ratesBadge");
+    if (badge && (data.error || data.date)) {
+      badge.className = data.error ? "badge text-bg-warning" : "badge text-bg-light border";
+      badge.textContent = data.error
+        ? "FX: unavailable"
+        : `Rates date: ${data.date}${data.stale ? " · refreshing" : ""}`;
+      badge.hidden = false;
+    }
+
+    if (data.error || !data.date) {
+      showStatus(root, data.error || "No rate data yet.");
+      return;
+    }
+    showStatus(root, "");
+
+    const meta = root.querySelector("[data-rates-meta]");
+    if (meta) {
+      meta.textContent = `Base: ${data.base} · Date: ${data.date}`;
+      meta.hidden = false;
+    }
+    const list = root.querySelector("ul");
+    if (list) {
+      list.replaceChildren(...data.rates.map((row) => {
+        const li = document.createElement("li");
+        li.className = "list-group-item d-flex justify-content-between";
+        const code = document.createElement("span");
+        code.textContent = `EUR → ${row.code}`;
+        const rate = document.createElement("strong");
+        rate.textContent = row.rate || "—";
+        li.append(code, rate);
+        return li;
+      }));
+      list.hidden = false;
+    }
+  }
+
+  function load(id, render, failure) {
+    const root = document.getElementById(id);
+    if (!root || !root.dataset.src) return;
+    fetchJson(root.dataset.src)
+      .then((data) => render(root, data))
+      .catch((error) => {
+        console.error(error);
+        showStatus(root, failure);
+      });
+  }
+
+  load("dashboardSummary", renderSummary, "");
+  load("expenseTrendChart", renderTrend, "");
+  load("spendBreakdown", renderBreakdown, "Spending breakdown unavailable right now.");
+  load("budgetInsights", renderInsights, "Budget insights unavailable right now.");
+  load("exchangeRates", renderRates, "Rates unavailable right now.");
 })();
@@ -0,0 +1,142 @@
+(function () {
+  const sentinel = document.getElementById("txFeedSentinel");
+  if (!sentinel) return;
+
+  const feedUrl = sentinel.getAttribute("data-feed-url");
+  const tableBody = document.getElementById("txTableBody");
+  const cards = document.getElementById("txCards");
+  const loadMore = sentinel.querySelector("[data-load-more]");
+
+  let nextCursor = sentinel.getAttribute("data-next-cursor");
+  let loading = false;
+  let observer = null;
+
+  function escapeHtml(value) {
+    return String(value === null || value === undefined ? "" : value)
+      .replace(/&/g, "&amp;")
+      .replace(/</g, "&lt;")
+      .replace(/>/g, "&gt;")
+      .replace(/"/g, "&quot;")
+      .replace(/'/g, "&#39;");
+  }
+
+  function typeBadge(type) {
+    return type === "income"
+      ? '<span class="badge text-bg-success">Income</span>'
+      : '<span class="badge text-bg-danger">Expense</span>';
+  }
+
+  function convertedLine(row, page) {
+    if (page.display_currency === "EUR") return "";
+    const text = row.amount_display === null
+      ? `(${escapeHtml(page.display_currency)} unavailable)`
+      : `≈ ${escapeHtml(page.display_symbol)}${escapeHtml(row.amount_display)}`;
+    return `<div class="small text-muted">${text}</div>`;
+  }
+
+  function originalLine(row) {
+    if (row.currency === "EUR") return "";
+    return `<div class="small text-muted">${escapeHtml(row.original_display)}</div>`;
+  }
+
+  function tableRow(row, page) {
+    const tr = document.createElement("tr");
+    tr.innerHTML = `
+      <td>${escapeHtml(row.date_display)}</td>
+      <td>${typeBadge(row.type)}</td>
+      <td>${escapeHtml(row.category || "—")}</td>
+      <td>${escapeHtml(row.description || "—")}</td>
+      <td class="text-end">€${escapeHtml(row.amount)}${originalLine(row)}${convertedLine(row, page)}</td>
+      <td class="text-end">
+        <a class="btn btn-sm btn-outline-secondary" href="${escapeHtml(row.edit_url)}">Edit</a>
+        <a class="btn btn-sm btn-outline-danger" href="${escapeHtml(row.delete_url)}">Delete</a>
+      </td>`;
+    return tr;
+  }
+
+  function card(row, page) {
+    const div = document.createElement("div");
+    div.className = "card shadow-sm";
+    div.innerHTML = `
+      <div class="card-body p-3">
+        <div class="d-flex justify-content-between align-items-start gap-2">
+          <div class="fw-semibold text-truncate" style="max-width: 70%;">${escapeHtml(row.description || "—")}</div>
+          <div class="text-end">
+            <div class="fw-semibold">€${escapeHtml(row.amount)}</div>
+            ${originalLine(row)}
+            ${convertedLine(row, page)}
+          </div>
+        </div>
+        <div class="row g-2 mt-2 small">
+          <div class="col-6"><div class="text-muted">Date</div><div>${escapeHtml(row.date_display)}</div></div>
+          <div class="col-6"><div class="text-muted">Category</div><div class="text-truncate">${escapeHtml(row.category || "—")}</div></div>
+          <div class="col-6"><div class="text-muted">Type</div><div>${typeBadge(row.type)}</div></div>
+          <div class="col-6">
+            <div class="text-muted">Actions</div>
+            <div class="d-flex gap-2">
+              <a class="btn btn-sm btn-outline-secondary" href="${escapeHtml(row.edit_url)}">Edit</a>
+              <a class="btn btn-sm btn-outline-danger" href="${escapeHtml(row.delete_url)}">Del</a>
+            </div>
+          </div>
+        </div>
+      </div>`;
+    return div;
+  }
+
+  function loadNextPage() {
+    if (loading || !nextCursor) return;
+    loading = true;
+
+    fetch(`${feedUrl}?cursor=${encodeURIComponent(nextCursor)}`, {
+      headers: { "Accept": "application/json" },
+      credentials: "same-origin"
+    })
+      .then((resp) => {
+        if (!resp.ok) throw new Error(`Feed request failed: ${resp.status}`);
+        return resp.json();
+      })
+      .then((page) => {
+        const rowsFragment = document.createDocumentFragment();
+        const cardsFragment = document.createDocumentFragment();
+        page.results.forEach((row) => {
+          rowsFragment.appendChild(tableRow(row, page));
+          cardsFragment.appendChild(card(row, page));
+        });
+        if (tableBody) tableBody.appendChild(rowsFragment);
+        if (cards) cards.appendChild(cardsFragment);
+
+        nextCursor = page.next_cursor;
+        if (!nextCursor) {
+          sentinel.remove();
+        } else {
+          if (loadMore) loadMore.setAttribute("href", `?cursor=${encodeURIComponent(nextCursor)}`);
+          // Re-observe so a sentinel that is still on screen triggers the next page.
+          if (observer) {
+            observer.unobserve(sentinel);
+            observer.observe(sentinel);
+          }
+        }
+      })
+      .catch((err) => {
+        // Leave the "Load older" link in place as a plain-navigation fallback.
+        console.error(err);
+      })
+      .finally(() => {
+        loading = false;
+      });
+  }
+
+  if (loadMore) {
+    loadMore.addEventListener("click", (event) => {
+      event.preventDefault();
+      loadNextPage();
+    });
+  }
+
+  if ("IntersectionObserver" in window) {
+    observer = new IntersectionObserver((entries) => {
+      if (entries.some((entry) => entry.isIntersecting)) loadNextPage();
+    }, { rootMargin: "400px 0px" });
+    observer.observe(sentinel);
+  }
+})();
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Transaction, Budget
+from .models import Category, Transaction, Budget, DailyTotal, FxRate
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -9,11 +9,21 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
-    list_display = ("date", "type", "amount", "category", "user")
-    list_filter = ("type", "date")
+    list_display = ("date", "type", "amount", "original_amount", "currency", "category", "user")
+    list_filter = ("type", "currency", "date")
     search_fields = ("description", "category__name", "user__username")
 
 @admin.register(Budget)
 class BudgetAdmin(admin.ModelAdmin):
     list_display = ("month", "category", "amount", "user")
     list_filter = ("month",)
+
+@admin.register(DailyTotal)
+class DailyTotalAdmin(admin.ModelAdmin):
+    list_display = ("date", "type", "category", "total", "count", "user")
+    list_filter = ("type", "date")
+
+@admin.register(FxRate)
+class FxRateAdmin(admin.ModelAdmin):
+    list_display = ("date", "base", "quote", "rate")
+    list_filter = ("quote",)
@@ -0,0 +1,155 @@
+"""
+Conditional GET (ETag / Last-Modified) for pages that only show the user's own ledger.
+
+Both validators come from LedgerState, which every Transaction/Budget/Category write
+bumps, so a refresh of an unchanged page is answered with 304 after a single primary-key
+lookup - before any of the view's aggregate queries run. A request with flash messages
+waiting gets neither: they have to be rendered (and the page isn't reusable afterwards).
+"""
+import asyncio
+import hashlib
+from collections import namedtuple
+from datetime import datetime, time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from services.currency import aget_latest_rates, get_latest_rates, rate_history_version
+from .models import LedgerState
+
+LedgerVersion = namedtuple("LedgerVersion", "version modified_at")
+
+
+def ledger_state(request):
+    """
+    The user's (version, modified_at), looked up once per request.
+    """
+    state = getattr(request, "_ledger_state", None)
+    if state is None:
+        row = LedgerState.objects.filter(user=request.user).values_list("version", "modified_at").first()
+        state = request._ledger_state = LedgerVersion(*(row or (0, None)))
+    return state
+
+
+def display_variant(currency, always_fx=False):
+    """
+    What a page converted into `currency` depends on besides the ledger: the currency, the
+    live FX table date and the loaded rate history. EUR pages only depend on the FX date
+    when they show the rates themselves (always_fx, e.g. the dashboard).
+    """
+    fx_date = "-"
+    if currency != "EUR" or always_fx:
+        try:
+            fx_date = get_latest_rates(base="EUR", symbols=("USD", "GBP")).date
+        except Exception:
+            fx_date = "unavailable"
+    return currency, fx_date, rate_history_version()
+
+
+async def adisplay_variant(currency, always_fx=False):
+    """
+    display_variant() for async views: the FX table is read without blocking the event loop.
+    """
+    fx_date = "-"
+    if currency != "EUR" or always_fx:
+        try:
+            fx_date = (await aget_latest_rates(base="EUR", symbols=("USD", "GBP"))).date
+        except Exception:
+            fx_date = "unavailable"
+    return currency, fx_date, await sync_to_async(rate_history_version)()
+
+
+def _revalidatable(request):
+    """
+    Whether the page may carry validators: no flash messages are waiting to be shown
+    (a re-import of the same file, say, leaves the ledger version where it was).
+    """
+    return request.user.is_authenticated and not len(get_messages(request))
+
+
+def _etag_value(request, extra):
+    parts = [
+        str(request.user.pk),
+        str(ledger_state(request).version),
+        timezone.localdate().isoformat(),  # every window is relative to today
+        request.get_full_path(),
+        # A re-login rotates the CSRF secret; a cached page's forms would fail with it
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+        *extra,
+    ]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def _etag(variant):
+    def etag(request, *args, **kwargs):
+        if not _revalidatable(request):
+            return None
+        return _etag_value(request, variant(request) if variant else ())
+    return etag
+
+
+def _last_modified(request, *args, **kwargs):
+    if not _revalidatable(request):
+        return None
+    # Never older than local midnight: the day rolling over changes the page too.
+    midnight = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    modified_at = ledger_state(request).modified_at
+    return max(modified_at, midnight) if modified_at else midnight
+
+
+async def _avalidators(request, variant):
+    """
+    (etag, last_modified) for an async view. The variant - a coroutine function such as
+    one awaiting adisplay_variant, or a plain one - runs alongside the LedgerState lookup.
+    """
+    if not (await request.auser()).is_authenticated:
+        return None, None
+
+    async def extra():
+        if variant is None:
+            return ()
+        if iscoroutinefunction(variant):
+            return await variant(request)
+        return await sync_to_async(variant)(request)
+
+    parts, _ = await asyncio.gather(extra(), sync_to_async(ledger_state)(request))
+
+    def validators():
+        if not _revalidatable(request):
+            return None, None
+        return _etag_value(request, parts), _last_modified(request)
+
+    return await sync_to_async(validators)()
+
+
+def ledger_conditional(variant=None):
+    """
+    condition() for a GET view rendered from the user's ledger. variant(request) returns
+    the extra strings the page depends on (see display_variant). Responses are marked
+    private + no-cache so browsers revalidate every time instead of reusing them blindly.
+
+    condition() calls its validators synchronously, so for async views they are resolved
+    off the event loop first (see _avalidators).
+    """
+    def decorator(view):
+        if not iscoroutinefunction(view):
+            conditional = condition(etag_func=_etag(variant), last_modified_func=_last_modified)(view)
+            return cache_control(private=True, no_cache=True)(conditional)
+
+        conditional = condition(
+            etag_func=lambda request, *args, **kwargs: request._ledger_validators[0],
+            last_modified_func=lambda request, *args, **kwargs: request._ledger_validators[1],
+        )(view)
+
+        @wraps(view)
+        async def resolved(request, *args, **kwargs):
+            request._ledger_validators = await _avalidators(request, variant)
+            return await conditional(request, *args, **kwargs)
+
+        return cache_control(private=True, no_cache=True)(resolved)
+    return decorator
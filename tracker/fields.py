@@ -0,0 +1,89 @@
+from decimal import InvalidOperation
+
+from django import forms
+from django.core.exceptions import FullResultSet, ValidationError
+from django.db import models
+from django.db.models.lookups import GreaterThanOrEqual, IntegerFieldOverflow, LessThan
+from django.db.models.query_utils import DeferredAttribute
+
+from services.currency import ECB_BASE
+from services.money import Money
+
+
+class MoneyDescriptor(DeferredAttribute):
+    """
+    Coerces assigned numbers (amounts in units: Decimal("12.50"), "12.50") to Money, so
+    instance.amount is Money however it was set. Expressions (F() updates) pass through.
+    """
+
+    def __set__(self, instance, value):
+        if value is not None and not isinstance(value, Money) and not hasattr(value, "resolve_expression"):
+            try:
+                value = Money.of(value, self.field.currency)
+            except (InvalidOperation, TypeError, ValueError):
+                pass  # left for full_clean() to reject
+        instance.__dict__[self.field.attname] = value
+
+
+class MoneyField(models.BigIntegerField):
+    """
+    A fixed-currency amount stored as integer cents (BIGINT) and read back as Money.
+    Query values and forms use units, like the DecimalField it replaces: filter(amount__gte=10)
+    means 10.00, and the form field is a 2dp DecimalField of form_max_digits.
+    """
+
+    descriptor_class = MoneyDescriptor
+    form_max_digits = 12
+
+    def __init__(self, *args, currency=ECB_BASE, **kwargs):
+        self.currency = currency
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.currency != ECB_BASE:
+            kwargs["currency"] = self.currency
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        # int() too: PostgreSQL sums BIGINT columns as NUMERIC
+        return None if value is None else Money(int(value), self.currency)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Money):
+            return value
+        try:
+            return Money.of(value, self.currency)
+        except (InvalidOperation, TypeError, ValueError):
+            raise ValidationError(self.error_messages["invalid"], code="invalid", params={"value": value})
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        return None if value is None else self.to_python(value).cents
+
+    def run_validators(self, value):
+        # The BIGINT range validators are in cents
+        super().run_validators(value.cents if isinstance(value, Money) else value)
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        return "" if value is None else str(value)
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{
+            "form_class": forms.DecimalField,
+            "max_digits": self.form_max_digits,
+            "decimal_places": 2,
+            **kwargs,
+        })
+
+
+# IntegerField rounds float query values up to whole numbers; MoneyField's are units.
+@MoneyField.register_lookup
+class MoneyGreaterThanOrEqual(IntegerFieldOverflow, GreaterThanOrEqual):
+    underflow_exception = FullResultSet
+
+
+@MoneyField.register_lookup
+class MoneyLessThan(IntegerFieldOverflow, LessThan):
+    overflow_exception = FullResultSet
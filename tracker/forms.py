@@ -1,11 +1,25 @@
 from django import forms
 from django.utils import timezone
-from .models import Transaction, Budget, Category
+
+from services.currencies import CURRENCY_CHOICES
+from services.currency import ECB_BASE
+from .models import MissingRate, Transaction, Budget, Category, set_base_amounts
 
 class TransactionForm(forms.ModelForm):
+    """
+    `amount` is entered in `currency`; the model stores it as original_amount and derives
+    the base-currency amount from the rate of the transaction's date.
+    """
+    currency = forms.ChoiceField(
+        choices=CURRENCY_CHOICES,
+        initial=ECB_BASE,
+        required=False,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+
     class Meta:
         model = Transaction
-        fields = ("type", "category", "amount", "description", "date")
+        fields = ("type", "category", "amount", "currency", "description", "date")
         widgets = {
             "type": forms.Select(attrs={"class": "form-select"}),
             "category": forms.Select(attrs={"class": "form-select"}),
@@ -19,6 +33,26 @@ class TransactionForm(forms.ModelForm):
         if user:
             self.fields["category"].queryset = Category.objects.filter(user=user)
         self.fields["description"].required = False
+        if self.instance.pk:
+            self.initial["amount"] = self.instance.original_amount
+
+    def clean_currency(self):
+        return self.cleaned_data["currency"] or ECB_BASE
+
+    def clean(self):
+        cleaned = super().clean()
+        amount, currency, day = cleaned.get("amount"), cleaned.get("currency"), cleaned.get("date")
+        if amount is not None and currency and currency != ECB_BASE and day:
+            probe = Transaction(amount=amount, currency=currency, original_amount=amount, date=day)
+            try:
+                set_base_amounts([probe])
+            except MissingRate as exc:
+                self.add_error("currency", str(exc))
+        return cleaned
+
+    def save(self, commit=True):
+        self.instance.original_amount = self.cleaned_data["amount"]
+        return super().save(commit)
 
 class BudgetForm(forms.ModelForm):
     class Meta:
@@ -35,3 +69,10 @@ class BudgetForm(forms.ModelForm):
         if user:
             # Budgets normally apply to expenses, but we allow any to keep it simple.
             self.fields["category"].queryset = Category.objects.filter(user=user)
+
+class TransactionImportForm(forms.Form):
+    file = forms.FileField(
+        label="CSV file",
+        help_text="Columns: date, amount and optionally type, category, description, currency.",
+        widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".csv,text/csv"}),
+    )
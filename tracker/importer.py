@@ -0,0 +1,354 @@
+"""
+Streaming CSV import of transactions (bank exports of hundreds of thousands of rows).
+
+Rows are read with a generator and written in chunks, so memory stays flat no matter
+how large the file is. Every imported row stores a content hash (import_hash); rows
+whose hash already exists for the user are skipped, so re-running a file is a no-op -
+even while another import of it is running (see _write_chunk).
+"""
+import csv
+import hashlib
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction as db_transaction
+
+from services.currencies import get_currency
+from services.currency import ECB_BASE
+
+from .models import Category, MissingRate, Transaction, set_base_amounts
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+DEFAULT_BATCH_SIZE = 2000
+CHUNK_ATTEMPTS = 3  # a chunk that lost a race to a concurrent import is re-checked and retried
+MAX_REPORTED_ERRORS = 50
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d.%m.%Y")
+MAX_AMOUNT = Decimal("9999999999.99")  # Transaction.original_amount is max_digits=12, decimal_places=2
+DESCRIPTION_MAX_LENGTH = Transaction._meta.get_field("description").max_length
+CATEGORY_MAX_LENGTH = Category._meta.get_field("name").max_length
+
+TYPE_ALIASES = {
+    "income": Transaction.Type.INCOME,
+    "credit": Transaction.Type.INCOME,
+    "expense": Transaction.Type.EXPENSE,
+    "debit": Transaction.Type.EXPENSE,
+}
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ParsedRow:
+    line: int
+    date: date
+    type: str
+    amount: Decimal
+    category: str
+    description: str
+    currency: str = ECB_BASE
+    import_hash: str = ""
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)  # [(line, message)], first MAX_REPORTED_ERRORS only
+    elapsed: float = 0.0
+    peak_memory_mb: float = None
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        text = (
+            f"{self.rows} rows: {self.created} imported, {self.skipped} already present, "
+            f"{self.failed} invalid in {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/s"
+        )
+        if self.peak_memory_mb is not None:
+            text += f", peak memory {self.peak_memory_mb:.0f} MB"
+        return text + ")"
+
+
+def peak_memory_mb():
+    """
+    Process memory high-water mark in MB, or None where the platform can't tell us.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# -----------------------------
+# Parsing / validation (no Django forms: this runs per row)
+# -----------------------------
+def _parse_date(value):
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise RowError(f"invalid date '{value}'")
+
+
+def _parse_amount(value):
+    cleaned = value.strip().replace(" ", "").replace("€", "")
+    try:
+        amount = Decimal(cleaned)
+    except InvalidOperation:
+        raise RowError(f"invalid amount '{value}'") from None
+    if not amount.is_finite() or amount == 0:
+        raise RowError(f"invalid amount '{value}'")
+    amount = amount.quantize(Decimal("0.01"))
+    if abs(amount) > MAX_AMOUNT:
+        raise RowError(f"amount '{value}' is too large")
+    return amount
+
+
+def _parse_currency(value):
+    if not value.strip():
+        return ECB_BASE
+    currency = get_currency(value)
+    if currency is None:
+        raise RowError(f"unsupported currency '{value}'")
+    return currency.code
+
+
+def parse_row(line, row):
+    """
+    Validate one CSV row (a dict from csv.DictReader) into a ParsedRow.
+
+    Columns: date, amount, and optionally type, category, description, currency (the
+    amount's ISO code, EUR when absent). Without a type, the sign of the amount decides
+    (negative = expense, as in most bank exports).
+    """
+    def col(name):
+        return (row.get(name) or "").strip()
+
+    amount = _parse_amount(col("amount"))
+
+    raw_type = col("type").lower()
+    if raw_type:
+        tx_type = TYPE_ALIASES.get(raw_type)
+        if tx_type is None:
+            raise RowError(f"invalid type '{raw_type}'")
+    else:
+        tx_type = Transaction.Type.EXPENSE if amount < 0 else Transaction.Type.INCOME
+
+    category = col("category")
+    if len(category) > CATEGORY_MAX_LENGTH:
+        raise RowError(f"category is longer than {CATEGORY_MAX_LENGTH} characters")
+
+    return ParsedRow(
+        line=line,
+        date=_parse_date(col("date")),
+        type=tx_type,
+        amount=abs(amount),
+        category=category,
+        description=col("description")[:DESCRIPTION_MAX_LENGTH],
+        currency=_parse_currency(col("currency")),
+    )
+
+
+def read_rows(fileobj):
+    """
+    Yield (line, row_dict) from a CSV text stream. Header names are matched case-insensitively.
+    """
+    reader = csv.DictReader(fileobj)
+    if not reader.fieldnames:
+        return
+    reader.fieldnames = [(name or "").strip().lower() for name in reader.fieldnames]
+    missing = {"date", "amount"} - set(reader.fieldnames)
+    if missing:
+        raise RowError(f"CSV header is missing: {', '.join(sorted(missing))}")
+    for row in reader:
+        if not any((value or "").strip() for value in row.values() if isinstance(value, str)):
+            continue  # blank line
+        yield reader.line_num, row
+
+
+class RowHasher:
+    """
+    import_hash = sha256(row content + occurrence number of that content in the file),
+    so two genuinely identical rows in one export both import, once each. The currency
+    only joins the content when it isn't EUR, so hashes of earlier imports still match.
+    """
+
+    def __init__(self):
+        self._seen = Counter()
+
+    def __call__(self, row):
+        content = "\x1f".join((
+            row.date.isoformat(), row.type, str(row.amount), row.category.lower(), row.description,
+            *((row.currency,) if row.currency != ECB_BASE else ()),
+        ))
+        digest = hashlib.sha256(content.encode()).digest()
+        occurrence = self._seen[digest]
+        self._seen[digest] += 1
+        return hashlib.sha256(digest + str(occurrence).encode()).hexdigest()
+
+
+class CategoryCache:
+    """
+    In-memory (name, kind) -> category id for one user; missing categories are created in bulk.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.reload()
+
+    def reload(self):
+        """
+        Re-read the user's categories (after a rolled-back chunk may have created some).
+        """
+        self._ids = {
+            (name.lower(), kind): pk
+            for pk, name, kind in Category.objects.filter(user=self.user).values_list("id", "name", "kind")
+        }
+
+    def resolve(self, rows):
+        """
+        Return {(name_lower, kind): id} for every named category in rows, creating missing ones.
+        """
+        missing = {}
+        for row in rows:
+            key = (row.category.lower(), row.type)
+            if row.category and key not in self._ids:
+                missing.setdefault(key, row.category)
+
+        if missing:
+            Category.objects.bulk_create(
+                [Category(user=self.user, name=name, kind=kind) for (_, kind), name in missing.items()],
+                ignore_conflicts=True,
+            )
+            # Re-read rather than trust returned pks (ignore_conflicts doesn't set them)
+            for pk, name, kind in (
+                Category.objects.filter(user=self.user, name__in=list(missing.values()))
+                .values_list("id", "name", "kind")
+            ):
+                self._ids.setdefault((name.lower(), kind), pk)
+        return self._ids
+
+    def get(self, row):
+        return self._ids.get((row.category.lower(), row.type)) if row.category else None
+
+
+# -----------------------------
+# Import
+# -----------------------------
+def _chunks(parsed, size):
+    chunk = []
+    for row in parsed:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _existing_hashes(user, rows):
+    return set(
+        Transaction.objects
+        .filter(user=user, import_hash__in=[row.import_hash for row, _ in rows])
+        .values_list("import_hash", flat=True)
+    )
+
+
+def _write_chunk(user, chunk, categories, batch_size):
+    """
+    Insert the chunk's rows whose import_hash the user doesn't have yet, in one DB
+    transaction, and return them. A concurrent import of the same file can commit some
+    of them between the check and the insert: the unique (user, import_hash) constraint
+    then rejects the whole chunk, which is checked again and retried.
+    """
+    for attempt in range(1, CHUNK_ATTEMPTS + 1):
+        try:
+            with db_transaction.atomic():
+                existing = _existing_hashes(user, chunk)
+                new_rows = [(row, tx) for row, tx in chunk if row.import_hash not in existing]
+                categories.resolve(row for row, _ in new_rows)
+                for row, tx in new_rows:
+                    tx.category_id = categories.get(row)
+                    tx.import_hash = row.import_hash
+                # Base amounts were derived per row (to report rows without a rate)
+                Transaction.objects.bulk_create([tx for _, tx in new_rows], batch_size=batch_size, base_amounts=False)
+            return new_rows
+        except IntegrityError:
+            if attempt == CHUNK_ATTEMPTS:
+                raise
+            categories.reload()  # drop ids of categories the rollback removed
+
+
+def import_transactions(user, fileobj, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Import a CSV text stream of transactions for user and return an ImportResult.
+    Each chunk of batch_size rows is written in its own DB transaction (one bulk_create,
+    which also updates DailyTotal); progress(result) is called
+    after every chunk. Rows in a currency without a rate for their date are reported
+    as invalid.
+    """
+    result = ImportResult()
+    started = time.perf_counter()
+    categories = CategoryCache(user)
+    hasher = RowHasher()
+    rate_lookups = {}
+
+    def to_transaction(row):
+        tx = Transaction(
+            user=user,
+            type=row.type,
+            amount=row.amount,
+            currency=row.currency,
+            original_amount=row.amount,
+            description=row.description,
+            date=row.date,
+        )
+        try:
+            set_base_amounts([tx], rate_lookups)
+        except MissingRate as exc:
+            raise RowError(str(exc)) from None
+        return tx
+
+    def valid_rows():
+        for line, raw in read_rows(fileobj):
+            result.rows += 1
+            try:
+                row = parse_row(line, raw)
+                tx = to_transaction(row)
+            except RowError as exc:
+                result.failed += 1
+                if len(result.errors) < MAX_REPORTED_ERRORS:
+                    result.errors.append((line, str(exc)))
+                continue
+            row.import_hash = hasher(row)
+            yield row, tx
+
+    for chunk in _chunks(valid_rows(), batch_size):
+        new_rows = _write_chunk(user, chunk, categories, batch_size)
+        result.created += len(new_rows)
+        result.skipped += len(chunk) - len(new_rows)
+        result.elapsed = time.perf_counter() - started
+        if progress:
+            progress(result)
+
+    result.elapsed = time.perf_counter() - started
+    result.peak_memory_mb = peak_memory_mb()
+    return result
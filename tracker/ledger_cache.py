@@ -0,0 +1,359 @@
+"""
+Per-process columnar cache of users' ledgers, for analytics over arbitrary date ranges
+without a GROUP BY per request.
+
+A user's ledger is four parallel arrays sorted by day - day ordinal, amount in cents
+(the base currency), an expense flag and the category id (-1 = none) - built from one
+values_list().iterator() pass. They are NumPy arrays when NumPy is installed and
+array.array otherwise.
+
+Keeping ledgers current:
+  * Writes in this process append their DailyTotal deltas (see DailyTotalManager.apply)
+    to a small unsorted tail on commit; the tail is merged into the arrays once it grows.
+  * Every LedgerState bump advances the cached version on commit, so a ledger whose
+    version differs from the user's current one missed another process's write and is
+    rebuilt on next use. Writes that can't be expressed as deltas (QuerySet.update(),
+    rollup rebuilds, category deletes) drop the ledger instead.
+  * Commit hooks only touch the ledger object that was cached when the write ran, so a
+    ledger rebuilt in between is never double-counted.
+
+Ledgers are evicted least recently used once their total size exceeds
+LEDGER_CACHE_MAX_BYTES; the cache is off when that is 0 (the default).
+"""
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+
+from services import metrics
+
+try:  # optional: vectorised range scans and group-bys
+    import numpy as np
+except ImportError:  # array.array + Python loops
+    np = None
+
+NO_CATEGORY = -1
+TAIL_MERGE = 4096  # unsorted delta entries kept before they are merged into the arrays
+TAIL_ENTRY_BYTES = 120  # rough size of one tail tuple, for eviction accounting
+BUILD_CHUNK_SIZE = 10000
+
+EXPENSE = "expense"
+INCOME = "income"
+
+
+class ColumnarLedger:
+    """
+    One user's transactions as day-sorted columns plus an unsorted tail of deltas.
+    Queries take inclusive [start, end] dates and an optional type ("expense"/"income");
+    amounts are integer cents.
+    """
+
+    __slots__ = ("user_id", "version", "days", "cents", "expense", "category", "tail", "numpy", "lock")
+
+    def __init__(self, user_id, version, days, cents, expense, category, use_numpy=True):
+        self.user_id = user_id
+        self.version = version
+        self.numpy = use_numpy and np is not None
+        if self.numpy:
+            self.days = np.asarray(days, dtype=np.int32)
+            self.cents = np.asarray(cents, dtype=np.int64)
+            self.expense = np.asarray(expense, dtype=np.int8)
+            self.category = np.asarray(category, dtype=np.int64)
+        else:
+            self.days, self.cents, self.expense, self.category = days, cents, expense, category
+        self.tail = []  # [(day ordinal, cents, expense flag, category id)]
+        self.lock = threading.Lock()
+
+    @classmethod
+    def build(cls, user_id, version, use_numpy=True):
+        from tracker.models import Transaction
+
+        days, cents, expense, category = array("i"), array("q"), array("b"), array("q")
+        rows = (
+            Transaction.objects.filter(user_id=user_id)
+            .order_by("date")
+            .values_list("date", "amount", "type", "category_id")
+        )
+        for day, amount, tx_type, category_id in rows.iterator(chunk_size=BUILD_CHUNK_SIZE):
+            days.append(day.toordinal())
+            cents.append(amount.cents)  # Money
+            expense.append(tx_type == EXPENSE)
+            category.append(NO_CATEGORY if category_id is None else category_id)
+        return cls(user_id, version, days, cents, expense, category, use_numpy=use_numpy)
+
+    def __len__(self):
+        return len(self.days) + len(self.tail)
+
+    @property
+    def nbytes(self):
+        if self.numpy:
+            size = self.days.nbytes + self.cents.nbytes + self.expense.nbytes + self.category.nbytes
+        else:
+            size = sum(a.itemsize * len(a) for a in (self.days, self.cents, self.expense, self.category))
+        return size + len(self.tail) * TAIL_ENTRY_BYTES
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+    def append(self, entries):
+        with self.lock:
+            self.tail.extend(entries)
+            if len(self.tail) >= TAIL_MERGE:
+                self._merge()
+
+    def _merge(self):
+        tail, self.tail = self.tail, []
+        t_days, t_cents, t_expense, t_category = zip(*tail)
+        if self.numpy:
+            days = np.concatenate((self.days, np.asarray(t_days, dtype=np.int32)))
+            order = np.argsort(days, kind="stable")
+            self.days = days[order]
+            self.cents = np.concatenate((self.cents, np.asarray(t_cents, dtype=np.int64)))[order]
+            self.expense = np.concatenate((self.expense, np.asarray(t_expense, dtype=np.int8)))[order]
+            self.category = np.concatenate((self.category, np.asarray(t_category, dtype=np.int64)))[order]
+            return
+        rows = sorted(
+            zip(
+                (*self.days, *t_days), (*self.cents, *t_cents),
+                (*self.expense, *t_expense), (*self.category, *t_category),
+            ),
+            key=lambda row: row[0],
+        )
+        self.days, self.cents, self.expense, self.category = (
+            array(typecode, column) for typecode, column in zip("iqbq", zip(*rows))
+        )
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def _snapshot(self):
+        # Writers swap whole arrays and replace the tail; read a consistent set once.
+        with self.lock:
+            return self.days, self.cents, self.expense, self.category, list(self.tail)
+
+    @staticmethod
+    def _flag(tx_type):
+        return None if tx_type is None else int(tx_type == EXPENSE)
+
+    def _tail_rows(self, tail, start, end, flag):
+        first, last = start.toordinal(), end.toordinal()
+        for day, cents, expense, category in tail:
+            if first <= day <= last and (flag is None or expense == flag):
+                yield day, cents, category
+
+    def range_sum(self, start, end, tx_type=None):
+        """
+        Total cents from start to end (inclusive).
+        """
+        days, cents, expense, _, tail = self._snapshot()
+        flag = self._flag(tx_type)
+        total = sum(c for _, c, _ in self._tail_rows(tail, start, end, flag))
+        if self.numpy:
+            lo, hi = np.searchsorted(days, (start.toordinal(), end.toordinal() + 1))
+            c = cents[lo:hi]
+            if flag is not None:
+                c = c[expense[lo:hi] == flag]
+            return total + int(c.sum())
+        lo, hi = bisect_left(days, start.toordinal()), bisect_right(days, end.toordinal())
+        if flag is None:
+            return total + sum(cents[lo:hi])
+        return total + sum(c for c, e in zip(cents[lo:hi], expense[lo:hi]) if e == flag)
+
+    def _grouped(self, start, end, tx_type, by_category):
+        """
+        {key: cents} over the range, keyed by category id (by_category) or day ordinal.
+        """
+        days, cents, expense, category, tail = self._snapshot()
+        flag = self._flag(tx_type)
+        totals = Counter()
+        for day, c, cat in self._tail_rows(tail, start, end, flag):
+            totals[cat if by_category else day] += c
+
+        if self.numpy:
+            lo, hi = np.searchsorted(days, (start.toordinal(), end.toordinal() + 1))
+            keys = (category if by_category else days)[lo:hi]
+            c = cents[lo:hi]
+            if flag is not None:
+                mask = expense[lo:hi] == flag
+                keys, c = keys[mask], c[mask]
+            if len(keys):
+                if by_category:  # days are already sorted; categories need sorting first
+                    order = np.argsort(keys, kind="stable")
+                    keys, c = keys[order], c[order]
+                starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+                for key, value in zip(keys[starts].tolist(), np.add.reduceat(c, starts).tolist()):
+                    totals[key] += value
+        else:
+            lo, hi = bisect_left(days, start.toordinal()), bisect_right(days, end.toordinal())
+            keys = category if by_category else days
+            for i in range(lo, hi):
+                if flag is None or expense[i] == flag:
+                    totals[keys[i]] += cents[i]
+        return {key: value for key, value in totals.items() if value}
+
+    def by_day(self, start, end, tx_type=None):
+        """
+        {date: cents} for days with a non-zero total.
+        """
+        return {date.fromordinal(day): cents for day, cents in self._grouped(start, end, tx_type, False).items()}
+
+    def by_category(self, start, end, tx_type=None):
+        """
+        {category_id or None: cents} for categories with a non-zero total.
+        """
+        return {
+            (None if category == NO_CATEGORY else category): cents
+            for category, cents in self._grouped(start, end, tx_type, True).items()
+        }
+
+
+class LedgerCache:
+    """
+    user id -> ColumnarLedger, LRU-evicted by total byte size.
+    """
+
+    def __init__(self, max_bytes, use_numpy=True):
+        self.max_bytes = max_bytes
+        self.use_numpy = use_numpy
+        self._ledgers = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def get(self, user_id, version):
+        """
+        The user's ledger at `version` (their LedgerState version), built on a miss.
+        """
+        with self._lock:
+            ledger = self._ledgers.get(user_id)
+            if ledger is not None and ledger.version == version:
+                self._ledgers.move_to_end(user_id)
+                self.stats["hit"] += 1
+                return ledger
+            self.stats["miss"] += 1
+
+        ledger = ColumnarLedger.build(user_id, version, use_numpy=self.use_numpy)
+        with self._lock:
+            self._ledgers[user_id] = ledger
+            self._ledgers.move_to_end(user_id)
+            self._evict()
+        return ledger
+
+    def _evict(self):
+        total = sum(ledger.nbytes for ledger in self._ledgers.values())
+        while total > self.max_bytes and len(self._ledgers) > 1:
+            _, ledger = self._ledgers.popitem(last=False)
+            total -= ledger.nbytes
+            self.stats["evicted"] += 1
+
+    def _cached(self, users):
+        with self._lock:
+            return {user_id: self._ledgers[user_id] for user_id in users if user_id in self._ledgers}
+
+    def record(self, deltas):
+        """
+        Queue {(user_id, date, type, category_id): [amount, count]} deltas for the ledgers
+        cached right now; they are appended when the surrounding transaction commits.
+        """
+        targets = self._cached({key[0] for key in deltas})
+        if not targets:
+            return
+        entries = {}
+        for (user_id, day, tx_type, category_id), (amount, _) in deltas.items():
+            if user_id in targets and amount:
+                entries.setdefault(user_id, []).append((
+                    day.toordinal(), amount.cents, int(tx_type == EXPENSE),
+                    NO_CATEGORY if category_id is None else category_id,
+                ))
+
+        def apply():
+            with self._lock:
+                for user_id, ledger in targets.items():
+                    if self._ledgers.get(user_id) is ledger and user_id in entries:
+                        ledger.append(entries[user_id])
+                self._evict()
+
+        db_transaction.on_commit(apply)
+
+    def advance(self, users):
+        """
+        The users' LedgerState versions were bumped: follow on commit (users=None: everyone).
+        """
+        if users is None:
+            self.invalidate()
+            return
+        targets = self._cached(users)
+        if not targets:
+            return
+
+        def apply():
+            with self._lock:
+                for user_id, ledger in targets.items():
+                    if self._ledgers.get(user_id) is ledger:
+                        ledger.version += 1
+
+        db_transaction.on_commit(apply)
+
+    def invalidate(self, users=None):
+        """
+        Drop the users' ledgers (everyone's when None) once the surrounding transaction commits.
+        """
+        def apply():
+            with self._lock:
+                if users is None:
+                    self._ledgers.clear()
+                else:
+                    for user_id in users:
+                        self._ledgers.pop(user_id, None)
+
+        db_transaction.on_commit(apply)
+
+    def clear(self):
+        with self._lock:
+            self._ledgers.clear()
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(ledger.nbytes for ledger in self._ledgers.values())
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def ledger_cache():
+    """
+    This process's LedgerCache, or None when LEDGER_CACHE_MAX_BYTES is 0.
+    """
+    global _cache
+    max_bytes = getattr(settings, "LEDGER_CACHE_MAX_BYTES", 0)
+    if not max_bytes:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.max_bytes != max_bytes:
+            _cache = LedgerCache(max_bytes)
+        return _cache
+
+
+def get_ledger(user_id, version):
+    """
+    The user's cached ledger at `version`, or None when the cache is off.
+    """
+    cache = ledger_cache()
+    return cache.get(user_id, version) if cache else None
+
+
+def _stats_collector():
+    counters = Counter()
+    if _cache is not None:
+        with _cache._lock:
+            for result, count in _cache.stats.items():
+                counters[metrics.counter_key("ledger_cache_requests_total", result=result)] += count
+    return counters
+
+
+metrics.register_collector(_stats_collector)
@@ -0,0 +1,328 @@
+import json
+import math
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from core.views import DASHBOARD_SECTIONS, _build_trend_series
+from services.currency import RatesResult
+from tracker.management.commands.seed_demo_data import _copy_supported, seed_users
+from tracker.ledger_cache import ColumnarLedger, LedgerCache
+from tracker.models import LedgerState, Transaction
+
+
+User = get_user_model()
+
+# Offline, repeatable FX: every run sees the same table and no network call is made.
+BENCH_RATES = RatesResult(
+    base="EUR",
+    date="2025-01-02",
+    rates={"USD": Decimal("1.0921"), "GBP": Decimal("0.8512"), "JPY": Decimal("161.45")},
+)
+BENCH_DAYS = 5 * 365  # fixture history length; tx/day is sized to hit the row target
+ROWS_PER_DAY_OVERHEAD = 0.22  # weekly salary + occasional freelance income (see generate_transactions)
+ANALYTICS_DAYS = 365  # window of the range_* targets
+
+
+def parse_size(value):
+    """
+    "1k" -> 1000, "100k" -> 100000, "1m" -> 1000000, "250" -> 250.
+    """
+    text = value.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    number = text[:-1] if multiplier != 1 else text
+    try:
+        return int(float(number) * multiplier)
+    except ValueError:
+        raise CommandError(f"Invalid size '{value}' (use e.g. 1k, 100k, 1m)")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class QueryTimer:
+    """
+    connection.execute_wrapper that counts queries and their wall time with perf_counter
+    (connection.queries only keeps millisecond resolution).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def range_analytics_sql(user, start, end):
+    """
+    Expense total, by category and by day over [start, end], aggregated by the database
+    from the transactions themselves.
+    """
+    expenses = Transaction.objects.filter(user=user, type=Transaction.Type.EXPENSE, date__range=(start, end))
+    total = expenses.aggregate(total=Sum("amount"))["total"]
+    by_category = dict(expenses.order_by().values_list("category_id").annotate(Sum("amount")))
+    by_day = dict(expenses.order_by().values_list("date").annotate(Sum("amount")))
+    return total, by_category, by_day
+
+
+def range_analytics_ledger(cache, user, start, end):
+    """
+    range_analytics_sql() from the user's cached ledger: one version lookup, then in memory.
+    """
+    version = LedgerState.objects.filter(user=user).values_list("version", flat=True).first() or 0
+    ledger = cache.get(user.pk, version)
+    expense = Transaction.Type.EXPENSE
+    return ledger.range_sum(start, end, expense), ledger.by_category(start, end, expense), ledger.by_day(start, end, expense)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the dashboard (page and data endpoints), trend series, transaction list and budget views, and "
+        "range analytics in SQL vs the in-memory ledger cache, against fixture users of a given size, with FX "
+        "stubbed. Runs in a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", default=["1k", "100k", "1m"], help="Transactions per fixture user.")
+        parser.add_argument("--runs", type=int, default=20, help="Timed requests per view (after one warm-up).")
+        parser.add_argument("--currency", default="EUR", help="Display currency stored in the session.")
+        parser.add_argument("--json", dest="json_path", help="Also write results as JSON to this path ('-' = stdout).")
+        parser.add_argument("--compare", help="Previous --json output to show p50 deltas against.")
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the test database (and its fixtures) between runs; useful on PostgreSQL.",
+        )
+        parser.add_argument(
+            "--use-current-db",
+            action="store_true",
+            help="Seed and measure in the configured database instead of a test database.",
+        )
+
+    def handle(self, *args, **options):
+        sizes = [(label, parse_size(label)) for label in options["sizes"]]
+        if options["runs"] < 1:
+            raise CommandError("--runs must be at least 1.")
+
+        old_name = None
+        if not options["use_current_db"]:
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, keepdb=options["keepdb"], serialize=False,
+            )
+        try:
+            setup_test_environment()
+            environment_set_up = True
+        except RuntimeError:  # already inside a test run
+            environment_set_up = False
+
+        try:
+            with mock.patch("services.currency.get_rate_table", return_value=BENCH_RATES):
+                results = []
+                for label, size in sizes:
+                    user = self._fixture_user(label, size)
+                    results.extend(self._bench_user(label, user, options))
+        finally:
+            if environment_set_up:
+                teardown_test_environment()
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+        report = {
+            "meta": {
+                "revision": _git_revision(),
+                "created": timezone.now().isoformat(),
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "runs": options["runs"],
+                "currency": options["currency"],
+            },
+            "results": results,
+        }
+        baseline = self._load_baseline(options["compare"])
+        self._print_table(results, baseline)
+
+        if options["json_path"] == "-":
+            self.stdout.write(json.dumps(report, indent=2))
+        elif options["json_path"]:
+            with open(options["json_path"], "w", encoding="utf-8") as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Wrote {options['json_path']}")
+
+    # -----------------------------
+    # Fixtures
+    # -----------------------------
+    def _fixture_user(self, label, size):
+        user, _ = User.objects.get_or_create(username=f"bench_{label}")
+        existing = Transaction.objects.filter(user=user).count()
+        if existing and abs(existing - size) <= size * 0.25:
+            return user  # reuse (--keepdb / --use-current-db)
+
+        if existing:
+            Transaction.objects.filter(user=user).delete()
+        days = min(BENCH_DAYS, max(1, round(size / (1 + ROWS_PER_DAY_OVERHEAD))))
+        tx_per_day = max(1, round(size / days - ROWS_PER_DAY_OVERHEAD))
+        today = timezone.localdate()
+
+        self.stdout.write(f"Seeding {user.username} (~{size} transactions over {days} days)...")
+        started = time.perf_counter()
+        method = "copy" if _copy_supported() else "bulk"
+        written = seed_users(
+            [user.pk], today - timedelta(days=days - 1), today,
+            tx_per_day=tx_per_day, seed=0, batch_size=5000, method=method,
+        )
+        self.stdout.write(f"  {written} rows in {time.perf_counter() - started:.1f}s")
+        return user
+
+    # -----------------------------
+    # Measurement
+    # -----------------------------
+    def _bench_user(self, label, user, options):
+        client = Client()
+        client.force_login(user)
+        session = client.session
+        session["display_currency"] = options["currency"]
+        session.save()
+
+        def get(name, *args):
+            def request():
+                response = client.get(reverse(name, args=args))
+                if response.status_code != 200:
+                    raise CommandError(f"{name} returned {response.status_code}")
+            return request
+
+        data_requests = [get("dashboard_data", section) for section in DASHBOARD_SECTIONS]
+        end = timezone.localdate()
+        start = end - timedelta(days=ANALYTICS_DAYS - 1)
+        ledgers = LedgerCache(max_bytes=1 << 40)  # private: the warm-up builds, timed runs hit
+        python_ledgers = LedgerCache(max_bytes=1 << 40, use_numpy=False)
+
+        def fetch_data():
+            for fetch in data_requests:
+                fetch()
+
+        def new_version():
+            LedgerState.objects.bump([user.pk])
+
+        # name, fn[, untimed setup before each run]. The dashboard's parts are cached under
+        # the ledger version, so after the warm-up the plain targets measure cache hits; the
+        # *_uncached ones bump the version first, as a write would, and compute every part.
+        targets = [
+            ("dashboard", get("dashboard")),
+            ("dashboard_uncached", get("dashboard"), new_version),
+            # What dashboard_charts.js fetches after the page has rendered
+            ("dashboard_data", fetch_data),
+            ("dashboard_data_uncached", fetch_data, new_version),
+            ("trend_series", lambda: _build_trend_series(user, days=30)),
+            ("transaction_list", get("transaction_list")),
+            ("budget_overview", get("budget_overview")),
+            # Year of expenses: total, by category, by day
+            ("range_sql", lambda: range_analytics_sql(user, start, end)),
+            ("range_ledger", lambda: range_analytics_ledger(ledgers, user, start, end)),
+            ("range_ledger_py", lambda: range_analytics_ledger(python_ledgers, user, start, end)),
+            ("ledger_build", lambda: ColumnarLedger.build(user.pk, 0)),
+        ]
+        transactions = Transaction.objects.filter(user=user).count()
+        return [
+            {"size": label, "transactions": transactions, "target": name, **self._measure(fn, options["runs"], *setup)}
+            for name, fn, *setup in targets
+        ]
+
+    def _measure(self, fn, runs, setup=None):
+        fn()  # warm-up: caches, timelines, compiled templates
+
+        latencies = []
+        queries = []
+        sql_times = []
+        for _ in range(runs):
+            if setup:
+                setup()
+            timer = QueryTimer()
+            with connection.execute_wrapper(timer):
+                started = time.perf_counter()
+                fn()
+                latencies.append(time.perf_counter() - started)
+            queries.append(timer.count)
+            sql_times.append(timer.seconds)
+
+        # Separate traced run: tracemalloc would distort the timings above
+        if setup:
+            setup()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        ms = [value * 1000 for value in latencies]
+        return {
+            "p50_ms": round(percentile(ms, 50), 2),
+            "p95_ms": round(percentile(ms, 95), 2),
+            "p99_ms": round(percentile(ms, 99), 2),
+            "mean_ms": round(sum(ms) / len(ms), 2),
+            "queries": max(queries),
+            "sql_ms": round(percentile(sql_times, 50) * 1000, 2),
+            "peak_kb": round(peak / 1024),
+        }
+
+    # -----------------------------
+    # Output
+    # -----------------------------
+    def _load_baseline(self, path):
+        if not path:
+            return {}
+        try:
+            with open(path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Could not read --compare file: {exc}")
+        return {(row["size"], row["target"]): row for row in data.get("results", [])}
+
+    def _print_table(self, results, baseline):
+        header = f"{'size':>6}  {'target':<24} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>7} {'sql':>9} {'peak':>9}"
+        if baseline:
+            header += f" {'Δp50':>8}"
+        self.stdout.write(header)
+        for row in results:
+            line = (
+                f"{row['size']:>6}  {row['target']:<24} {row['p50_ms']:>7.1f}ms {row['p95_ms']:>7.1f}ms "
+                f"{row['p99_ms']:>7.1f}ms {row['queries']:>7} {row['sql_ms']:>7.1f}ms {row['peak_kb']:>7}KB"
+            )
+            before = baseline.get((row["size"], row["target"]))
+            if before and before.get("p50_ms"):
+                change = (row["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+                line += f" {change:>+7.0f}%"
+            self.stdout.write(line)
@@ -0,0 +1,73 @@
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from core.cache import TwoTierCache
+from tracker.management.commands.bench import percentile
+
+KEY_PREFIX = "bench_cache"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare cache read latency across tiers: in-process LocMemCache, the shared L2 alone, "
+        "and the two-tier default cache on an L1 hit, an L1 miss served by L2, and a full miss."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000, help="Reads per scenario.")
+        parser.add_argument("--value-kb", type=float, default=4, help="Size of the cached value.")
+        parser.add_argument("--alias", default="default", help="Two-tier cache alias to measure.")
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        if iterations < 1:
+            raise CommandError("--iterations must be at least 1.")
+
+        tiered = caches[options["alias"]]
+        if not isinstance(tiered, TwoTierCache):
+            raise CommandError(f"CACHES['{options['alias']}'] is not a core.cache.TwoTierCache.")
+        shared = tiered.l2
+        local = LocMemCache(f"{KEY_PREFIX}-locmem", {})
+
+        value = {"payload": "x" * int(options["value_kb"] * 1024)}
+        keys = [f"{KEY_PREFIX}:{i}" for i in range(iterations)]
+        hot = f"{KEY_PREFIX}:hot"
+
+        try:
+            local.set(hot, value, 300)
+            shared.set(hot, value, 300)
+            tiered.set(hot, value, 300)
+            # Present in L2 only, so every two-tier read below is an L1 miss
+            shared.set_many({key: value for key in keys}, 300)
+
+            scenarios = [
+                ("locmem hit", lambda i: local.get(hot)),
+                (f"L2 hit ({type(shared).__name__})", lambda i: shared.get(hot)),
+                ("two-tier L1 hit", lambda i: tiered.get(hot)),
+                ("two-tier L1 miss, L2 hit", lambda i: tiered.get(keys[i])),
+                ("two-tier miss", lambda i: tiered.get(f"{KEY_PREFIX}:absent:{i}")),
+            ]
+            self.stdout.write(f"{'scenario':<34} {'p50':>10} {'p95':>10} {'p99':>10}")
+            for label, read in scenarios:
+                read(0)  # warm-up: connections, imports
+                timings = []
+                for i in range(iterations):
+                    started = time.perf_counter()
+                    read(i)
+                    timings.append((time.perf_counter() - started) * 1_000_000)
+                self.stdout.write(
+                    f"{label:<34} {percentile(timings, 50):>8.1f}us {percentile(timings, 95):>8.1f}us "
+                    f"{percentile(timings, 99):>8.1f}us"
+                )
+        except DatabaseError as exc:
+            raise CommandError(f"L2 cache is not usable ({exc}); run `manage.py createcachetable`.")
+        finally:
+            try:
+                shared.delete_many(keys + [hot])
+            except DatabaseError:
+                pass
+            local.clear()
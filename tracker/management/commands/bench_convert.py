@@ -0,0 +1,82 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from services import currency
+from services.currency import convert, convert_cents, from_cents, to_cents
+from services.money import Money
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark per-value convert() against Money and the batch integer-cent conversion, "
+        "and summing Decimal amounts against Money and plain cents"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[10_000, 1_000_000],
+            help="Number of amounts to convert per run (default: 10000 1000000).",
+        )
+        parser.add_argument("--rate", type=str, default="1.0921")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rate = Decimal(options["rate"])
+        rng = random.Random(options["seed"])
+        num, den = rate.as_integer_ratio()
+
+        self.stdout.write(f"NumPy: {'yes' if currency.np is not None else 'not installed (pure-Python only)'}")
+        self.stdout.write(f"{'values':>10}  {'method':<24} {'total':>10}  {'per value':>10}")
+
+        for size in options["sizes"]:
+            cents = [rng.randint(-5_000_000, 5_000_000) for _ in range(size)]
+            amounts = [from_cents(c) for c in cents]
+            moneys = [Money(c) for c in cents]
+
+            runs = [
+                ("convert() per value", lambda: [convert(a, rate) for a in amounts]),
+                ("Money.convert per value", lambda: [m.convert(rate) for m in moneys]),
+                ("convert_cents (Python)", lambda: currency._scale(cents, num, den, use_numpy=False)),
+            ]
+            if currency.np is not None:
+                runs.append(("convert_cents (NumPy)", lambda: convert_cents(cents, rate)))
+
+            expected = None
+            for label, fn in runs:
+                started = time.perf_counter()
+                result = fn()
+                elapsed = time.perf_counter() - started
+
+                as_cents = [to_cents(a) for a in result] if isinstance(result[0], (Decimal, Money)) else result
+                if expected is None:
+                    expected = as_cents
+                elif as_cents != expected:
+                    self.stderr.write(self.style.ERROR(f"{label} disagrees with convert() at {size} values"))
+                self._report(size, label, elapsed)
+
+            sums = [
+                ("sum() of Decimals", lambda: to_cents(sum(amounts))),
+                ("sum() of Money", lambda: sum(moneys, Money()).cents),
+                ("Money.sum", lambda: Money.sum(moneys).cents),
+                ("sum() of int cents", lambda: sum(cents)),
+            ]
+            expected = None
+            for label, fn in sums:
+                started = time.perf_counter()
+                total = fn()
+                elapsed = time.perf_counter() - started
+
+                if expected is None:
+                    expected = total
+                elif total != expected:
+                    self.stderr.write(self.style.ERROR(f"{label} disagrees with the Decimal sum at {size} values"))
+                self._report(size, label, elapsed)
+
+    def _report(self, size, label, elapsed):
+        self.stdout.write(f"{size:>10}  {label:<24} {elapsed * 1000:>8.1f}ms  {elapsed / size * 1e9:>8.0f}ns")
@@ -0,0 +1,225 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils import timezone
+
+from core.views import DASHBOARD_SECTIONS
+from services.currency import TABLE_CACHE_KEY
+from tracker.management.commands.bench import percentile
+
+User = get_user_model()
+
+# mode -> (gunicorn app, extra gunicorn args, URLs of one dashboard view). Both modes load
+# the page plus the dashboard_data sections it leaves to the browser, so each view costs the
+# same FX lookup and aggregates: the sync shell fetches every section, the async page has
+# the summary and rates rendered in.
+MODES = {
+    "sync": (
+        "finance_tracker.wsgi:application", [],
+        ["/dashboard/", *(f"/dashboard/data/{section}/" for section in DASHBOARD_SECTIONS)],
+    ),
+    "async": (
+        "finance_tracker.asgi:application", ["-k", "uvicorn.workers.UvicornWorker"],
+        ["/dashboard/async/", *(
+            f"/dashboard/data/{section}/" for section in DASHBOARD_SECTIONS if section not in ("summary", "rates")
+        )],
+    ),
+}
+STARTUP_TIMEOUT = 30
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def fx_stub(latency):
+    """
+    A local Frankfurter stand-in that answers every request after `latency` seconds.
+    Returns the started server; its URL is http://127.0.0.1:<server_port>/latest.
+    """
+    body = json.dumps({
+        "base": "EUR",
+        "date": timezone.localdate().isoformat(),
+        "rates": {"USD": 1.1, "GBP": 0.85},
+    }).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fx-stub", daemon=True).start()
+    return server
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the dashboard under gunicorn sync workers vs uvicorn (ASGI) workers, with "
+        "the FX provider replaced by a local stub of configurable latency. The comparison is "
+        "like-for-like: each client loop is one full dashboard view, i.e. the page plus the "
+        "dashboard_data requests the browser makes after it (the sync shell and all five "
+        "sections; the async page, which renders the summary and rates, and the other three), "
+        "and latencies are per view. Uses the configured database and cache, so run it "
+        "against a seeded database (seed_demo_data)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", nargs="?", default="demo_user", help="User to load the dashboard as.")
+        parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=["sync", "async"])
+        parser.add_argument("--workers", type=int, default=2, help="Gunicorn worker processes.")
+        parser.add_argument("--concurrency", type=int, default=16, help="Concurrent client connections.")
+        parser.add_argument("--duration", type=float, default=10, help="Seconds of load per mode.")
+        parser.add_argument("--fx-latency", type=float, default=0.5, help="Stub FX response time (seconds).")
+        parser.add_argument(
+            "--warm-fx",
+            action="store_true",
+            help="Start with the FX table cached; by default each mode starts cold, so the "
+                 "first requests wait for the (slow) provider.",
+        )
+        parser.add_argument(
+            "--no-dashboard-cache",
+            action="store_true",
+            help="Run the servers with DASHBOARD_CACHE_TIMEOUT=0, so every request runs the aggregates.",
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["duration"] <= 0:
+            raise CommandError("--concurrency must be at least 1 and --duration positive.")
+        if "async" in options["modes"]:
+            try:
+                import uvicorn  # noqa: F401
+            except ImportError:
+                raise CommandError("The async mode needs uvicorn: pip install 'uvicorn[standard]'.")
+
+        user = User.objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"User '{options['username']}' not found; run seed_demo_data first.")
+        client = Client()
+        client.force_login(user)
+        cookies = {settings.SESSION_COOKIE_NAME: client.cookies[settings.SESSION_COOKIE_NAME].value}
+
+        stub = fx_stub(options["fx_latency"])
+        try:
+            results = [self._run_mode(mode, cookies, stub, options) for mode in options["modes"]]
+        finally:
+            stub.shutdown()
+
+        self.stdout.write(
+            f"{'mode':<6} {'views/s':>8} {'ok':>6} {'errors':>6} {'p50':>9} {'p95':>9} {'p99':>9}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['mode']:<6} {row['rps']:>8.1f} {row['ok']:>6} {row['errors']:>6} "
+                f"{row['p50_ms']:>7.1f}ms {row['p95_ms']:>7.1f}ms {row['p99_ms']:>7.1f}ms"
+            )
+
+    def _run_mode(self, mode, cookies, stub, options):
+        app, worker_args, paths = MODES[mode]
+        port = _free_port()
+        env = {
+            **os.environ,
+            "FX_LATEST_URL": f"http://127.0.0.1:{stub.server_port}/latest",
+            "PERF_SLOW_REQUEST_MS": "600000",  # keep the servers' logs quiet
+        }
+        if options["no_dashboard_cache"]:
+            env["DASHBOARD_CACHE_TIMEOUT"] = "0"
+        if not options["warm_fx"]:
+            cache.delete(TABLE_CACHE_KEY)
+
+        server = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn", app,
+                "--bind", f"127.0.0.1:{port}",
+                "--workers", str(options["workers"]),
+                "--log-level", "warning",
+                *worker_args,
+            ],
+            env=env,
+        )
+        base = f"http://127.0.0.1:{port}"
+        try:
+            self._wait_until_up(server, f"{base}/")
+            self.stdout.write(
+                f"{mode}: {options['concurrency']} clients for {options['duration']:.0f}s on {', '.join(paths)}"
+            )
+            return {"mode": mode, **self._load([f"{base}{path}" for path in paths], cookies, options)}
+        finally:
+            server.terminate()
+            server.wait(timeout=STARTUP_TIMEOUT)
+
+    def _wait_until_up(self, server, url):
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"The server exited with {server.returncode} before serving {url}.")
+            try:
+                requests.get(url, timeout=1)
+                return
+            except requests.RequestException:
+                time.sleep(0.2)
+        raise CommandError(f"The server did not answer {url} within {STARTUP_TIMEOUT}s.")
+
+    def _load(self, urls, cookies, options):
+        """
+        Drive `urls` from concurrent clients, each fetching them in turn as one dashboard
+        view; a view counts as ok when every response is a 200.
+        """
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        started = time.monotonic()
+        deadline = started + options["duration"]
+
+        def worker():
+            session = requests.Session()
+            session.cookies.update(cookies)
+            while time.monotonic() < deadline:
+                request_started = time.perf_counter()
+                try:
+                    ok = all(
+                        session.get(url, timeout=60, allow_redirects=False).status_code == 200 for url in urls
+                    )
+                except requests.RequestException:
+                    ok = False
+                elapsed = (time.perf_counter() - request_started) * 1000
+                with lock:
+                    (latencies if ok else errors).append(elapsed)
+
+        threads = [threading.Thread(target=worker) for _ in range(options["concurrency"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        return {
+            "rps": len(latencies) / elapsed,
+            "ok": len(latencies),
+            "errors": len(errors),
+            "p50_ms": percentile(latencies, 50) if latencies else 0.0,
+            "p95_ms": percentile(latencies, 95) if latencies else 0.0,
+            "p99_ms": percentile(latencies, 99) if latencies else 0.0,
+        }
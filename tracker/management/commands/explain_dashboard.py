@@ -0,0 +1,114 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from tracker.models import DailyTotal, LedgerState, Transaction, Budget
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Print EXPLAIN plans for the dashboard, transaction list and budget queries of a user"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", type=str)
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="PostgreSQL only: run EXPLAIN (ANALYZE, BUFFERS) so real timings and row counts are shown.",
+        )
+
+    def handle(self, *args, **options):
+        username = options["username"]
+
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            self.stderr.write(self.style.ERROR(f"User '{username}' does not exist"))
+            return
+
+        explain_options = {}
+        if options["analyze"]:
+            if connection.vendor != "postgresql":
+                self.stderr.write(self.style.WARNING("--analyze is only supported on PostgreSQL, ignoring."))
+            else:
+                explain_options = {"analyze": True, "buffers": True}
+
+        for label, qs in self.build_queries(user):
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {label} =="))
+            self.stdout.write(str(qs.query))
+            self.stdout.write(qs.explain(**explain_options))
+            self.stdout.write("")
+
+    def build_queries(self, user):
+        """
+        Mirror the hot queries issued by core.views.dashboard, _build_trend_series,
+        TransactionListView and budget_overview for the current month.
+        """
+        today = timezone.localdate()
+        month_start = today.replace(day=1)
+        trend_start = today - timedelta(days=29)
+        bars_start = today - timedelta(days=13)
+
+        month_rollup = DailyTotal.objects.filter(user=user, date__gte=month_start, date__lte=today)
+        month_expenses = month_rollup.filter(type=Transaction.Type.EXPENSE)
+
+        # .explain() needs a QuerySet, so aggregates are expressed as grouped
+        # querysets with the same WHERE clause as the .aggregate() calls.
+        return [
+            (
+                "dashboard: data version (cache key; the queries below only run on a miss)",
+                LedgerState.objects.filter(user=user).values_list("version", flat=True),
+            ),
+            (
+                "dashboard: month totals, spending by category and 14-day bars (one rollup query)",
+                DailyTotal.objects.filter(user=user, date__gte=min(bars_start, month_start), date__lte=today)
+                .values("date", "category_id", "category__name")
+                .annotate(
+                    income=Sum("total", filter=Q(type=Transaction.Type.INCOME)),
+                    expense=Sum("total", filter=Q(type=Transaction.Type.EXPENSE)),
+                )
+                .order_by(),
+            ),
+            (
+                "dashboard: budgets",
+                Budget.objects.filter(user=user, month=month_start).select_related("category"),
+            ),
+            (
+                "dashboard_data trend / _build_trend_series: daily expenses (30 days)",
+                DailyTotal.objects.filter(
+                    user=user,
+                    type=Transaction.Type.EXPENSE,
+                    date__gte=trend_start,
+                    date__lte=today,
+                ).values("date").annotate(total=Sum("total")).order_by("date"),
+            ),
+            (
+                "TransactionListView: first keyset page (converted to USD in SQL)",
+                Transaction.objects.filter(user=user).select_related("category")
+                .with_display_amount("USD", Decimal("1"))
+                .order_by("-date", "-created_at", "-id")[:51],
+            ),
+            (
+                "TransactionListView: month totals",
+                month_rollup.values("user").annotate(
+                    income=Sum("total", filter=Q(type=Transaction.Type.INCOME)),
+                    expense=Sum("total", filter=Q(type=Transaction.Type.EXPENSE)),
+                ).order_by(),
+            ),
+            (
+                "budget_overview: budgets",
+                Budget.objects.filter(user=user, month=month_start).select_related("category"),
+            ),
+            (
+                "budget_overview: spending by category",
+                month_expenses.values("category__id", "category__name")
+                .annotate(total=Sum("total")).order_by("-total"),
+            ),
+        ]
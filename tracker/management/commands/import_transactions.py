@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.importer import DEFAULT_BATCH_SIZE, RowError, import_transactions
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV bank export into a user's transactions (re-running the same file is a no-op)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", type=str)
+        parser.add_argument("path", type=str, help="CSV with date, amount and optional type, category, description, currency columns")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--encoding", type=str, default="utf-8-sig")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        verbosity = options["verbosity"]
+
+        def progress(result):
+            if verbosity >= 2:
+                self.stdout.write(
+                    f"  {result.rows} rows read, {result.created} imported ({result.rows_per_second:,.0f} rows/s)"
+                )
+
+        try:
+            with open(options["path"], newline="", encoding=options["encoding"]) as fh:
+                result = import_transactions(user, fh, batch_size=options["batch_size"], progress=progress)
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except RowError as exc:
+            raise CommandError(str(exc))
+
+        for line, message in result.errors:
+            self.stderr.write(self.style.WARNING(f"line {line}: {message}"))
+        if result.failed > len(result.errors):
+            self.stderr.write(self.style.WARNING(f"... and {result.failed - len(result.errors)} more invalid rows"))
+
+        self.stdout.write(self.style.SUCCESS(result.summary()))
@@ -0,0 +1,125 @@
+import csv
+import time
+import xml.etree.ElementTree as ET
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from services.currency import ECB_BASE, invalidate_rate_timelines
+from tracker.models import FxRate
+
+
+def _parse_date(value):
+    value = value.strip()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        # eurofxref.csv (single day) uses "05 January 2024"
+        return datetime.strptime(value, "%d %B %Y").date()
+
+
+def _parse_rate(value):
+    try:
+        rate = Decimal(value.strip())
+    except InvalidOperation:
+        return None  # "N/A" for currencies not published that day
+    return rate if rate > 0 else None
+
+
+def read_ecb_csv(path):
+    """
+    Yield (date, quote, rate) from eurofxref-hist.csv / eurofxref.csv.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        reader = csv.reader(fh)
+        header = [col.strip() for col in next(reader)]
+        for row in reader:
+            if not row or not row[0].strip():
+                continue
+            day = _parse_date(row[0])
+            for quote, value in zip(header[1:], row[1:]):
+                if not quote:
+                    continue  # trailing comma in ECB files
+                rate = _parse_rate(value)
+                if rate is not None:
+                    yield day, quote, rate
+
+
+def read_ecb_xml(path):
+    """
+    Yield (date, quote, rate) from eurofxref-hist.xml / eurofxref-daily.xml,
+    streaming so the 30 MB history file is never held in memory.
+    """
+    day = None
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if not elem.tag.endswith("Cube"):
+            continue
+        if event == "start" and "time" in elem.attrib:
+            day = _parse_date(elem.attrib["time"])
+        elif event == "end":
+            if "currency" in elem.attrib and day is not None:
+                rate = _parse_rate(elem.attrib.get("rate", ""))
+                if rate is not None:
+                    yield day, elem.attrib["currency"], rate
+            elif "time" in elem.attrib:
+                elem.clear()
+
+
+class Command(BaseCommand):
+    help = "Bulk-load historical ECB reference rates (CSV or XML) into FxRate"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=str, help="eurofxref-hist.csv / .xml (or the daily files)")
+        parser.add_argument(
+            "--format",
+            choices=("auto", "csv", "xml"),
+            default="auto",
+            help="File format (default: guess from the extension).",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"File '{path}' does not exist")
+
+        fmt = options["format"]
+        if fmt == "auto":
+            fmt = "xml" if path.suffix.lower() == ".xml" else "csv"
+        rows = read_ecb_xml(path) if fmt == "xml" else read_ecb_csv(path)
+
+        batch_size = options["batch_size"]
+        started = time.perf_counter()
+        loaded = 0
+        first = last = None
+
+        with transaction.atomic():
+            batch = []
+            for day, quote, rate in rows:
+                batch.append(FxRate(base=ECB_BASE, quote=quote, date=day, rate=rate))
+                first = day if first is None or day < first else first
+                last = day if last is None or day > last else last
+                if len(batch) >= batch_size:
+                    loaded += self._upsert(batch)
+                    batch = []
+            if batch:
+                loaded += self._upsert(batch)
+
+        invalidate_rate_timelines()
+
+        elapsed = time.perf_counter() - started
+        span = f" ({first} → {last})" if first else ""
+        self.stdout.write(self.style.SUCCESS(f"Loaded {loaded} FX rates{span} in {elapsed:.2f}s"))
+
+    def _upsert(self, batch):
+        # Re-loading a corrected file overwrites the rate for existing (base, quote, date) rows.
+        FxRate.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=["base", "quote", "date"],
+            update_fields=["rate"],
+        )
+        return len(batch)
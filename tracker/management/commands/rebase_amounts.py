@@ -0,0 +1,72 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+
+from services.currency import ECB_BASE
+from tracker.models import DailyTotal, MissingRate, Transaction, _rollup_deltas, set_base_amounts
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-derive the base-currency amount of foreign-currency transactions from their "
+        "original amounts, e.g. after load_fx_rates corrected historical rates. Works in "
+        "keyset batches; each batch updates its transactions and DailyTotal rows together."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--currency", nargs="+", help="Only these currencies (default: all but EUR).")
+        parser.add_argument("--since", type=date.fromisoformat, help="Only transactions on or after this date.")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        transactions = Transaction.objects.exclude(currency=ECB_BASE)
+        if options["currency"]:
+            transactions = transactions.filter(currency__in=[code.upper() for code in options["currency"]])
+        if options["since"]:
+            transactions = transactions.filter(date__gte=options["since"])
+        transactions = transactions.only(
+            "id", "user_id", "date", "type", "category_id", "amount", "currency", "original_amount",
+        ).order_by("pk")
+
+        started = time.perf_counter()
+        lookups = {}
+        seen = changed = missing = 0
+        last_pk = 0
+        while True:
+            with db_transaction.atomic():
+                batch = list(transactions.filter(pk__gt=last_pk).select_for_update()[:options["batch_size"]])
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                seen += len(batch)
+
+                updated = []
+                rows = []
+                for tx in batch:
+                    previous = tx.amount
+                    try:
+                        set_base_amounts([tx], lookups)
+                    except MissingRate:
+                        missing += 1
+                        continue
+                    if tx.amount != previous:
+                        updated.append(tx)
+                        rows.append((tx.user_id, tx.date, tx.type, tx.category_id, tx.amount - previous, 0))
+
+                if updated:
+                    # bulk_update goes through TransactionQuerySet.update(), which bumps LedgerState.
+                    Transaction.objects.bulk_update(updated, ["amount"])
+                    DailyTotal.objects.apply(_rollup_deltas(rows))
+                    changed += len(updated)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-derived {changed} of {seen} foreign-currency amounts in {elapsed:.2f}s"
+        ))
+        if missing:
+            self.stderr.write(self.style.WARNING(f"{missing} transactions have no rate for their date; left unchanged"))
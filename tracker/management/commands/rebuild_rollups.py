@@ -0,0 +1,42 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from tracker.models import DailyTotal
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Backfill / repair the DailyTotal rollup table from Transaction rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            help="Only rebuild these users (default: everyone).",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        usernames = options["usernames"]
+
+        users = None
+        if usernames:
+            users = list(User.objects.filter(username__in=usernames))
+            missing = set(usernames) - {u.username for u in users}
+            for username in sorted(missing):
+                self.stderr.write(self.style.ERROR(f"User '{username}' does not exist"))
+            if not users:
+                return
+
+        started = time.perf_counter()
+        written = DailyTotal.objects.rebuild(users=users, batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+
+        scope = ", ".join(u.username for u in users) if users else "all users"
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {written} daily rollup rows for {scope} in {elapsed:.2f}s")
+        )
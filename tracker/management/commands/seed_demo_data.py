@@ -1,163 +1,346 @@
+import io
+import multiprocessing
 import random
-from datetime import timedelta, datetime, time
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
 from decimal import Decimal
 
-from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction as db_transaction
 from django.utils import timezone
 
-from tracker.models import Transaction, Category, Budget
+from services.currency import ECB_BASE
+from services.money import Money
+from tracker.models import Transaction, Category, Budget, DailyTotal
 
 
 User = get_user_model()
 
+CATEGORIES = [
+    ("Salary", Category.Kind.INCOME),
+    ("Freelance", Category.Kind.INCOME),
+    ("Food", Category.Kind.EXPENSE),
+    ("Transport", Category.Kind.EXPENSE),
+    ("Bills", Category.Kind.EXPENSE),
+    ("Subscriptions", Category.Kind.EXPENSE),
+    ("Entertainment", Category.Kind.EXPENSE),
+]
+
+# (category, amount) per month; None = overall budget
+BUDGETS = [
+    (None, Decimal("1500.00")),
+    ("Food", Decimal("400.00")),
+    ("Transport", Decimal("200.00")),
+]
+
+EXPENSE_TEMPLATES = [
+    ("Food", "Groceries", (8, 45)),
+    ("Food", "Lunch", (10, 18)),
+    ("Transport", "Bus ticket", (2, 6)),
+    ("Transport", "Fuel", (25, 60)),
+    ("Bills", "Electricity bill", (80, 140)),
+    ("Subscriptions", "Streaming service", (8, 15)),
+    ("Entertainment", "Cinema", (10, 25)),
+]
+
+
+def generate_transactions(rng, cat_ids, start, end, tx_per_day=2):
+    """
+    Yield (type, category_id, amount_cents, description, date) for every day from start to end.
+    Weekly salary, occasional freelance income and 1..(2*tx_per_day - 1) expenses a day.
+    """
+    templates = [
+        (cat_ids[name], desc, low * 100, high * 100) for name, desc, (low, high) in EXPENSE_TEMPLATES
+    ]
+    max_expenses = max(1, 2 * tx_per_day - 1)
+    day = start
+    offset = 0
+    while day <= end:
+        if offset % 7 == 0:
+            yield Transaction.Type.INCOME, cat_ids["Salary"], 50000, "Weekly salary", day
+
+        if rng.random() < 0.08:  # ~8% chance per day
+            yield Transaction.Type.INCOME, cat_ids["Freelance"], rng.randint(8000, 18000), "Freelance payment", day
+
+        for _ in range(rng.randint(1, max_expenses)):
+            category_id, desc, low, high = rng.choice(templates)
+            yield Transaction.Type.EXPENSE, category_id, rng.randint(low, high), desc, day
+
+        day += timedelta(days=1)
+        offset += 1
+
+
+def _months(start, end):
+    month = start.replace(day=1)
+    while month <= end:
+        yield month
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+# -----------------------------
+# Per-user setup (categories + budgets), in bulk
+# -----------------------------
+def _ensure_categories(user_ids):
+    """
+    Returns {user_id: {name: category_id}}, creating the demo categories users don't have.
+    """
+    Category.objects.bulk_create(
+        [Category(user_id=uid, name=name, kind=kind) for uid in user_ids for name, kind in CATEGORIES],
+        ignore_conflicts=True,
+    )
+    cat_map = {uid: {} for uid in user_ids}
+    names = [name for name, _ in CATEGORIES]
+    for uid, name, kind, pk in Category.objects.filter(user_id__in=user_ids, name__in=names).values_list(
+        "user_id", "name", "kind", "id"
+    ):
+        if (name, kind) in CATEGORIES:
+            cat_map[uid][name] = pk
+    return cat_map
+
+
+def _ensure_budgets(cat_map, start, end):
+    existing = set(
+        Budget.objects.filter(user_id__in=list(cat_map), month__gte=start.replace(day=1), month__lte=end)
+        .values_list("user_id", "category_id", "month")
+    )
+    budgets = []
+    for uid, cats in cat_map.items():
+        for month in _months(start, end):
+            for name, amount in BUDGETS:
+                category_id = cats[name] if name else None
+                if (uid, category_id, month) not in existing:
+                    budgets.append(Budget(user_id=uid, category_id=category_id, month=month, amount=amount))
+    Budget.objects.bulk_create(budgets, batch_size=5000)
+
+
+# -----------------------------
+# Transaction writers
+# -----------------------------
+def _insert_bulk(user_id, rows, batch_size):
+    written = 0
+    batch = []
+    for tx_type, category_id, cents, desc, day in rows:
+        batch.append(Transaction(
+            user_id=user_id, type=tx_type, category_id=category_id,
+            amount=Money(cents), description=desc, date=day,
+        ))
+        if len(batch) >= batch_size:
+            Transaction.objects.bulk_create(batch, rollups=False)
+            written += len(batch)
+            batch = []
+    if batch:
+        Transaction.objects.bulk_create(batch, rollups=False)
+        written += len(batch)
+    return written
+
+
+def _copy_supported():
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        return hasattr(cursor.cursor, "copy_expert")  # psycopg2
+
+
+def _insert_copy(user_id, rows, batch_size):
+    """
+    PostgreSQL COPY ... FROM STDIN, one CSV buffer of batch_size rows at a time.
+    """
+    meta = Transaction._meta
+    columns = ["user", "category", "type", "amount", "currency", "original_amount", "description", "date", "created_at"]
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+        connection.ops.quote_name(meta.db_table),
+        ", ".join(connection.ops.quote_name(meta.get_field(name).column) for name in columns),
+    )
+    created_at = timezone.now().isoformat()
+
+    written = 0
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        buffer = io.StringIO()
+        pending = 0
+        for tx_type, category_id, cents, desc, day in rows:
+            original = f"{cents // 100}.{cents % 100:02d}"  # amount is stored in cents
+            buffer.write(
+                f"{user_id},{category_id},{tx_type},{cents},{ECB_BASE},{original},{desc},{day.isoformat()},{created_at}\n"
+            )
+            pending += 1
+            if pending >= batch_size:
+                buffer.seek(0)
+                raw.copy_expert(sql, buffer)
+                written += pending
+                buffer = io.StringIO()
+                pending = 0
+        if pending:
+            buffer.seek(0)
+            raw.copy_expert(sql, buffer)
+            written += pending
+    return written
+
+
+def seed_users(user_ids, start, end, tx_per_day=2, seed=0, batch_size=5000, method="bulk"):
+    """
+    Seed categories, monthly budgets and transactions for the given users. Transactions skip
+    the per-batch rollup update; each user's DailyTotal rows are rebuilt once, in the same
+    DB transaction as that user's rows. Each user's data comes from
+    random.Random(f"{seed}:{username}"), so the output does not depend on how users are
+    sharded across workers. Returns the number of transactions written.
+    """
+    usernames = dict(User.objects.filter(pk__in=user_ids).values_list("pk", "username"))
+    insert = _insert_copy if method == "copy" else _insert_bulk
+
+    with db_transaction.atomic():
+        cat_map = _ensure_categories(user_ids)
+        _ensure_budgets(cat_map, start, end)
+
+    written = 0
+    for uid in user_ids:
+        rng = random.Random(f"{seed}:{usernames[uid]}")
+        rows = generate_transactions(rng, cat_map[uid], start, end, tx_per_day)
+        with db_transaction.atomic():
+            written += insert(uid, rows, batch_size)
+            DailyTotal.objects.rebuild(users=[uid], batch_size=batch_size)
+    return written
+
+
+def _seed_shard(user_ids, kwargs):
+    # Runs in a forked worker; the parent closed its connections first, so Django opens fresh ones.
+    started = time.perf_counter()
+    written = seed_users(user_ids, **kwargs)
+    return written, time.perf_counter() - started
+
 
 class Command(BaseCommand):
-    help = "Seed realistic demo data for a specific user"
+    help = "Seed realistic demo data for a specific user, or many generated load-test users"
 
     def add_arguments(self, parser):
-        parser.add_argument("username", type=str)
+        parser.add_argument("username", type=str, nargs="?", help="Existing user to seed (demo mode).")
         parser.add_argument(
             "--force",
             action="store_true",
-            help="Delete existing demo user's transactions and budgets, then reseed.",
+            help="Delete the users' existing transactions and budgets, then reseed.",
+        )
+        parser.add_argument("--users", type=int, help="Create/seed N load-test users instead of one existing user.")
+        parser.add_argument("--user-prefix", type=str, default="loadtest_", help="Username prefix for --users.")
+        parser.add_argument("--years", type=float, help="History length (default: month-to-date).")
+        parser.add_argument("--tx-per-day", type=int, default=2, help="Average expenses per user per day.")
+        parser.add_argument("--seed", type=int, default=0, help="Seed for deterministic data.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--workers", type=int, default=1, help="Processes to shard users across.")
+        parser.add_argument(
+            "--method",
+            choices=("auto", "bulk", "copy"),
+            default="auto",
+            help="Insert with bulk_create or PostgreSQL COPY (auto: COPY when available).",
         )
 
     def handle(self, *args, **options):
         username = options["username"]
-        force = options["force"]
-
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
-            self.stderr.write(self.style.ERROR(f"User '{username}' does not exist"))
-            return
-
-        # If force, wipe user's data so you can reseed anytime (new month/new year)
-        if force:
-            Transaction.objects.filter(user=user).delete()
-            Budget.objects.filter(user=user).delete()
-
-        # don't duplicate
-        if Transaction.objects.filter(user=user).exists():
-            self.stdout.write(
-                self.style.WARNING(
-                    "User already has transactions. Seed skipped. Use --force to reseed."
-                )
-            )
-            return
+        if bool(username) == bool(options["users"]):
+            raise CommandError("Pass either a username or --users N.")
+        if options["tx_per_day"] < 1:
+            raise CommandError("--tx-per-day must be at least 1.")
 
         # localdate so month is correct for your configured TIME_ZONE
         today = timezone.localdate()
         month_start = today.replace(day=1)
+        if options["years"]:
+            start = today - timedelta(days=round(options["years"] * 365))
+        else:
+            start = month_start
 
-        
-        self.stdout.write(self.style.NOTICE(f"[seed] today={today} month_start={month_start}"))
-
-        # Categories
-        categories = [
-            ("Salary", Category.Kind.INCOME),
-            ("Freelance", Category.Kind.INCOME),
-            ("Food", Category.Kind.EXPENSE),
-            ("Transport", Category.Kind.EXPENSE),
-            ("Bills", Category.Kind.EXPENSE),
-            ("Subscriptions", Category.Kind.EXPENSE),
-            ("Entertainment", Category.Kind.EXPENSE),
-        ]
-
-        cat_map = {}
-        for name, kind in categories:
-            cat, _ = Category.objects.get_or_create(user=user, name=name, kind=kind)
-            cat_map[name] = cat
-
-        # Budgets (current month)
-        Budget.objects.get_or_create(
-            user=user,
-            category=None,
-            month=month_start,
-            defaults={"amount": Decimal("1500.00")},
-        )
-        Budget.objects.get_or_create(
-            user=user,
-            category=cat_map["Food"],
-            month=month_start,
-            defaults={"amount": Decimal("400.00")},
-        )
-        Budget.objects.get_or_create(
-            user=user,
-            category=cat_map["Transport"],
-            month=month_start,
-            defaults={"amount": Decimal("200.00")},
-        )
+        if username:
+            try:
+                users = [User.objects.get(username=username)]
+            except User.DoesNotExist:
+                self.stderr.write(self.style.ERROR(f"User '{username}' does not exist"))
+                return
+        else:
+            users = self._ensure_users(options["user_prefix"], options["users"])
 
-        # Transactions (ONLY this month)
-        expense_templates = [
-            ("Food", "Groceries", (8, 45)),
-            ("Food", "Lunch", (10, 18)),
-            ("Transport", "Bus ticket", (2, 6)),
-            ("Transport", "Fuel", (25, 60)),
-            ("Bills", "Electricity bill", (80, 140)),
-            ("Subscriptions", "Streaming service", (8, 15)),
-            ("Entertainment", "Cinema", (10, 25)),
-        ]
-
-        transactions = []
-
-        # Number of days month-to-date
-        days_mtd = (today - month_start).days + 1
-
-        #  Create day-by-day FORWARD from month_start to today
-        for offset in range(days_mtd):
-            day = month_start + timedelta(days=offset)
-
-            day_value = day
-
-            # Weekly income (every 7 days from the start of the month)
-            if offset % 7 == 0:
-                transactions.append(
-                    Transaction(
-                        user=user,
-                        type=Transaction.Type.INCOME,
-                        category=cat_map["Salary"],
-                        amount=Decimal("500.00"),
-                        description="Weekly salary",
-                        date=day_value,
-                    )
-                )
+        user_ids = [u.pk for u in users]
 
-            # Small freelance income 1–2 times this month
-            if random.random() < 0.08:  # ~8% chance per day
-                transactions.append(
-                    Transaction(
-                        user=user,
-                        type=Transaction.Type.INCOME,
-                        category=cat_map["Freelance"],
-                        amount=Decimal(str(round(random.uniform(80, 180), 2))),
-                        description="Freelance payment",
-                        date=day_value,
-                    )
-                )
+        # If force, wipe users' data so you can reseed anytime (new month/new year)
+        if options["force"]:
+            Transaction.objects.filter(user_id__in=user_ids).delete()
+            Budget.objects.filter(user_id__in=user_ids).delete()
 
-            # 1–3 expenses per day
-            for _ in range(random.randint(1, 3)):
-                cat_name, desc, (low, high) = random.choice(expense_templates)
-                amount = Decimal(str(round(random.uniform(low, high), 2)))
-
-                transactions.append(
-                    Transaction(
-                        user=user,
-                        type=Transaction.Type.EXPENSE,
-                        category=cat_map[cat_name],
-                        amount=amount,
-                        description=desc,
-                        date=day_value,
+        # don't duplicate
+        seeded = set(
+            Transaction.objects.filter(user_id__in=user_ids).values_list("user_id", flat=True).distinct()
+        )
+        if seeded:
+            if username:
+                self.stdout.write(
+                    self.style.WARNING(
+                        "User already has transactions. Seed skipped. Use --force to reseed."
                     )
                 )
+                return
+            self.stdout.write(self.style.WARNING(f"Skipping {len(seeded)} users that already have transactions."))
+            user_ids = [uid for uid in user_ids if uid not in seeded]
+            if not user_ids:
+                return
+
+        method = options["method"]
+        if method == "auto":
+            method = "copy" if _copy_supported() else "bulk"
+        elif method == "copy" and not _copy_supported():
+            raise CommandError("COPY needs PostgreSQL with psycopg2.")
 
-        Transaction.objects.bulk_create(transactions)
+        workers = max(1, options["workers"])
+        if workers > 1 and connection.vendor == "sqlite":
+            self.stderr.write(self.style.WARNING("SQLite allows one writer at a time, using --workers 1."))
+            workers = 1
 
-        self.stdout.write(
-            self.style.SUCCESS(
-                f"Demo data created successfully for user '{username}' for {month_start} → {today}"
+        self.stdout.write(self.style.NOTICE(
+            f"[seed] {len(user_ids)} user(s), {start} → {today}, ~{options['tx_per_day']} expenses/day, "
+            f"seed={options['seed']}, method={method}, workers={workers}"
+        ))
+
+        kwargs = {
+            "start": start,
+            "end": today,
+            "tx_per_day": options["tx_per_day"],
+            "seed": options["seed"],
+            "batch_size": options["batch_size"],
+            "method": method,
+        }
+        started = time.perf_counter()
+        written = 0
+        if workers == 1:
+            written = seed_users(user_ids, **kwargs)
+        else:
+            shards = [user_ids[i::workers] for i in range(workers)]
+            connections.close_all()  # don't share the parent's socket with forked workers
+            context = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                for shard_written, shard_elapsed in pool.map(_seed_shard, shards, [kwargs] * workers):
+                    written += shard_written
+                    self.stdout.write(
+                        f"  shard: {shard_written} rows in {shard_elapsed:.1f}s "
+                        f"({shard_written / shard_elapsed if shard_elapsed else 0:,.0f} rows/s)"
+                    )
+        elapsed = time.perf_counter() - started
+
+        rate = written / elapsed if elapsed else 0
+        if username:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Demo data created successfully for user '{username}' for {start} → {today}"
+                )
             )
+        self.stdout.write(self.style.SUCCESS(f"{written} transactions in {elapsed:.1f}s ({rate:,.0f} rows/s)"))
+
+    def _ensure_users(self, prefix, count):
+        usernames = [f"{prefix}{i:05d}" for i in range(1, count + 1)]
+        existing = set(User.objects.filter(username__in=usernames).values_list("username", flat=True))
+        # One hash for every load-test user: hashing per user would dominate the run.
+        password = make_password(f"{prefix}password")
+        User.objects.bulk_create(
+            [User(username=name, password=password) for name in usernames if name not in existing],
+            batch_size=1000,
         )
+        return list(User.objects.filter(username__in=usernames).order_by("pk"))
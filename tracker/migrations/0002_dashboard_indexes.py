@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+from tracker.migration_operations import AddIndexConcurrentlyOnPostgres
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    atomic = False
+
+    dependencies = [
+        ('tracker', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name='budget',
+            index=models.Index(fields=['user', 'month'], name='budget_user_month_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'date', 'type'], name='tx_user_date_type_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'type', 'date', 'category'], name='tx_user_type_date_cat_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_daily_totals(apps, schema_editor):
+    Transaction = apps.get_model('tracker', 'Transaction')
+    DailyTotal = apps.get_model('tracker', 'DailyTotal')
+
+    grouped = (
+        Transaction.objects.order_by()
+        .values('user_id', 'date', 'type', 'category_id')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    DailyTotal.objects.bulk_create((DailyTotal(**row) for row in grouped.iterator()), batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0002_dashboard_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_totals', to='tracker.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'date', 'type', 'category'), name='dailytotal_unique_key')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+from tracker.migration_operations import AddIndexConcurrentlyOnPostgres
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    atomic = False
+
+    dependencies = [
+        ('tracker', '0003_daily_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-date', '-created_at', '-id'], name='tx_user_list_order_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0004_transaction_list_order_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base', models.CharField(default='EUR', max_length=3)),
+                ('quote', models.CharField(max_length=3)),
+                ('date', models.DateField()),
+                ('rate', models.DecimalField(decimal_places=6, max_digits=16)),
+            ],
+            options={
+                'ordering': ['base', 'quote', 'date'],
+                'constraints': [models.UniqueConstraint(fields=('base', 'quote', 'date'), name='fxrate_unique_pair_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_ledger_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ledgerstate',
+            name='modified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
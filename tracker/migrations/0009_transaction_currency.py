@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:12
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_original_amounts(apps, schema_editor):
+    # Every existing transaction was entered in EUR, the base currency.
+    Transaction = apps.get_model('tracker', 'Transaction')
+    Transaction.objects.update(original_amount=F('amount'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0008_ledger_state_modified_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='currency',
+            field=models.CharField(default='EUR', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='original_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.RunPython(backfill_original_amounts, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='transaction',
+            name='original_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=12),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:58
+
+from django.db import migrations, models
+from django.db.models import BigIntegerField, DecimalField, ExpressionWrapper, F
+from django.db.models.functions import Cast, Round
+
+import tracker.fields
+
+# (model, field, the DecimalField being replaced, MoneyField kwargs)
+MONEY_FIELDS = [
+    ('transaction', 'amount', dict(max_digits=12, decimal_places=2), {}),
+    ('budget', 'amount', dict(max_digits=12, decimal_places=2), {}),
+    ('dailytotal', 'total', dict(max_digits=14, decimal_places=2), dict(default=0)),
+]
+
+
+def copy_to_cents(model_name, field, decimal_kwargs):
+    def forwards(apps, schema_editor):
+        # ROUND first: SQLite keeps decimals as floats, where 0.29 * 100 is 28.999...
+        apps.get_model('tracker', model_name).objects.update(
+            **{f'{field}_cents': Cast(Round(F(field) * 100), BigIntegerField())}
+        )
+
+    def backwards(apps, schema_editor):
+        apps.get_model('tracker', model_name).objects.update(
+            **{field: ExpressionWrapper(F(f'{field}_cents') / 100.0, output_field=DecimalField(**decimal_kwargs))}
+        )
+
+    return forwards, backwards
+
+
+def to_cents_operations(model_name, field, decimal_kwargs, money_kwargs):
+    """
+    Swap a DecimalField for a MoneyField of the same name: add a cents column, copy,
+    drop the old column and rename. Reversible (the old column is made nullable first).
+    """
+    forwards, backwards = copy_to_cents(model_name, field, decimal_kwargs)
+    return [
+        migrations.AlterField(
+            model_name=model_name,
+            name=field,
+            field=models.DecimalField(null=True, **decimal_kwargs),
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name=f'{field}_cents',
+            field=tracker.fields.MoneyField(null=True),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.RemoveField(model_name=model_name, name=field),
+        migrations.RenameField(model_name=model_name, old_name=f'{field}_cents', new_name=field),
+        migrations.AlterField(
+            model_name=model_name,
+            name=field,
+            field=tracker.fields.MoneyField(**money_kwargs),
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0009_transaction_currency'),
+    ]
+
+    operations = [
+        operation
+        for model_name, field, decimal_kwargs, money_kwargs in MONEY_FIELDS
+        for operation in to_cents_operations(model_name, field, decimal_kwargs, money_kwargs)
+    ]
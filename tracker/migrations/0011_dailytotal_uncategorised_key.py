@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def merge_uncategorised(apps, schema_editor):
+    # Deleting a category used to SET_NULL its rollups next to existing uncategorised ones.
+    DailyTotal = apps.get_model('tracker', 'DailyTotal')
+    duplicates = (
+        DailyTotal.objects.filter(category__isnull=True)
+        .values('user_id', 'date', 'type')
+        .annotate(rows=Count('id'), keep=Min('id'), merged_total=Sum('total'), merged_count=Sum('count'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        DailyTotal.objects.filter(
+            user_id=row['user_id'], date=row['date'], type=row['type'], category__isnull=True,
+        ).exclude(pk=row['keep']).delete()
+        DailyTotal.objects.filter(pk=row['keep']).update(total=row['merged_total'], count=row['merged_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0010_money_cents'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_uncategorised, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='dailytotal',
+            name='dailytotal_unique_key',
+        ),
+        migrations.AddConstraint(
+            model_name='dailytotal',
+            constraint=models.UniqueConstraint(
+                models.F('user'), models.F('date'), models.F('type'), Coalesce('category', Value(0)),
+                name='dailytotal_unique_key',
+            ),
+        ),
+    ]
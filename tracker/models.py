@@ -1,7 +1,40 @@
+from collections import defaultdict
+
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction as db_transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Round
 from django.utils import timezone
 
+from services.currency import ECB_BASE, get_latest_rates, get_rate_timeline
+from services.money import Money
+from tracker.fields import MoneyField
+from tracker.ledger_cache import ledger_cache
+
+def _categories_deleted(users):
+    LedgerState.objects.bump(users)
+    # SET_NULL rewrites the transactions' category outside TransactionQuerySet.
+    cache = ledger_cache()
+    if cache:
+        cache.invalidate(users)
+
+class CategoryQuerySet(models.QuerySet):
+    """
+    Bulk deletes (including the admin's "delete selected") that keep DailyTotal and the
+    owners' ledger state in step, like Category.delete().
+    """
+
+    def delete(self):
+        with db_transaction.atomic(using=self.db):
+            rows = list(self.order_by().values_list("id", "user_id"))
+            DailyTotal.objects.uncategorise([pk for pk, _ in rows])
+            result = super().delete()
+            _categories_deleted({user_id for _, user_id in rows})
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
 class Category(models.Model):
     class Kind(models.TextChoices):
         INCOME = "income", "Income"
@@ -11,6 +44,8 @@ class Category(models.Model):
     name = models.CharField(max_length=80)
     kind = models.CharField(max_length=10, choices=Kind.choices, default=Kind.EXPENSE)
 
+    objects = CategoryQuerySet.as_manager()
+
     class Meta:
         unique_together = ("user", "name", "kind")
         ordering = ["kind", "name"]
@@ -18,6 +53,212 @@ class Category(models.Model):
     def __str__(self):
         return f"{self.name} ({self.kind})"
 
+    # Category names are shown on the dashboard, so renames and deletes count as ledger writes.
+    def save(self, *args, **kwargs):
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+            LedgerState.objects.bump([self.user_id])
+
+    def delete(self, *args, **kwargs):
+        with db_transaction.atomic():
+            # Move the rollups to "Uncategorised" ourselves: SET_NULL would leave a second
+            # NULL-category row wherever one already exists for the day.
+            DailyTotal.objects.uncategorise([self.pk])
+            result = super().delete(*args, **kwargs)
+            _categories_deleted([self.user_id])
+        return result
+
+def _rollup_deltas(rows, sign=1):
+    """
+    Fold (user_id, date, type, category_id, amount, count) rows into
+    {(user_id, date, type, category_id): [amount, count]} deltas for DailyTotal.
+    """
+    deltas = defaultdict(lambda: [Money(), 0])
+    for user_id, day, tx_type, category_id, amount, count in rows:
+        delta = deltas[(user_id, day, tx_type, category_id)]
+        amount = Money.of(amount)
+        delta[0] += amount if sign > 0 else -amount
+        delta[1] += sign * count
+    return deltas
+
+
+DISPLAY_AMOUNT_FIELD = models.DecimalField(max_digits=18, decimal_places=2)
+RATE_FIELD = models.DecimalField(max_digits=16, decimal_places=6)
+RATE_PRODUCT_FIELD = models.DecimalField(max_digits=30, decimal_places=8)
+
+
+def _display_rate_expression(quote, fallback_rate=None):
+    """
+    SQL expression for the EUR -> quote rate of the outer row's date, or None if there is nothing
+    to convert with. Mirrors RateTimeline.rate_on(); the timeline is only used for its last date.
+    """
+    if quote == ECB_BASE:
+        return None
+    fallback = Value(fallback_rate, output_field=RATE_FIELD) if fallback_rate else None
+
+    last_date = get_rate_timeline(quote).last_date
+    if last_date is None:
+        return fallback
+
+    published = Subquery(
+        FxRate.objects
+        .filter(base=ECB_BASE, quote=quote, date__lte=OuterRef("date"))
+        .order_by("-date")
+        .values("rate")[:1],
+        output_field=RATE_FIELD,
+    )
+    if fallback is None:
+        return published
+    return Case(
+        When(date__gt=last_date, then=fallback),
+        default=Coalesce(published, fallback),
+        output_field=RATE_FIELD,
+    )
+
+
+def display_amount_expression(field, quote, fallback_rate=None):
+    """
+    EUR cents `field` of a row with a `date` (Transaction.amount, DailyTotal.total) converted
+    to `quote` at that date's rate and rounded to 2dp, or None when there is nothing to
+    convert with (or quote is EUR).
+    """
+    rate = _display_rate_expression(quote, fallback_rate)
+    if rate is None:
+        return None
+    return Round(
+        models.ExpressionWrapper(F(field) * rate / 100, output_field=RATE_PRODUCT_FIELD),
+        2,
+        output_field=DISPLAY_AMOUNT_FIELD,
+    )
+
+
+class MissingRate(ValueError):
+    """
+    No FX rate to convert a transaction's original amount into the base currency.
+    """
+
+
+def _base_rate_lookup(currency):
+    """
+    day -> ECB_BASE -> `currency` rate for a write: the FxRate publication on or before the
+    day, else the latest live rate (fetched once per lookup, and only for days outside the
+    loaded history). None when there is no rate at all.
+    """
+    timeline = get_rate_timeline(currency)
+    live = []
+
+    def rate_on(day):
+        rate = timeline.rate_on(day) if timeline and day <= timeline.last_date else None
+        if rate is None:
+            if not live:
+                try:
+                    live.append(get_latest_rates(base=ECB_BASE, symbols=(currency,)).rates.get(currency))
+                except Exception:
+                    live.append(None)  # provider down and nothing cached
+            rate = live[0]
+        return rate
+
+    return rate_on
+
+
+def set_base_amounts(transactions, lookups=None):
+    """
+    Derive each transaction's amount (ECB_BASE) from original_amount in `currency` at the
+    rate of its date, so every read aggregates `amount` with no conversion. Base-currency
+    rows keep amount as entered. `lookups` ({currency: lookup}) can be shared between
+    calls; raises MissingRate when a currency has no rate for a row's date.
+    """
+    lookups = {} if lookups is None else lookups
+    date_field = Transaction._meta.get_field("date")
+    for tx in transactions:
+        if tx.currency == ECB_BASE:
+            tx.original_amount = tx.amount.amount if isinstance(tx.amount, Money) else tx.amount
+            continue
+        if tx.original_amount is None:
+            raise ValueError(f"{tx.currency} transactions need an original_amount.")
+        lookup = lookups.get(tx.currency)
+        if lookup is None:
+            lookup = lookups[tx.currency] = _base_rate_lookup(tx.currency)
+        day = date_field.to_python(tx.date)
+        rate = lookup(day)
+        if not rate:
+            raise MissingRate(f"No {ECB_BASE}/{tx.currency} rate for {day.isoformat()}.")
+        tx.amount = Money.of(tx.original_amount) / rate
+
+
+class TransactionQuerySet(models.QuerySet):
+    """
+    Bulk write paths that keep DailyTotal (and the users' LedgerState version) in step with
+    Transaction rows, plus the display-currency annotation shared by the list, feed and
+    export queries. QuerySet.update() only bumps the version: run
+    `manage.py rebuild_rollups` after raw updates (and `manage.py rebase_amounts` after
+    changing original amounts or currencies).
+    """
+
+    def bulk_create(self, objs, *args, rollups=True, base_amounts=True, **kwargs):
+        """
+        rollups=False skips DailyTotal maintenance for bulk loaders (seed_demo_data) that
+        rebuild the rollup themselves once they are done; base_amounts=False is for callers
+        that already ran set_base_amounts() on objs (the CSV importer).
+        """
+        objs = list(objs)
+        if base_amounts:
+            set_base_amounts(objs)
+        users = {obj.user_id for obj in objs}
+        with db_transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            if not rollups:
+                LedgerState.objects.bump(users)
+            elif kwargs.get("ignore_conflicts") or kwargs.get("update_conflicts"):
+                # We can't tell which rows were actually written, so recount (rebuild bumps).
+                DailyTotal.objects.rebuild(users=users)
+            else:
+                DailyTotal.objects.apply(_rollup_deltas(obj.rollup_row() for obj in created))
+                LedgerState.objects.bump(users)
+        return created
+
+    def delete(self):
+        with db_transaction.atomic(using=self.db):
+            removed = (
+                self.order_by()
+                .values_list("user_id", "date", "type", "category_id")
+                .annotate(total=Sum("amount"), count=Count("id"))
+            )
+            deltas = _rollup_deltas(removed, sign=-1)
+            result = super().delete()
+            DailyTotal.objects.apply(deltas)
+            LedgerState.objects.bump({key[0] for key in deltas})
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def update(self, **kwargs):
+        with db_transaction.atomic(using=self.db):
+            users = set(self.order_by().values_list("user_id", flat=True).distinct())
+            rows = super().update(**kwargs)
+            LedgerState.objects.bump(users)
+            cache = ledger_cache()
+            if cache:
+                cache.invalidate(users)
+        return rows
+
+    update.alters_data = True
+
+    def with_display_amount(self, quote, fallback_rate=None):
+        """
+        Annotate display_amount: amount (EUR) converted to `quote` inside the query, at the
+        FxRate published on or before each row's date and rounded to 2dp - the same rate
+        services.currency.rate_lookup() picks. fallback_rate (the latest live rate) covers
+        days after the last loaded publication or before the first. display_amount is
+        NULL when there is no rate, or when quote is EUR.
+        """
+        display_amount = display_amount_expression("amount", quote, fallback_rate)
+        if display_amount is None:
+            display_amount = Value(None, output_field=DISPLAY_AMOUNT_FIELD)
+        return self.annotate(display_amount=display_amount)
+
+
 class Transaction(models.Model):
     class Type(models.TextChoices):
         INCOME = "income", "Income"
@@ -26,31 +267,326 @@ class Transaction(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="transactions")
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="transactions")
     type = models.CharField(max_length=10, choices=Type.choices, default=Type.EXPENSE)
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # In ECB_BASE, derived from original_amount at write time (see set_base_amounts): every
+    # total, rollup and budget comparison sums this column (integer cents, read as Money).
+    amount = MoneyField()
+    currency = models.CharField(max_length=3, default=ECB_BASE)
+    original_amount = models.DecimalField(max_digits=12, decimal_places=2)
     description = models.CharField(max_length=200, blank=True)
     date = models.DateField(default=timezone.localdate)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # Content hash of the CSV row this transaction was imported from (see tracker.importer)
+    import_hash = models.CharField(max_length=64, null=True, blank=True, editable=False)
+
+    objects = TransactionQuerySet.as_manager()
 
     class Meta:
         ordering = ["-date", "-created_at"]
+        indexes = [
+            # Month totals + daily trend: user + date range, split by type
+            models.Index(fields=["user", "date", "type"], name="tx_user_date_type_idx"),
+            # Per-category breakdowns: user + type + date range, grouped by category
+            models.Index(fields=["user", "type", "date", "category"], name="tx_user_type_date_cat_idx"),
+            # Transaction list keyset pagination: seek on the full sort key
+            models.Index(fields=["user", "-date", "-created_at", "-id"], name="tx_user_list_order_idx"),
+        ]
+        constraints = [
+            # Re-importing the same file skips rows that were already imported
+            models.UniqueConstraint(
+                fields=["user", "import_hash"],
+                condition=models.Q(import_hash__isnull=False),
+                name="tx_user_import_hash_uniq",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.type}: {self.amount} on {self.date}"
 
+    def rollup_row(self):
+        date_field = self._meta.get_field("date")
+        return (self.user_id, date_field.to_python(self.date), self.type, self.category_id, self.amount, 1)
+
+    def save(self, *args, **kwargs):
+        set_base_amounts([self])
+        # Rollups are updated in the same DB transaction as the row itself.
+        with db_transaction.atomic():
+            rows = []
+            if not self._state.adding and self.pk is not None:
+                previous = (
+                    Transaction.objects.filter(pk=self.pk)
+                    .values_list("user_id", "date", "type", "category_id", "amount")
+                    .first()
+                )
+                if previous:
+                    rows.append((*previous[:4], -previous[4], -1))
+            super().save(*args, **kwargs)
+            rows.append(self.rollup_row())
+            DailyTotal.objects.apply(_rollup_deltas(rows))
+            LedgerState.objects.bump({row[0] for row in rows})
+
+    def delete(self, *args, **kwargs):
+        with db_transaction.atomic():
+            row = self.rollup_row()
+            result = super().delete(*args, **kwargs)
+            DailyTotal.objects.apply(_rollup_deltas([row], sign=-1))
+            LedgerState.objects.bump([self.user_id])
+        return result
+
+class BudgetQuerySet(models.QuerySet):
+    """
+    Bulk write paths that bump the owners' LedgerState version, like Budget.save()/delete().
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with db_transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            LedgerState.objects.bump({obj.user_id for obj in objs})
+        return created
+
+    def delete(self):
+        with db_transaction.atomic(using=self.db):
+            users = set(self.order_by().values_list("user_id", flat=True).distinct())
+            result = super().delete()
+            LedgerState.objects.bump(users)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def update(self, **kwargs):
+        with db_transaction.atomic(using=self.db):
+            users = set(self.order_by().values_list("user_id", flat=True).distinct())
+            rows = super().update(**kwargs)
+            LedgerState.objects.bump(users)
+        return rows
+
+    update.alters_data = True
+
+
 class Budget(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="budgets")
     # category null = "overall monthly budget"
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="budgets")
     month = models.DateField(help_text="Use the first day of the month (e.g., 2025-12-01).")
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = MoneyField()
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = BudgetQuerySet.as_manager()
+
     class Meta:
         unique_together = ("user", "category", "month")
         ordering = ["-month", "category__name"]
+        indexes = [
+            models.Index(fields=["user", "month"], name="budget_user_month_idx"),
+        ]
 
     def __str__(self):
         label = self.category.name if self.category else "Overall"
         return f"{label} - {self.month}: {self.amount}"
+
+    def save(self, *args, **kwargs):
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+            LedgerState.objects.bump([self.user_id])
+
+    def delete(self, *args, **kwargs):
+        with db_transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            LedgerState.objects.bump([self.user_id])
+        return result
+
+
+class DailyTotalManager(models.Manager):
+    def apply(self, deltas):
+        """
+        Add {(user_id, date, type, category_id): [amount, count]} deltas to the rollup.
+        Existing rows are incremented with F() expressions so concurrent writers don't
+        lose updates; missing rows are inserted.
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+        if not deltas:
+            return
+        cache = ledger_cache()
+        if cache:
+            cache.record(deltas)
+
+        existing = {}
+        rows = self.filter(
+            user_id__in={key[0] for key in deltas},
+            date__in={key[1] for key in deltas},
+        ).values_list("pk", "user_id", "date", "type", "category_id")
+        for pk, *key in rows:
+            existing.setdefault(tuple(key), pk)
+
+        to_update = []
+        to_create = []
+        for key, (amount, count) in deltas.items():
+            pk = existing.get(key)
+            if pk is None:
+                user_id, day, tx_type, category_id = key
+                to_create.append(DailyTotal(
+                    user_id=user_id, date=day, type=tx_type, category_id=category_id,
+                    total=amount, count=count,
+                ))
+            else:
+                to_update.append(DailyTotal(pk=pk, total=F("total") + amount.cents, count=F("count") + count))
+
+        if to_update:
+            self.bulk_update(to_update, ["total", "count"])
+            if any(delta[1] < 0 for delta in deltas.values()):
+                # Drop keys whose last transaction went away so reads never see empty groups.
+                self.filter(pk__in=[row.pk for row in to_update], count__lte=0).delete()
+        if to_create:
+            try:
+                with db_transaction.atomic():
+                    self.bulk_create(to_create)
+            except IntegrityError:
+                # Another writer created some of these keys first: fall back to row-by-row.
+                for row in to_create:
+                    key = {"user_id": row.user_id, "date": row.date, "type": row.type, "category_id": row.category_id}
+                    if not self.filter(**key).update(total=F("total") + row.total.cents, count=F("count") + row.count):
+                        self.create(total=row.total, count=row.count, **key)
+
+    def uncategorise(self, category_ids):
+        """
+        Fold the rollups of the given categories into each day's uncategorised row (for
+        category deletes; the caller owns the transaction and the version bump).
+        """
+        rows = self.filter(category_id__in=category_ids)
+        deltas = _rollup_deltas(
+            (user_id, day, tx_type, None, total, count)
+            for user_id, day, tx_type, total, count in rows.values_list("user_id", "date", "type", "total", "count")
+        )
+        rows.delete()
+        self.apply(deltas)
+
+    def rebuild(self, users=None, batch_size=5000):
+        """
+        Recompute rollups from Transaction rows, for all users or the given ones.
+        Returns the number of DailyTotal rows written.
+        """
+        rollups = self.all()
+        transactions = Transaction.objects.all()
+        if users is not None:
+            rollups = rollups.filter(user__in=users)
+            transactions = transactions.filter(user__in=users)
+
+        grouped = (
+            transactions.order_by()
+            .values("user_id", "date", "type", "category_id")
+            .annotate(total=Sum("amount"), count=Count("id"))
+        )
+
+        written = 0
+        with db_transaction.atomic():
+            rollups.delete()
+            batch = []
+            for row in grouped.iterator(chunk_size=batch_size):
+                batch.append(DailyTotal(**row))
+                if len(batch) >= batch_size:
+                    self.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                self.bulk_create(batch)
+                written += len(batch)
+            LedgerState.objects.bump(users)
+            cache = ledger_cache()
+            if cache:
+                cache.invalidate(users)
+        return written
+
+
+class DailyTotal(models.Model):
+    """
+    Per-day rollup of a user's transactions keyed by (user, date, type, category).
+    Maintained by Transaction.save()/delete() and TransactionQuerySet, so the dashboard
+    and budget views aggregate days in range rather than transactions in range.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="daily_totals")
+    date = models.DateField()
+    type = models.CharField(max_length=10, choices=Transaction.Type.choices)
+    # Mirrors Transaction.category: deleting a category folds its rollups into "Uncategorised".
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="daily_totals")
+    total = MoneyField(default=0)
+    count = models.IntegerField(default=0)
+
+    objects = DailyTotalManager()
+
+    class Meta:
+        constraints = [
+            # NULL (uncategorised) is one key, not distinct values: see Category.delete()
+            models.UniqueConstraint(
+                "user", "date", "type", Coalesce("category", Value(0)), name="dailytotal_unique_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.type}: {self.total} ({self.count})"
+
+
+class LedgerStateManager(models.Manager):
+    def bump(self, users=None):
+        """
+        Advance the data version of the given user ids (every user when None). Writers call
+        this inside their own DB transaction, so the new version becomes visible together
+        with the rows it describes.
+        """
+        changes = {"version": F("version") + 1, "modified_at": timezone.now()}
+        cache = ledger_cache()
+        if cache:
+            cache.advance(users if users is None else set(users))
+        if users is None:
+            self.update(**changes)
+            return
+        users = set(users)
+        if not users:
+            return
+        if self.filter(user_id__in=users).update(**changes) == len(users):
+            return
+        # First write for some users: create their rows, then bump just those.
+        missing = users - set(self.filter(user_id__in=users).values_list("user_id", flat=True))
+        self.bulk_create([LedgerState(user_id=user_id) for user_id in missing], ignore_conflicts=True)
+        self.filter(user_id__in=missing).update(**changes)
+
+
+class LedgerState(models.Model):
+    """
+    Per-user data version and last-write time, bumped on every Transaction, Budget and
+    Category write (including the bulk paths and rollup rebuilds). Read-side caches key
+    on the version, so a write invalidates them without having to know which entries
+    exist; modified_at is the Last-Modified of the pages built from this data.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="ledger_state",
+    )
+    version = models.PositiveBigIntegerField(default=0)
+    modified_at = models.DateTimeField(null=True, blank=True)
+
+    objects = LedgerStateManager()
+
+    def __str__(self):
+        return f"{self.user_id}: v{self.version}"
+
+
+class FxRate(models.Model):
+    """
+    Historical reference rate: 1 `base` = `rate` `quote` on `date` (ECB publication day).
+    Loaded in bulk by `manage.py load_fx_rates`; read through services.currency.get_rate_timeline.
+    """
+    base = models.CharField(max_length=3, default="EUR")
+    quote = models.CharField(max_length=3)
+    date = models.DateField()
+    rate = models.DecimalField(max_digits=16, decimal_places=6)
+
+    class Meta:
+        ordering = ["base", "quote", "date"]
+        constraints = [
+            models.UniqueConstraint(fields=["base", "quote", "date"], name="fxrate_unique_pair_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.base}/{self.quote}: {self.rate}"
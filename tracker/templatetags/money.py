@@ -1,6 +1,10 @@
-from decimal import Decimal, InvalidOperation
+from decimal import InvalidOperation
 from django import template
 
+from services.currencies import currency_or_base
+from services.currency import convert
+from services.money import Money
+
 register = template.Library()
 
 
@@ -9,8 +13,23 @@ def mul(value, arg):
     """
     Multiply two numbers and return currency-friendly 2dp Decimal.
     Used for template conversion like: {{ amount|mul:rate }}
+    Rounds half-up, the same as services.currency.convert; Money amounts are
+    converted from their integer cents.
     """
     try:
-        return (Decimal(str(value)) * Decimal(str(arg))).quantize(Decimal("0.01"))
+        if isinstance(value, Money):
+            return value.convert(arg).amount
+        return convert(value, arg)
     except (InvalidOperation, TypeError):
         return ""
+
+
+@register.filter
+def money(value, code):
+    """
+    Format an amount in the given currency per the registry: {{ amount|money:"USD" }} -> $1,234.50.
+    """
+    try:
+        return currency_or_base(code).format(value)
+    except (InvalidOperation, TypeError, ValueError):
+        return ""
@@ -1,10 +1,30 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
-from .models import Transaction, Budget, Category
+from core.tests import LOCAL_L2
+from services.currency import invalidate_rate_timelines
+from services.money import Money
+from . import importer
+from .importer import import_transactions
+from .ledger_cache import ColumnarLedger, ledger_cache
+from .models import DailyTotal, FxRate, LedgerState, Transaction, Budget, Category
 
 
 class TrackerTests(TestCase):
@@ -49,6 +69,30 @@ class TrackerTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertContains(resp, "Transactions")
 
+    @LOCAL_L2
+    def test_unchanged_pages_answer_304_without_aggregate_queries(self):
+        Transaction.objects.create(
+            user=self.user, type=Transaction.Type.EXPENSE, category=self.expense_cat,
+            amount=Decimal("10.00"), date=timezone.localdate(),
+        )
+        self.client.get(reverse("budget_overview"))  # first visit issues the CSRF cookie
+        for name in ("transaction_list", "budget_overview"):
+            first = self.client.get(reverse(name))
+            self.assertEqual(first["Cache-Control"], "private, no-cache")
+
+            # session + user + ledger state
+            with self.assertNumQueries(3):
+                resp = self.client.get(reverse(name), HTTP_IF_NONE_MATCH=first["ETag"])
+            self.assertEqual(resp.status_code, 304)
+            resp = self.client.get(reverse(name), HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+            self.assertEqual(resp.status_code, 304)
+
+        etag = self.client.get(reverse("transaction_list"))["ETag"]
+        Budget.objects.create(user=self.user, month=timezone.localdate().replace(day=1), amount=Decimal("50.00"))
+        resp = self.client.get(reverse("transaction_list"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+
     def test_budget_create(self):
         url = reverse("budget_overview")
         month_start = timezone.localdate().replace(day=1)
@@ -71,3 +115,468 @@ class TrackerTests(TestCase):
         resp = self.client.get(reverse("transaction_list"))
         self.assertEqual(resp.status_code, 302)
         self.assertIn(reverse("login"), resp.url)
+
+    def test_explain_dashboard_command(self):
+        out = StringIO()
+        call_command("explain_dashboard", "u1", stdout=out)
+        self.assertIn("dashboard: budgets", out.getvalue())
+        self.assertIn("budget_overview: spending by category", out.getvalue())
+
+    def _rollup(self):
+        return {
+            (r.date, r.type, r.category_id): (r.total, r.count)
+            for r in DailyTotal.objects.filter(user=self.user)
+        }
+
+    def test_daily_totals_follow_transaction_writes(self):
+        today = timezone.localdate()
+        url = reverse("transaction_create")
+        self.client.post(url, {
+            "type": Transaction.Type.EXPENSE,
+            "category": self.expense_cat.id,
+            "amount": "12.50",
+            "date": str(today),
+        })
+        t = Transaction.objects.get(user=self.user)
+        self.assertEqual(self._rollup(), {(today, "expense", self.expense_cat.id): (Decimal("12.50"), 1)})
+
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, type=Transaction.Type.EXPENSE, category=self.expense_cat,
+                        amount=Decimal("7.50"), date=today),
+            Transaction(user=self.user, type=Transaction.Type.INCOME, category=self.income_cat,
+                        amount=Decimal("100.00"), date=today),
+        ])
+        self.assertEqual(self._rollup()[(today, "expense", self.expense_cat.id)], (Decimal("20.00"), 2))
+
+        # Moving a transaction to another day moves its amount between rollup rows
+        yesterday = today - timedelta(days=1)
+        self.client.post(reverse("transaction_update", args=[t.pk]), {
+            "type": Transaction.Type.EXPENSE,
+            "category": self.expense_cat.id,
+            "amount": "10.00",
+            "date": str(yesterday),
+        })
+        rollup = self._rollup()
+        self.assertEqual(rollup[(today, "expense", self.expense_cat.id)], (Decimal("7.50"), 1))
+        self.assertEqual(rollup[(yesterday, "expense", self.expense_cat.id)], (Decimal("10.00"), 1))
+
+        self.client.post(reverse("transaction_delete", args=[t.pk]))
+        self.assertNotIn((yesterday, "expense", self.expense_cat.id), self._rollup())
+
+        before = self._rollup()
+        DailyTotal.objects.rebuild(users=[self.user])
+        self.assertEqual(self._rollup(), before)
+
+        Transaction.objects.filter(user=self.user).delete()
+        self.assertEqual(self._rollup(), {})
+
+    def test_deleted_category_rollups_merge_into_uncategorised(self):
+        today = timezone.localdate()
+        kept = Transaction.objects.create(user=self.user, type=Transaction.Type.EXPENSE,
+                                          category=self.expense_cat, amount=Decimal("10.00"), date=today)
+        loose = Transaction.objects.create(user=self.user, type=Transaction.Type.EXPENSE,
+                                           amount=Decimal("5.00"), date=today)
+
+        self.expense_cat.delete()
+        self.assertEqual(self._rollup(), {(today, "expense", None): (Decimal("15.00"), 2)})
+
+        loose.delete()
+        self.assertEqual(self._rollup(), {(today, "expense", None): (Decimal("10.00"), 1)})
+        kept.refresh_from_db()
+        self.assertIsNone(kept.category_id)
+
+    def test_bulk_category_deletes_merge_into_uncategorised(self):
+        today = timezone.localdate()
+        Transaction.objects.create(user=self.user, type=Transaction.Type.EXPENSE,
+                                   category=self.expense_cat, amount=Decimal("10.00"), date=today)
+        Transaction.objects.create(user=self.user, type=Transaction.Type.EXPENSE,
+                                   amount=Decimal("5.00"), date=today)
+        version = LedgerState.objects.get(user=self.user).version
+
+        Category.objects.filter(pk=self.expense_cat.pk).delete()
+        self.assertEqual(self._rollup(), {(today, "expense", None): (Decimal("15.00"), 2)})
+        self.assertGreater(LedgerState.objects.get(user=self.user).version, version)
+
+        # The admin's "delete selected" action goes through the same queryset delete.
+        rent = Category.objects.create(user=self.user, name="Rent", kind=Category.Kind.EXPENSE)
+        Transaction.objects.create(user=self.user, type=Transaction.Type.EXPENSE,
+                                   category=rent, amount=Decimal("20.00"), date=today)
+        User.objects.create_superuser(username="admin", password="StrongPass12345!")
+        self.client.login(username="admin", password="StrongPass12345!")
+        resp = self.client.post(reverse("admin:tracker_category_changelist"), {
+            "action": "delete_selected", "_selected_action": [rent.pk], "post": "yes",
+        })
+        self.assertEqual(resp.status_code, 302)
+        self.assertFalse(Category.objects.filter(pk=rent.pk).exists())
+        self.assertEqual(self._rollup(), {(today, "expense", None): (Decimal("35.00"), 3)})
+
+    def test_transaction_feed_walks_every_row_once(self):
+        today = timezone.localdate()
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, type=Transaction.Type.EXPENSE, category=self.expense_cat,
+                        amount=Decimal("1.00"), date=today - timedelta(days=i % 3))
+            for i in range(120)
+        ])
+
+        resp = self.client.get(reverse("transaction_list"))
+        self.assertEqual(len(resp.context["transactions"]), 50)
+        cursor = resp.context["next_cursor"]
+        seen = [t.pk for t in resp.context["transactions"]]
+
+        while cursor:
+            page = self.client.get(reverse("transaction_feed"), {"cursor": cursor}).json()
+            seen.extend(row["id"] for row in page["results"])
+            cursor = page["next_cursor"]
+
+        self.assertEqual(len(seen), 120)
+        self.assertEqual(len(set(seen)), 120)
+
+        resp = self.client.get(reverse("transaction_feed"), {"cursor": "not-a-cursor"})
+        self.assertEqual(resp.status_code, 400)
+
+    @mock.patch("tracker.conditional.get_latest_rates", side_effect=OSError("offline"))
+    @mock.patch("tracker.views.get_latest_rates", side_effect=OSError("offline"))
+    def test_transaction_list_converts_at_transaction_date_rate(self, _rates, _variant_rates):
+        invalidate_rate_timelines()
+        self.addCleanup(invalidate_rate_timelines)
+        today = timezone.localdate()
+        FxRate.objects.create(quote="GBP", date=today - timedelta(days=10), rate=Decimal("0.80"))
+        FxRate.objects.create(quote="GBP", date=today - timedelta(days=2), rate=Decimal("0.90"))
+        for offset in (5, 1):
+            Transaction.objects.create(
+                user=self.user, type=Transaction.Type.EXPENSE, category=self.expense_cat,
+                amount=Decimal("10.00"), date=today - timedelta(days=offset),
+            )
+        session = self.client.session
+        session["display_currency"] = "GBP"
+        session.save()
+
+        resp = self.client.get(reverse("transaction_list"))
+        amounts = [t.display_amount for t in resp.context["transactions"]]
+        self.assertEqual(amounts, [Decimal("9.00"), Decimal("8.00")])
+
+    def test_display_amount_is_converted_in_the_query(self):
+        invalidate_rate_timelines()
+        self.addCleanup(invalidate_rate_timelines)
+        today = timezone.localdate()
+        FxRate.objects.create(quote="USD", date=today - timedelta(days=10), rate=Decimal("1.20"))
+        FxRate.objects.create(quote="USD", date=today - timedelta(days=3), rate=Decimal("1.10"))
+        for offset in (0, 5, 30):
+            Transaction.objects.create(
+                user=self.user, type=Transaction.Type.EXPENSE, category=self.expense_cat,
+                amount=Decimal("10.05"), date=today - timedelta(days=offset),
+            )
+        qs = Transaction.objects.filter(user=self.user).order_by("-date")
+
+        # After the last publication and before the first one the live rate is used
+        converted = qs.with_display_amount("USD", Decimal("1.50"))
+        self.assertEqual(
+            [t.display_amount for t in converted],
+            [Decimal("15.08"), Decimal("12.06"), Decimal("15.08")],
+        )
+        self.assertEqual([t.display_amount for t in qs.with_display_amount("EUR", None)], [None] * 3)
+
+    @mock.patch("tracker.models.get_latest_rates", side_effect=OSError("offline"))
+    def test_foreign_currency_amounts_are_converted_once_at_write_time(self, _rates):
+        invalidate_rate_timelines()
+        self.addCleanup(invalidate_rate_timelines)
+        today = timezone.localdate()
+        FxRate.objects.create(quote="USD", date=today, rate=Decimal("1.25"))
+
+        resp = self.client.post(reverse("transaction_create"), {
+            "type": Transaction.Type.EXPENSE, "category": self.expense_cat.id,
+            "amount": "20.00", "currency": "USD", "date": str(today),
+        })
+        self.assertEqual(resp.status_code, 302)
+        tx = Transaction.objects.get(user=self.user)
+        self.assertEqual((tx.currency, tx.original_amount, tx.amount), ("USD", Decimal("20.00"), Decimal("16.00")))
+
+        # No historical rate before the first publication and the provider is down
+        resp = self.client.post(reverse("transaction_create"), {
+            "type": Transaction.Type.EXPENSE, "amount": "5.00", "currency": "USD",
+            "date": str(today - timedelta(days=30)),
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("currency", resp.context["form"].errors)
+
+        path = self._write_tmp("usd.csv", (
+            "date,amount,currency,category\n"
+            f"{today},-2.50,usd,Food\n"
+            f"{today - timedelta(days=30)},-1.00,USD,Food\n"
+        ))
+        err = StringIO()
+        call_command("import_transactions", "u1", path, stdout=StringIO(), stderr=err)
+        self.assertIn("line 3: No EUR/USD rate", err.getvalue())
+        self.assertEqual(Transaction.objects.filter(user=self.user, original_amount=Decimal("2.50")).get().amount, Decimal("2.00"))
+
+        # Reads sum the stored base amounts
+        totals = DailyTotal.objects.filter(user=self.user).aggregate(t=Sum("total"))["t"]
+        self.assertEqual(totals, Decimal("18.00"))
+
+    @mock.patch("tracker.models.get_latest_rates", side_effect=OSError("offline"))
+    def test_rebase_amounts_follows_corrected_rates(self, _rates):
+        invalidate_rate_timelines()
+        self.addCleanup(invalidate_rate_timelines)
+        day = timezone.localdate() - timedelta(days=1)
+        rate = FxRate.objects.create(quote="GBP", date=day, rate=Decimal("0.50"))
+        for amount in ("10.00", "30.00"):
+            Transaction.objects.create(
+                user=self.user, type=Transaction.Type.EXPENSE, category=self.expense_cat,
+                amount=Decimal(amount), currency="GBP", original_amount=Decimal(amount), date=day,
+            )
+        Transaction.objects.create(
+            user=self.user, type=Transaction.Type.EXPENSE, category=self.expense_cat,
+            amount=Decimal("1.00"), date=day,
+        )
+        self.assertEqual(DailyTotal.objects.get(user=self.user).total, Decimal("81.00"))
+
+        rate.rate = Decimal("0.80")
+        rate.save()
+        invalidate_rate_timelines()
+        out = StringIO()
+        call_command("rebase_amounts", "--batch-size", "1", stdout=out)
+
+        self.assertIn("Re-derived 2 of 2", out.getvalue())
+        self.assertEqual(
+            sorted(Transaction.objects.filter(user=self.user).values_list("amount", flat=True)),
+            [Decimal("1.00"), Decimal("12.50"), Decimal("37.50")],
+        )
+        rollup = DailyTotal.objects.get(user=self.user)
+        self.assertEqual((rollup.total, rollup.count), (Decimal("51.00"), 3))
+
+    def test_amounts_are_stored_as_integer_cents_and_read_as_money(self):
+        today = timezone.localdate()
+        for amount in (Decimal("0.29"), "12.345", 7):
+            Transaction.objects.create(
+                user=self.user, type=Transaction.Type.EXPENSE, category=self.expense_cat, amount=amount, date=today,
+            )
+        Budget.objects.create(user=self.user, month=today.replace(day=1), amount=Decimal("100.00"))
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT amount FROM tracker_transaction ORDER BY amount")
+            self.assertEqual([row[0] for row in cursor.fetchall()], [29, 700, 1235])
+        tx = Transaction.objects.order_by("amount").first()
+        self.assertEqual(tx.amount, Money(29))
+        self.assertEqual(tx.original_amount, Decimal("0.29"))
+
+        # Queries take units, floats included; sums stay Money
+        expenses = Transaction.objects.filter(user=self.user)
+        self.assertEqual(expenses.filter(amount__gte=7.0).count(), 2)
+        self.assertEqual(expenses.filter(amount__lt=12.35).count(), 2)
+        self.assertEqual(expenses.aggregate(total=Sum("amount"))["total"], Money(1964))
+        self.assertEqual(DailyTotal.objects.get(user=self.user).total, Decimal("19.64"))
+
+        resp = self.client.get(reverse("budget_overview"))
+        self.assertContains(resp, "€100.00")
+        self.assertContains(resp, "€19.64")
+        resp = self.client.get(reverse("transaction_update", args=[tx.pk]))
+        self.assertContains(resp, 'value="0.29"')
+
+    @override_settings(LEDGER_CACHE_MAX_BYTES=1 << 20)
+    def test_ledger_cache_matches_sql_and_follows_writes(self):
+        today = timezone.localdate()
+        for offset, tx_type, category, amount in (
+            (0, Transaction.Type.EXPENSE, self.expense_cat, "12.50"),
+            (0, Transaction.Type.EXPENSE, None, "3.20"),
+            (2, Transaction.Type.EXPENSE, self.expense_cat, "7.05"),
+            (2, Transaction.Type.INCOME, self.income_cat, "100.00"),
+            (40, Transaction.Type.EXPENSE, self.expense_cat, "9.99"),
+        ):
+            Transaction.objects.create(
+                user=self.user, type=tx_type, category=category, amount=Decimal(amount),
+                date=today - timedelta(days=offset),
+            )
+        start = today - timedelta(days=30)
+        expenses = Transaction.objects.filter(user=self.user, type=Transaction.Type.EXPENSE, date__gte=start)
+
+        for use_numpy in (True, False):
+            ledger = ColumnarLedger.build(self.user.pk, 0, use_numpy=use_numpy)
+            self.assertEqual(ledger.range_sum(start, today, "expense"), 2275)
+            self.assertEqual(ledger.range_sum(start, today), 12275)
+            self.assertEqual(
+                ledger.by_category(start, today, "expense"),
+                {row[0]: row[1].cents for row in expenses.values_list("category_id").annotate(Sum("amount"))},
+            )
+            self.assertEqual(ledger.by_day(start, today, "expense"), {today: 1570, today - timedelta(days=2): 705})
+
+        # Committed writes in this process are applied as deltas; a stale version rebuilds
+        cache = ledger_cache()
+        cache.clear()
+        version = self.user.ledger_state.version
+        ledger = cache.get(self.user.pk, version)
+        with self.captureOnCommitCallbacks(execute=True):
+            tx = Transaction.objects.create(
+                user=self.user, type=Transaction.Type.EXPENSE, category=self.expense_cat,
+                amount=Decimal("1.00"), date=today,
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            tx.amount = Decimal("4.00")
+            tx.save()
+        self.user.ledger_state.refresh_from_db()
+        self.assertIs(cache.get(self.user.pk, self.user.ledger_state.version), ledger)
+        self.assertEqual(ledger.by_day(today, today, "expense"), {today: 1970})
+        self.assertIsNot(cache.get(self.user.pk, self.user.ledger_state.version + 1), ledger)
+
+        # Deleting a category moves its spend to "no category": the ledger is dropped
+        ledger = cache.get(self.user.pk, self.user.ledger_state.version)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.expense_cat.delete()
+        self.user.ledger_state.refresh_from_db()
+        self.assertEqual(
+            cache.get(self.user.pk, self.user.ledger_state.version).by_category(start, today, "expense"),
+            {None: 2675},
+        )
+
+    def test_import_command_is_idempotent(self):
+        today = timezone.localdate()
+        csv_text = (
+            "Date,Amount,Category,Description\n"
+            f"{today.isoformat()},-12.50,Food,Lunch\n"
+            f"{today.isoformat()},-12.50,Food,Lunch\n"
+            f"{today.strftime('%d/%m/%Y')},-40.00,Travel,Train\n"
+            f"{today.isoformat()},2000,Salary,Payroll\n"
+            "not-a-date,-1.00,Food,Broken\n"
+        )
+        path = self._write_tmp("export.csv", csv_text)
+
+        err = StringIO()
+        call_command("import_transactions", "u1", path, "--batch-size", "2", stdout=StringIO(), stderr=err)
+        self.assertIn("line 6: invalid date", err.getvalue())
+        call_command("import_transactions", "u1", path, stdout=StringIO(), stderr=StringIO())
+
+        txs = Transaction.objects.filter(user=self.user)
+        self.assertEqual(txs.count(), 4)  # both identical lunches, once each
+        self.assertTrue(Category.objects.filter(user=self.user, name="Travel", kind=Category.Kind.EXPENSE).exists())
+        self.assertEqual(txs.filter(category=self.income_cat).get().amount, Decimal("2000.00"))
+        expense_total = DailyTotal.objects.filter(user=self.user, type=Transaction.Type.EXPENSE).aggregate(t=Sum("total"))["t"]
+        self.assertEqual(expense_total, Decimal("65.00"))
+
+    def test_import_racing_another_import_of_the_same_file(self):
+        today = timezone.localdate()
+        csv_text = (
+            "Date,Amount,Category,Description\n"
+            f"{today.isoformat()},-12.50,Food,Lunch\n"
+            f"{today.isoformat()},-3.00,Snacks,Crisps\n"
+        )
+        self.assertEqual(import_transactions(self.user, StringIO(csv_text)).created, 2)
+
+        # The other import committed its rows after this one checked for them
+        real_existing = importer._existing_hashes
+        checks = iter([lambda user, rows: set(), real_existing])
+        with mock.patch("tracker.importer._existing_hashes", side_effect=lambda *args: next(checks)(*args)):
+            result = import_transactions(self.user, StringIO(csv_text))
+        self.assertEqual((result.created, result.skipped), (0, 2))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self._rollup()[(today, "expense", self.expense_cat.id)], (Decimal("12.50"), 1))
+
+    def test_import_view_uploads_csv(self):
+        upload = SimpleUploadedFile(
+            "export.csv",
+            f"date,type,amount,category\n{timezone.localdate()},expense,9.99,Food\n".encode(),
+            content_type="text/csv",
+        )
+        resp = self.client.post(reverse("transaction_import"), {"file": upload})
+        self.assertRedirects(resp, reverse("transaction_list"))
+        self.assertEqual(Transaction.objects.get(user=self.user).category, self.expense_cat)
+
+        # Re-importing the same file changes nothing, but its flash must not hit a 304
+        first = self.client.get(reverse("transaction_list"))
+        upload.seek(0)
+        self.client.post(reverse("transaction_import"), {"file": upload})
+        resp = self.client.get(reverse("transaction_list"), HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertContains(resp, "Import finished")
+        self.assertFalse(resp.has_header("ETag"))
+        resp = self.client.get(reverse("transaction_list"), HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(resp.status_code, 304)
+
+        bad = SimpleUploadedFile("bad.csv", b"when,how much\n2025-01-01,1\n", content_type="text/csv")
+        resp = self.client.post(reverse("transaction_import"), {"file": bad})
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, "missing: amount, date")
+
+    def _write_tmp(self, name, text):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, name)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        return path
+
+    @mock.patch("tracker.views.get_latest_rates", side_effect=OSError("offline"))
+    def test_export_streams_filtered_csv_and_gzipped_ndjson(self, _rates):
+        invalidate_rate_timelines()
+        self.addCleanup(invalidate_rate_timelines)
+        today = timezone.localdate()
+        FxRate.objects.create(quote="USD", date=today - timedelta(days=30), rate=Decimal("1.10"))
+        Transaction.objects.create(user=self.user, type=Transaction.Type.INCOME, category=self.income_cat,
+                                   amount=Decimal("1000.00"), date=today - timedelta(days=3), description="Pay")
+        Transaction.objects.create(user=self.user, type=Transaction.Type.EXPENSE, category=self.expense_cat,
+                                   amount=Decimal("12.50"), date=today, description='Lunch, "big"')
+        Transaction.objects.create(user=self.user, type=Transaction.Type.EXPENSE,
+                                   amount=Decimal("3.00"), date=today - timedelta(days=60))
+
+        url = reverse("transaction_export")
+        resp = self.client.get(url, {"start": (today - timedelta(days=7)).isoformat(), "currency": "USD"})
+        self.assertTrue(resp.streaming)
+        rows = list(csv.reader(io.StringIO(b"".join(resp.streaming_content).decode())))
+        self.assertEqual(rows[0], ["date", "type", "amount", "category", "description", "amount_usd"])
+        self.assertEqual(rows[1:], [
+            [str(today - timedelta(days=3)), "income", "1000.00", "Salary", "Pay", "1100.00"],
+            [str(today), "expense", "12.50", "Food", 'Lunch, "big"', "13.75"],
+        ])
+
+        resp = self.client.get(url, {"format": "ndjson", "category": "none", "gzip": "1"})
+        self.assertEqual(resp["Content-Type"], "application/gzip")
+        records = [json.loads(line) for line in gzip.decompress(b"".join(resp.streaming_content)).splitlines()]
+        self.assertEqual(records, [{
+            "date": str(today - timedelta(days=60)), "type": "expense", "amount": "3.00",
+            "category": None, "description": "",
+        }])
+
+        self.assertEqual(self.client.get(url, {"start": "yesterday"}).status_code, 400)
+
+    def test_seed_demo_data_is_deterministic_and_keeps_rollups(self):
+        def snapshot():
+            return list(
+                Transaction.objects.filter(user__username__startswith="seed_")
+                .order_by("user__username", "date", "type", "amount", "description")
+                .values_list("user__username", "date", "type", "category__name", "amount")
+            )
+
+        args = ["--users", "3", "--user-prefix", "seed_", "--years", "0.2", "--tx-per-day", "3", "--seed", "5"]
+        call_command("seed_demo_data", *args, stdout=StringIO(), stderr=StringIO())
+        first = snapshot()
+        call_command("seed_demo_data", *args, "--force", "--batch-size", "7", stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(snapshot(), first)
+        self.assertGreater(len(first), 3 * 73)
+        seeded = Transaction.objects.filter(user__username__startswith="seed_")
+        self.assertEqual(
+            DailyTotal.objects.filter(user__username__startswith="seed_").aggregate(t=Sum("total"))["t"],
+            seeded.aggregate(t=Sum("amount"))["t"],
+        )
+        self.assertTrue(Budget.objects.filter(user__username="seed_00001", category__isnull=True).exists())
+
+    def test_bench_command_reports_every_target(self):
+        path = self._write_tmp("bench.json", "")
+        out = StringIO()
+        call_command("bench", "--sizes", "60", "--runs", "2", "--use-current-db", "--json", path, stdout=out)
+
+        with open(path, encoding="utf-8") as fh:
+            report = json.load(fh)
+        targets = [row["target"] for row in report["results"]]
+        self.assertEqual(targets, [
+            "dashboard", "dashboard_uncached", "dashboard_data", "dashboard_data_uncached", "trend_series", "transaction_list", "budget_overview",
+            "range_sql", "range_ledger", "range_ledger_py", "ledger_build",
+        ])
+        for row in report["results"]:
+            self.assertGreater(row["transactions"], 0)
+            self.assertGreater(row["queries"], 0)
+            self.assertLessEqual(row["p50_ms"], row["p99_ms"])
+        self.assertIn("transaction_list", out.getvalue())
+
+    def test_bench_cache_reports_every_tier(self):
+        out = StringIO()
+        call_command("bench_cache", "--iterations", "20", stdout=out)
+        for label in ("locmem hit", "L2 hit (DatabaseCache)", "two-tier L1 hit", "two-tier L1 miss, L2 hit"):
+            self.assertIn(label, out.getvalue())
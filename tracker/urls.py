@@ -4,6 +4,9 @@ from . import views
 urlpatterns = [
     # Transactions
     path("transactions/", views.TransactionListView.as_view(), name="transaction_list"),
+    path("transactions/feed/", views.transaction_feed, name="transaction_feed"),
+    path("transactions/export/", views.transaction_export, name="transaction_export"),
+    path("transactions/import/", views.transaction_import, name="transaction_import"),
     path("transactions/new/", views.TransactionCreateView.as_view(), name="transaction_create"),
     path("transactions/<int:pk>/edit/", views.TransactionUpdateView.as_view(), name="transaction_update"),
     path("transactions/<int:pk>/delete/", views.TransactionDeleteView.as_view(), name="transaction_delete"),
@@ -1,14 +1,26 @@
+import binascii
+import io
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+
 from django.contrib import messages
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Sum
+from django.db.models import Q, Sum
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
-from django.urls import reverse_lazy
-from django.utils import timezone
+from django.urls import reverse, reverse_lazy
+from django.utils import formats, timezone
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 
+from services.currencies import currency_or_base, get_currency
 from services.currency import get_latest_rates
-from .forms import TransactionForm, BudgetForm
-from .models import Transaction, Budget, Category
+from .conditional import display_variant, ledger_conditional
+from .forms import TransactionForm, BudgetForm, TransactionImportForm
+from .exporter import EXPORT_FORMATS, export_queryset, stream_export
+from .importer import RowError, import_transactions
+from .models import DailyTotal, Transaction, Budget, Category
 
 
 class UserQuerySetMixin(LoginRequiredMixin):
@@ -16,54 +28,177 @@ class UserQuerySetMixin(LoginRequiredMixin):
         return super().get_queryset().filter(user=self.request.user)
 
 
+# -----------------------------
+# Keyset pagination over (-date, -created_at, -id)
+# -----------------------------
+TRANSACTION_PAGE_SIZE = 50
+
+
+def _encode_cursor(tx):
+    raw = f"{tx.date.isoformat()}|{tx.created_at.isoformat()}|{tx.pk}"
+    return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    """
+    Returns (date, created_at, pk) for a cursor produced by _encode_cursor, or None if invalid.
+    """
+    try:
+        raw = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        day, created_at, pk = raw.split("|")
+        return date.fromisoformat(day), datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return None
+
+
+def _keyset_page(qs, after=None, size=TRANSACTION_PAGE_SIZE):
+    """
+    Return (rows, next_cursor) for the page of qs that follows the decoded cursor `after`.
+    Seeks with a WHERE on the sort key instead of OFFSET, so every page costs the same.
+    """
+    qs = qs.order_by("-date", "-created_at", "-id")
+    if after:
+        day, created_at, pk = after
+        qs = qs.filter(
+            Q(date__lt=day)
+            | Q(date=day, created_at__lt=created_at)
+            | Q(date=day, created_at=created_at, id__lt=pk)
+        )
+
+    rows = list(qs[:size + 1])
+    next_cursor = _encode_cursor(rows[size - 1]) if len(rows) > size else None
+    return rows[:size], next_cursor
+
+
+def _latest_rate(currency):
+    """
+    Returns (latest EUR -> currency rate or None, fx_error).
+    """
+    if currency == "EUR":
+        return None, None
+    try:
+        fx = get_latest_rates(base="EUR", symbols=(currency,))
+        return (fx.rates.get(currency) if fx else None), None
+    except Exception:
+        return None, "FX unavailable"
+
+
+def _list_display_fx(request):
+    """
+    Display currency + latest FX rate for list conversion.
+    Returns (display_currency, display_symbol, rate, fx_error). Per-row historical rates are
+    applied in SQL by Transaction.objects.with_display_amount().
+    """
+    currency = currency_or_base(request.session.get("display_currency"))
+    rate, fx_error = _latest_rate(currency.code)
+    return currency.code, currency.symbol, rate, fx_error
+
+
+def _list_variant(request):
+    return display_variant(currency_or_base(request.session.get("display_currency")).code)
+
+
+def _display_queryset(request, fx):
+    """
+    The user's transactions with display_amount converted in the query (see _list_display_fx).
+    """
+    display_currency, _, rate, _ = fx
+    return (
+        Transaction.objects.filter(user=request.user)
+        .select_related("category")
+        .with_display_amount(display_currency, rate)
+    )
+
+
+@method_decorator(ledger_conditional(_list_variant), name="get")
 class TransactionListView(LoginRequiredMixin, ListView):
     model = Transaction
     template_name = "tracker/transactions/list.html"
     context_object_name = "transactions"
 
     def get_queryset(self):
-        return Transaction.objects.filter(user=self.request.user).select_related("category")
+        return _display_queryset(self.request, self.fx)
+
+    def get(self, request, *args, **kwargs):
+        # Only the first page is rendered; later pages come from transaction_feed
+        # (or ?cursor= links when JavaScript is off).
+        self.fx = _list_display_fx(request)
+        after = _decode_cursor(request.GET.get("cursor", ""))
+        self.object_list, self.next_cursor = _keyset_page(self.get_queryset(), after)
+        context = self.get_context_data()
+        return self.render_to_response(context)
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
+        ctx["next_cursor"] = self.next_cursor
+        ctx["page_size"] = TRANSACTION_PAGE_SIZE
 
         today = timezone.localdate()
         month_start = today.replace(day=1)
-        tx = self.get_queryset().filter(date__gte=month_start, date__lte=today)
+        tx = DailyTotal.objects.filter(user=self.request.user, date__gte=month_start, date__lte=today)
 
-        ctx["income"] = tx.filter(type=Transaction.Type.INCOME).aggregate(total=Sum("amount"))["total"] or 0
-        ctx["expense"] = tx.filter(type=Transaction.Type.EXPENSE).aggregate(total=Sum("amount"))["total"] or 0
+        totals = tx.aggregate(
+            income=Sum("total", filter=Q(type=Transaction.Type.INCOME)),
+            expense=Sum("total", filter=Q(type=Transaction.Type.EXPENSE)),
+        )
+        ctx["income"] = totals["income"] or 0
+        ctx["expense"] = totals["expense"] or 0
         ctx["month_start"] = month_start
         ctx["today"] = today
 
-        # -----------------------------
-        # Display currency + FX rate for list conversion
-        # -----------------------------
-        allowed = ("EUR", "USD", "GBP")
-        display_currency = self.request.session.get("display_currency", "EUR")
-        if display_currency not in allowed:
-            display_currency = "EUR"
-
-        symbol_map = {"EUR": "€", "USD": "$", "GBP": "£"}
-
-        fx_error = None
-        rate = None
-
-        try:
-            if display_currency != "EUR":
-                fx = get_latest_rates(base="EUR", symbols=(display_currency,))
-                rate = fx.rates.get(display_currency) if fx else None
-        except Exception:
-            fx_error = "FX unavailable"
+        display_currency, display_symbol, rate, fx_error = self.fx
 
         ctx["display_currency"] = display_currency
-        ctx["display_symbol"] = symbol_map.get(display_currency, "€")
+        ctx["display_symbol"] = display_symbol
         ctx["tx_fx_rate"] = rate
         ctx["tx_fx_error"] = fx_error
 
         return ctx
 
 
+@login_required
+def transaction_feed(request):
+    """
+    JSON page of transactions after ?cursor=, used by the list page's infinite scroll.
+    """
+    after = None
+    cursor = request.GET.get("cursor")
+    if cursor:
+        after = _decode_cursor(cursor)
+        if after is None:
+            return JsonResponse({"error": "Invalid cursor."}, status=400)
+
+    fx = _list_display_fx(request)
+    display_currency, display_symbol, _, fx_error = fx
+    rows, next_cursor = _keyset_page(_display_queryset(request, fx), after)
+
+    results = []
+    for t in rows:
+        results.append({
+            "id": t.pk,
+            "date": t.date.isoformat(),
+            "date_display": formats.date_format(t.date),
+            "type": t.type,
+            "category": t.category.name if t.category else None,
+            "description": t.description,
+            "amount": str(t.amount),
+            "currency": t.currency,
+            "original_amount": str(t.original_amount),
+            "original_display": currency_or_base(t.currency).format(t.original_amount),
+            "amount_display": str(t.display_amount) if t.display_amount is not None else None,
+            "edit_url": reverse("transaction_update", args=[t.pk]),
+            "delete_url": reverse("transaction_delete", args=[t.pk]),
+        })
+
+    return JsonResponse({
+        "results": results,
+        "next_cursor": next_cursor,
+        "display_currency": display_currency,
+        "display_symbol": display_symbol,
+        "fx_error": fx_error,
+    })
+
+
 class TransactionCreateView(LoginRequiredMixin, CreateView):
     model = Transaction
     template_name = "tracker/transactions/form.html"
@@ -113,6 +248,84 @@ class TransactionDeleteView(UserQuerySetMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
+def _optional_date(value):
+    return date.fromisoformat(value) if value else None
+
+
+@login_required
+def transaction_export(request):
+    """
+    Stream the user's transactions as a download (see tracker.exporter). Query parameters:
+    format=csv|ndjson, start/end=YYYY-MM-DD, category=<id>|none, type=income|expense,
+    currency=USD|GBP (adds a column converted at each date's rate) and gzip=1.
+    """
+    fmt = request.GET.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("Unknown export format.")
+
+    try:
+        start = _optional_date(request.GET.get("start"))
+        end = _optional_date(request.GET.get("end"))
+    except ValueError:
+        return HttpResponseBadRequest("Dates must be YYYY-MM-DD.")
+
+    category = request.GET.get("category") or None
+    if category and category != "none":
+        if not category.isdigit() or not Category.objects.filter(user=request.user, pk=category).exists():
+            return HttpResponseBadRequest("Unknown category.")
+
+    tx_type = request.GET.get("type") or None
+    if tx_type and tx_type not in Transaction.Type.values:
+        return HttpResponseBadRequest("Unknown transaction type.")
+
+    selected = get_currency(request.GET.get("currency") or "EUR")
+    if selected is None:
+        return HttpResponseBadRequest("Unsupported currency.")
+    currency = selected.code
+
+    qs = export_queryset(request.user, start=start, end=end, category=category, tx_type=tx_type)
+    display_currency = None
+    if currency != "EUR":
+        display_currency = currency
+        rate, _ = _latest_rate(currency)
+        qs = qs.with_display_amount(currency, rate)
+
+    compress = request.GET.get("gzip") in ("1", "true")
+    response = StreamingHttpResponse(
+        stream_export(qs, fmt, display_currency=display_currency, compress=compress),
+        content_type="application/gzip" if compress else f"{EXPORT_FORMATS[fmt]}; charset=utf-8",
+    )
+    filename = f"transactions-{timezone.localdate().isoformat()}.{fmt}{'.gz' if compress else ''}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def transaction_import(request):
+    """
+    Upload a CSV bank export; rows are streamed into the user's transactions
+    (see tracker.importer). Uploading the same file again imports nothing new.
+    """
+    if request.method == "POST":
+        form = TransactionImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            stream = io.TextIOWrapper(form.cleaned_data["file"].file, encoding="utf-8-sig", newline="")
+            try:
+                result = import_transactions(request.user, stream)
+            except (RowError, UnicodeDecodeError) as exc:
+                form.add_error("file", f"Could not import this file: {exc}")
+            else:
+                messages.success(request, f"Import finished: {result.summary()}")
+                for line, message in result.errors[:5]:
+                    messages.warning(request, f"Line {line}: {message}")
+                return redirect("transaction_list")
+    else:
+        form = TransactionImportForm()
+
+    return render(request, "tracker/transactions/import.html", {"form": form})
+
+
+@ledger_conditional()
 def budget_overview(request):
     if not request.user.is_authenticated:
         return redirect("login")
@@ -144,16 +357,16 @@ def budget_overview(request):
 
     budgets = Budget.objects.filter(user=request.user, month=month_start).select_related("category")
 
-    # month-to-date spending per category (expenses only)
+    # month-to-date spending per category (expenses only), from the daily rollup
     spending = (
-        Transaction.objects.filter(
+        DailyTotal.objects.filter(
             user=request.user,
             type=Transaction.Type.EXPENSE,
             date__gte=month_start,
             date__lte=today
         )
         .values("category__id", "category__name")
-        .annotate(total=Sum("amount"))
+        .annotate(total=Sum("total"))
         .order_by("-total")
     )
 